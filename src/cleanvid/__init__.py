@@ -4,5 +4,6 @@ __version__ = "1.7.0"
 __author__ = "Seth Grover <mero.mero.guero@gmail.com>"
 
 from .cleanvid import RunCleanvid
+from .mutetimeline import MuteTimeline
 
-__all__ = ["RunCleanvid"]
+__all__ = ["RunCleanvid", "MuteTimeline"]
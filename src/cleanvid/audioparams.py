@@ -0,0 +1,71 @@
+from typing import List, Optional
+
+try:
+    from cleanvid.fftools import AvailableEncoders
+    from cleanvid.mediainfo import StreamInfo
+except ImportError:
+    from fftools import AvailableEncoders
+    from mediainfo import StreamInfo
+
+AUDIO_AUTO_PARAMS = 'auto'
+# source codec -> encoders producing it, in order of preference
+AUDIO_AUTO_ENCODERS = {
+    'aac': ['libfdk_aac', 'aac'],
+    'ac3': ['ac3'],
+    'eac3': ['eac3'],
+    'mp2': ['mp2'],
+    'mp3': ['libmp3lame'],
+    'opus': ['libopus'],
+    'vorbis': ['libvorbis'],
+    'flac': ['flac'],
+    'alac': ['alac'],
+}
+AUDIO_AUTO_LOSSLESS_ENCODERS = {'flac', 'alac'}
+# used when there is no encoder for the source codec (DTS, TrueHD, ...), ffmpeg always has it
+AUDIO_AUTO_FALLBACK_ENCODER = 'aac'
+# bit rate per channel when the source's isn't known, and the most the fallback encoder is given per
+# channel when replacing a higher bit rate (lossless or otherwise) source
+AUDIO_AUTO_CHANNEL_BITRATE = 112000
+AUDIO_AUTO_FALLBACK_MAX_CHANNEL_BITRATE = 160000
+AUDIO_AUTO_MAX_BITRATE = {
+    'ac3': 640000,
+    'libmp3lame': 320000,
+    'mp2': 384000,
+}
+
+
+def AutoAudioEncoder(stream: StreamInfo) -> str:
+    """the encoder for the source stream's own codec if this ffmpeg has one, otherwise the fallback"""
+    available = AvailableEncoders('A')
+    if stream.codecName.startswith('pcm_') and (stream.codecName in available):
+        return stream.codecName
+    return next(
+        (x for x in AUDIO_AUTO_ENCODERS.get(stream.codecName, []) if x in available),
+        AUDIO_AUTO_FALLBACK_ENCODER,
+    )
+
+
+def AutoAudioParams(stream: StreamInfo, outputIndex: int, channels: Optional[int] = None) -> List[str]:
+    """Encoder arguments for one output audio stream matching its source stream.
+
+The source codec is kept when there is an encoder for it, the sample rate and channel layout are the
+source's (unless channels is given, e.g. when downmixing) so nothing is resampled, and the bit rate is
+the source's, capped to a per-channel equivalent for the fallback encoder."""
+    encoder = AutoAudioEncoder(stream)
+    channels = channels or stream.channels
+    params = [f'-c:a:{outputIndex}', encoder]
+    if (not encoder.startswith('pcm_')) and (encoder not in AUDIO_AUTO_LOSSLESS_ENCODERS):
+        bitRate = stream.bitRate or ((stream.channels or 2) * AUDIO_AUTO_CHANNEL_BITRATE)
+        if (channels != stream.channels) and stream.channels:
+            bitRate = bitRate * channels // stream.channels
+        if encoder not in AUDIO_AUTO_ENCODERS.get(stream.codecName, []):
+            bitRate = min(bitRate, (channels or 2) * AUDIO_AUTO_FALLBACK_MAX_CHANNEL_BITRATE)
+        if encoder in AUDIO_AUTO_MAX_BITRATE:
+            bitRate = min(bitRate, AUDIO_AUTO_MAX_BITRATE[encoder])
+        params += [f'-b:a:{outputIndex}', str(bitRate)]
+    if stream.sampleRate:
+        params += [f'-ar:a:{outputIndex}', str(stream.sampleRate)]
+    if channels and (channels != stream.channels):
+        # otherwise left alone so the source's channel layout is kept as is
+        params += [f'-ac:a:{outputIndex}', str(channels)]
+    return params
@@ -0,0 +1,185 @@
+import os
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    from cleanvid.fftools import FilterArgEscape, RunCommand, WriteConcatList
+    from cleanvid.mediainfo import StreamInfo
+    from cleanvid.mutetimeline import MuteTimeline
+except ImportError:
+    from fftools import FilterArgEscape, RunCommand, WriteConcatList
+    from mediainfo import StreamInfo
+    from mutetimeline import MuteTimeline
+
+# source codec -> (encoder, packets of encoder delay). Only codecs whose encoder delay is a whole number of
+# packets can have re-encoded packets dropped in between copied ones without shifting the frame grid.
+AUDIO_SEGMENT_ENCODERS = {
+    'aac': ('aac', 1),
+    'alac': ('alac', 0),
+    'flac': ('flac', 0),
+}
+AUDIO_SEGMENT_DEFAULT_BITRATE = '224k'
+# untouched packets decoded (and then discarded) either side of a re-encoded span, so the encoder's
+# overlap state at each splice matches the copied audio it is joined to
+AUDIO_SEGMENT_ROLL_PACKETS = 2
+
+
+def SegmentEncoder(stream: StreamInfo) -> Optional[Tuple[str, int]]:
+    """(encoder, delay packets) able to produce packets that splice into this stream, or None"""
+    if stream.codecName.startswith('pcm_'):
+        return (stream.codecName, 0)
+    if (stream.codecName == 'aac') and (stream.raw.get('profile', 'LC') != 'LC'):
+        # HE-AAC and friends use SBR with its own delay
+        return None
+    return AUDIO_SEGMENT_ENCODERS.get(stream.codecName, None)
+
+
+def GetAudioPackets(fileSpec: str, audioIndex: int, timeBase: Fraction) -> List[Fraction]:
+    """start times (seconds) of every packet of the audio stream (by audio-only index), in order"""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', f'a:{audioIndex}',
+        '-show_entries', 'packet=pts',
+        '-of', 'csv=p=0',
+        fileSpec,
+    ]
+    result = RunCommand(cmd)
+    if result.return_code != 0:
+        raise ValueError(f'Could not read audio packets of {fileSpec}: {result.err.strip()}')
+    try:
+        return [int(x.strip().rstrip(',')) * timeBase for x in result.out.splitlines() if x.strip()]
+    except ValueError:
+        raise ValueError(f'Audio packets of {fileSpec} are missing timestamps')
+
+
+def PlanAudioSegments(
+    packetStarts: Sequence[Fraction],
+    timeline: MuteTimeline,
+    roll: int = AUDIO_SEGMENT_ROLL_PACKETS,
+) -> List[Tuple[int, int]]:
+    """[first, last) packet ranges to re-encode, covering every mute window (merged if they'd share roll packets)"""
+    packetMs = [float(x * 1000) for x in packetStarts]
+    spans = []
+    for start, end in timeline:
+        first = max(bisect_right(packetMs, start) - 1, 0)
+        last = min(max(bisect_left(packetMs, end), first + 1), len(packetMs))
+        if spans and (first - spans[-1][1] <= 2 * roll):
+            spans[-1][1] = max(spans[-1][1], last)
+        else:
+            spans.append([first, last])
+    return [tuple(x) for x in spans]
+
+
+def RenderSegmentedAudio(
+    fileSpec: str,
+    stream: StreamInfo,
+    audioIndex: int,
+    timeline: MuteTimeline,
+    workDir: str,
+    muteFilter: str,
+    origin: Fraction = Fraction(0),
+) -> Tuple[str, Fraction]:
+    """Mute timeline windows in one audio stream, re-encoding only the packets around each window.
+
+The stream is split (without decoding) at packet boundaries around every window, just those spans are
+decoded, muted and re-encoded to the source codec and parameters, and a concat demuxer list splicing
+them back between the copied spans is returned with the start time of the stream's first packet. Packet
+times count from origin, the start of the file's timeline that the mute timeline counts from too."""
+    if (encoder := SegmentEncoder(stream)) is None:
+        raise ValueError(f'Audio codec {stream.codecName} can not be re-encoded in segments')
+    encoderName, delayPackets = encoder
+    try:
+        timeBase = Fraction(stream.raw.get('time_base', '1/1000'))
+    except (ValueError, ZeroDivisionError):
+        raise ValueError(f'Could not determine the audio time base of {fileSpec}')
+    packets = [x - origin for x in GetAudioPackets(fileSpec, audioIndex, timeBase)]
+    if not packets:
+        raise ValueError(f'No audio packets found in {fileSpec}')
+    spans = PlanAudioSegments(packets, timeline)
+
+    # every re-encoded span is cut out along with its roll packets on either side
+    roll = AUDIO_SEGMENT_ROLL_PACKETS
+    cuts = sorted(
+        {x for first, last in spans for x in (first - roll, first, last, last + roll) if 0 < x < len(packets)}
+    )
+    bounds = [0] + cuts + [len(packets)]
+    # segment times count from the first packet, and fall between packets so rounding can't move a cut
+    cmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-nostats',
+        '-loglevel', 'error',
+        '-y',
+        '-i', fileSpec,
+        '-map', f'0:a:{audioIndex}',
+        '-c', 'copy',
+        '-f', 'segment',
+        '-segment_format', 'matroska',
+        '-reset_timestamps', '1',
+    ]
+    if cuts:
+        cmd += ['-segment_times', ','.join(f'{float((packets[x - 1] + packets[x]) / 2 - packets[0]):.6f}' for x in cuts)]
+    cmd += [os.path.join(workDir, 'audio%05d.mka')]
+    result = RunCommand(cmd)
+    if result.return_code != 0:
+        raise ValueError(f'Could not split audio of {fileSpec}: {result.err.strip()}')
+
+    # the last packet's duration isn't known from its start, take it as the previous packet's
+    ends = list(packets[1:]) + [packets[-1] + ((packets[-1] - packets[-2]) if len(packets) > 1 else 0)]
+    pieces = [
+        (os.path.join(workDir, f'audio{i:05d}.mka'), first, last, ends[last - 1] - packets[first])
+        for i, (first, last) in enumerate(zip(bounds[:-1], bounds[1:]))
+    ]
+
+    bitRate = str(stream.bitRate) if stream.bitRate else AUDIO_SEGMENT_DEFAULT_BITRATE
+    spliced = []
+    for spanIdx, (first, last) in enumerate(spans):
+        decodeFirst, decodeLast = max(first - roll, 0), min(last + roll, len(packets))
+        decodeStart = packets[decodeFirst]
+        decodeList = WriteConcatList(
+            os.path.join(workDir, f'decode{spanIdx:05d}.txt'),
+            [(x[0], x[3]) for x in pieces if (x[1] >= decodeFirst) and (x[2] <= decodeLast)],
+        )
+        commandsFileSpec = os.path.join(workDir, f'mute{spanIdx:05d}.cmd')
+        with open(commandsFileSpec, 'w') as f:
+            f.write(
+                timeline.clip(round(ends[last - 1] * 1000), round(packets[first] * 1000))
+                .shift(-round(decodeStart * 1000))
+                .toSendCmd(muteFilter)
+            )
+        # the encoder's priming and the pre-roll come out first and the post-roll last, keep only the span
+        dropHead = (first - decodeFirst) + delayPackets
+        outFileSpec = os.path.join(workDir, f'muted{spanIdx:05d}.mka')
+        cmd = [
+            'ffmpeg',
+            '-hide_banner',
+            '-nostats',
+            '-loglevel', 'error',
+            '-y',
+            '-f', 'concat',
+            '-safe', '0',
+            '-i', decodeList,
+            '-af', f'asendcmd=f={FilterArgEscape(commandsFileSpec)},{muteFilter}=1',
+            '-c:a', encoderName,
+        ]
+        if not encoderName.startswith('pcm_'):
+            cmd += ['-b:a', bitRate]
+        if stream.sampleRate:
+            cmd += ['-ar', str(stream.sampleRate)]
+        if stream.channels:
+            cmd += ['-ac', str(stream.channels)]
+        cmd += ['-bsf:a', f'noise=drop=lt(n\\,{dropHead})+gte(n\\,{dropHead + last - first})', outFileSpec]
+        result = RunCommand(cmd)
+        if result.return_code != 0:
+            raise ValueError(f'Could not re-encode audio of {fileSpec}: {result.err.strip()}')
+        spliced.append((first, last, outFileSpec))
+
+    concatPieces = []
+    for pieceFileSpec, first, last, duration in pieces:
+        if replacement := next((x for x in spliced if x[0] == first), None):
+            concatPieces.append((replacement[2], ends[replacement[1] - 1] - packets[first]))
+        elif not any(x[0] <= first < x[1] for x in spliced):
+            concatPieces.append((pieceFileSpec, duration))
+    return WriteConcatList(os.path.join(workDir, 'audio.txt'), concatPieces), packets[0]
@@ -0,0 +1,352 @@
+import argparse
+import concurrent.futures
+import csv
+import glob
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    from cleanvid.cleanvid import (
+        CheckCleanvidArgs,
+        CleanMediaFile,
+        CleanvidArgumentParser,
+        FindMediaFiles,
+        GetMediaInfo,
+    )
+    from cleanvid.lexicon import LoadLexicon, LoadProfileLexicon
+    from cleanvid.probecache import ProbeCache
+    from cleanvid.scheduler import (
+        SCHEDULE_ORDER_DEFAULT,
+        SCHEDULE_ORDERS,
+        JobDeadline,
+        LowerPriority,
+        PlanJobs,
+        RunScheduledJobs,
+        ScheduledJob,
+    )
+except ImportError:
+    from cleanvid import CheckCleanvidArgs, CleanMediaFile, CleanvidArgumentParser, FindMediaFiles, GetMediaInfo
+    from lexicon import LoadLexicon, LoadProfileLexicon
+    from probecache import ProbeCache
+    from scheduler import (
+        SCHEDULE_ORDER_DEFAULT,
+        SCHEDULE_ORDERS,
+        JobDeadline,
+        LowerPriority,
+        PlanJobs,
+        RunScheduledJobs,
+        ScheduledJob,
+    )
+
+logger = logging.getLogger(__name__)
+
+BATCH_MANIFEST_EXTENSIONS = {'.csv', '.jsonl'}
+# the manifest column/key naming the file to clean, "priority" and "timeout" are for the scheduler, and
+# every other one is a cleanvid option for that file
+BATCH_INPUT_KEY = 'input'
+BATCH_STATUS_FIELDS = ['input', 'status', 'outputs', 'seconds', 'error']
+BATCH_TRUE_VALUES = {'1', 'true', 'yes', 'on', 'y'}
+# cleanvid's own default output names (movie_clean.mkv, movie_clean.mild.mkv, movie.eng.clean.mka), which
+# directories and globs don't pick up again when a tree is re-run
+BATCH_OUTPUT_NAME_PATTERN = r'.*(_clean|\.clean)(\.[A-Za-z0-9_-]+)?'
+
+# a profanity list file, or (name, file) pairs of --profile lists
+LexiconSpec = Union[str, Tuple[Tuple[str, str], ...]]
+
+
+def ReadManifest(fileSpec: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(input file, option overrides) of every row of a CSV (with a header row) or JSON lines manifest.
+
+Input paths are relative to the manifest's directory, empty CSV cells are left out."""
+    baseDir = os.path.dirname(os.path.abspath(fileSpec))
+    with open(fileSpec, newline='', encoding='utf-8') as f:
+        if os.path.splitext(fileSpec)[1].lower() == '.csv':
+            rows = ({k.strip(): v for k, v in row.items() if k and (v is not None) and v.strip()} for row in csv.DictReader(f))
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for lineNum, row in enumerate(rows, start=1):
+            if not isinstance(row, dict) or not row.get(BATCH_INPUT_KEY):
+                raise ValueError(f'{fileSpec}: entry {lineNum} has no {BATCH_INPUT_KEY}')
+            overrides = dict(row)
+            yield os.path.join(baseDir, os.path.expanduser(str(overrides.pop(BATCH_INPUT_KEY)))), overrides
+
+
+def ExpandBatchInputs(specs: Sequence[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """(input file, option overrides) for every video under the given directories, files, globs and manifests.
+
+A file is only cleaned once, with the overrides of the first entry naming it."""
+    jobs = OrderedDict()
+    for spec in specs:
+        if os.path.isfile(spec) and (os.path.splitext(spec)[1].lower() in BATCH_MANIFEST_EXTENSIONS):
+            entries = list(ReadManifest(spec))
+        else:
+            paths = [spec] if os.path.exists(spec) else sorted(glob.glob(os.path.expanduser(spec), recursive=True))
+            entries = [
+                (x, {})
+                for x in FindMediaFiles(paths)
+                if not re.fullmatch(BATCH_OUTPUT_NAME_PATTERN, os.path.splitext(os.path.basename(x))[0])
+            ]
+            if not entries:
+                logger.warning(f'Nothing to clean matches {spec}')
+        for fileSpec, overrides in entries:
+            jobs.setdefault(os.path.abspath(fileSpec), overrides)
+    return list(jobs.items())
+
+
+def OverrideArgs(parser: argparse.ArgumentParser, overrides: Dict[str, Any]) -> List[str]:
+    """cleanvid command line arguments for manifest overrides keyed by long option name (or destination)"""
+    actions = {}
+    for action in parser._actions:
+        actions[action.dest] = action
+        for option in action.option_strings:
+            actions[option.lstrip('-')] = action
+    argv = []
+    for key, value in overrides.items():
+        if (action := actions.get(str(key).strip().lstrip('-'))) is None or not action.option_strings:
+            raise ValueError(f'Unknown cleanvid option {key}')
+        option = action.option_strings[-1]
+        if action.nargs == 0:
+            # flags are set by any true value and otherwise left alone
+            if (value is True) or (str(value).strip().lower() in BATCH_TRUE_VALUES):
+                argv.append(option)
+        else:
+            for x in value if isinstance(value, list) else [value]:
+                argv += [option, str(x)]
+    return argv
+
+
+def LexiconSpecOf(args: argparse.Namespace) -> LexiconSpec:
+    return tuple(args.swearsProfiles) if args.swearsProfiles else args.swears
+
+
+def _load_batch_lexicons(lexicons: Sequence[LexiconSpec], cacheDir: Optional[str]) -> None:
+    # the compiled matchers stay in the process's lexicon memo, so each VidCleaner finds its list ready
+    for spec in lexicons:
+        try:
+            if isinstance(spec, str):
+                LoadLexicon(spec, cacheDir)
+            else:
+                LoadProfileLexicon(OrderedDict(spec), cacheDir)
+        except Exception as e:
+            logger.debug(f'Could not preload lexicon {spec}: {e}')
+
+
+def _init_batch_worker(
+    lexicons: Sequence[LexiconSpec],
+    cacheDir: Optional[str],
+    niceness: Optional[int],
+    idleIo: bool,
+) -> None:
+    LowerPriority(niceness, idleIo)
+    _load_batch_lexicons(lexicons, cacheDir)
+
+
+def _run_batch_job(job: ScheduledJob) -> Dict[str, Any]:
+    # runs in a pool process, every failure is reported rather than raised
+    args = job.args
+    status = {'input': args.input, 'status': 'failed', 'outputs': [], 'seconds': 0.0, 'error': ''}
+    started = time.monotonic()
+    with JobDeadline(job.timeout) as deadline:
+        try:
+            probeCache = ProbeCache(args.probeCache) if (args.probeCache is not None) else None
+            cleaner = CleanMediaFile(args, GetMediaInfo(args.input, probeCache))
+            status['outputs'] = [
+                x.outputVidFileSpec for x in (cleaner.variants or [cleaner]) if os.path.isfile(x.outputVidFileSpec)
+            ]
+            status['status'] = 'unchanged' if cleaner.unalteredVideo else 'cleaned'
+        except Exception as e:
+            status['error'] = f'{type(e).__name__}: {e}'
+    if deadline.expired:
+        status['status'] = 'failed'
+        status['error'] = f'timed out after {job.timeout:g} seconds'
+    status['seconds'] = round(time.monotonic() - started, 3)
+    return status
+
+
+def WriteBatchStatus(fileSpec: str, results: Sequence[Dict[str, Any]]) -> None:
+    """write per-file batch results as CSV (for a .csv file) or JSON"""
+    with open(fileSpec, 'w', newline='', encoding='utf-8') as f:
+        if os.path.splitext(fileSpec)[1].lower() == '.csv':
+            writer = csv.DictWriter(f, fieldnames=BATCH_STATUS_FIELDS)
+            writer.writeheader()
+            for result in results:
+                writer.writerow({**result, 'outputs': ';'.join(result['outputs'])})
+        else:
+            json.dump(list(results), f, indent=4)
+
+
+def RunBatchJobs(
+    jobs: Sequence[argparse.Namespace],
+    workers: Optional[int] = None,
+    lexiconCacheDir: Optional[str] = None,
+    cores: Optional[int] = None,
+    order: str = SCHEDULE_ORDER_DEFAULT,
+    priorities: Optional[Sequence[int]] = None,
+    timeouts: Optional[Sequence[Optional[float]]] = None,
+    niceness: Optional[int] = None,
+    idleIo: bool = False,
+) -> List[Dict[str, Any]]:
+    """Clean every job (parsed cleanvid arguments) in a process pool, returning their results in order.
+
+Jobs are planned and started by the scheduler (see PlanJobs and RunScheduledJobs) so the ffmpeg processes
+running at once share a budget of cores (all of them by default), and are killed if they outlive their
+timeout. The profanity lists are compiled (or loaded from the lexicon cache) once in this process before
+the pool starts, and loaded once more by each pool process if it wasn't forked with them. A failed file
+is recorded and the rest of the batch carries on."""
+    coreBudget = max(cores or os.cpu_count() or 1, 1)
+    durations = [None] * len(jobs)
+    if order != 'fifo':
+        # probed in parallel (ffprobe does the work), through the probe cache when one is in use
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(32, coreBudget * 2)) as executor:
+            mediaInfos = executor.map(
+                lambda x: GetMediaInfo(x.input, ProbeCache(x.probeCache) if (x.probeCache is not None) else None),
+                jobs,
+            )
+            durations = [x.duration if (x is not None) else None for x in mediaInfos]
+    planned = PlanJobs(jobs, durations, coreBudget, order, priorities, timeouts)
+
+    lexicons = list(OrderedDict.fromkeys(LexiconSpecOf(x) for x in jobs))
+    _load_batch_lexicons(lexicons, lexiconCacheDir)
+    results = [None] * len(jobs)
+    maxJobs = max(workers or coreBudget, 1)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=maxJobs,
+        initializer=_init_batch_worker,
+        initargs=(lexicons, lexiconCacheDir, niceness, idleIo),
+    ) as executor:
+        for job, future in RunScheduledJobs(executor, planned, coreBudget, _run_batch_job, maxJobs):
+            i = job.index
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                # the pool process itself died
+                results[i] = {
+                    'input': jobs[i].input,
+                    'status': 'failed',
+                    'outputs': [],
+                    'seconds': 0.0,
+                    'error': f'{type(e).__name__}: {e}',
+                }
+            print(
+                f"[cleanvid] {results[i]['status']}: {results[i]['input']}"
+                + (f" ({results[i]['error']})" if results[i]['error'] else '')
+            )
+    return results
+
+
+def RunBatch(argv: Sequence[str]) -> int:
+    """cleanvid batch [options] <directory|glob|manifest> ... [-- <cleanvid options for every file>]"""
+    argv = list(argv)
+    sharedArgv = argv[argv.index('--') + 1 :] if ('--' in argv) else []
+    argv = argv[: argv.index('--')] if ('--' in argv) else argv
+
+    parser = argparse.ArgumentParser(
+        prog='cleanvid batch',
+        description='Clean every video under directories, matching globs or listed in CSV/JSONL manifests '
+        '(an "input" column plus per-file cleanvid options by long name). Options after -- apply to every file.',
+    )
+    parser.add_argument('inputs', nargs='+', metavar='<directory|glob|manifest>')
+    parser.add_argument(
+        '--workers',
+        help='most files cleaned in parallel (default: as many as --cores allows)',
+        metavar='<int>',
+        dest='workers',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--cores',
+        help='cores shared by the ffmpeg processes of all running jobs (default: all of them)',
+        metavar='<int>',
+        dest='cores',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--order',
+        help=f'order jobs start in: as given, shortest (estimated from probed durations) first, or by a manifest "priority" (default: {SCHEDULE_ORDER_DEFAULT})',
+        dest='order',
+        choices=SCHEDULE_ORDERS,
+        default=SCHEDULE_ORDER_DEFAULT,
+    )
+    parser.add_argument(
+        '--timeout',
+        help='kill a job (and its ffmpeg processes) still running after this many seconds, a manifest "timeout" overrides it',
+        metavar='<seconds>',
+        dest='timeout',
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        '--nice',
+        help='run jobs at this lower CPU priority (nice increment)',
+        metavar='<int>',
+        dest='niceness',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--idle-io',
+        help='run jobs in the idle I/O scheduling class (ionice -c 3)',
+        dest='idleIo',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--status',
+        help='write each file\'s status, outputs, time taken and error to this .csv or .json file',
+        metavar='<status file>',
+        dest='statusFileSpec',
+        default=None,
+    )
+    batchArgs = parser.parse_args(argv)
+
+    cleanvidParser = CleanvidArgumentParser()
+    shared = cleanvidParser.parse_args(sharedArgv)
+    if shared.input or shared.output or shared.subs or shared.subsOut:
+        parser.error('input, output and subtitle files are per file, give them in a manifest')
+
+    jobs = []
+    priorities = []
+    timeouts = []
+    results = []
+    for fileSpec, overrides in ExpandBatchInputs(batchArgs.inputs):
+        try:
+            overrides = dict(overrides)
+            priority = int(overrides.pop('priority', 0) or 0)
+            timeout = float(overrides.pop('timeout', 0) or 0) or batchArgs.timeout
+            args = cleanvidParser.parse_args(sharedArgv + OverrideArgs(cleanvidParser, overrides) + ['-i', fileSpec])
+            CheckCleanvidArgs(cleanvidParser, args)
+            jobs.append(args)
+            priorities.append(priority)
+            timeouts.append(timeout)
+            results.append(None)
+        except (ValueError, SystemExit) as e:
+            # argparse has already said what was wrong with the arguments
+            error = str(e) if isinstance(e, ValueError) else 'invalid cleanvid options'
+            logger.warning(f'Skipping {fileSpec}: {error}')
+            results.append({'input': fileSpec, 'status': 'failed', 'outputs': [], 'seconds': 0.0, 'error': error})
+
+    jobResults = iter(
+        RunBatchJobs(
+            jobs,
+            batchArgs.workers,
+            shared.lexiconCacheDir,
+            batchArgs.cores,
+            batchArgs.order,
+            priorities,
+            timeouts,
+            batchArgs.niceness,
+            batchArgs.idleIo,
+        )
+    )
+    results = [x if (x is not None) else next(jobResults) for x in results]
+    if batchArgs.statusFileSpec:
+        WriteBatchStatus(batchArgs.statusFileSpec, results)
+    counts = OrderedDict((x, sum(1 for r in results if r['status'] == x)) for x in ('cleaned', 'unchanged', 'failed'))
+    print('[cleanvid] batch: ' + ', '.join(f'{v} {k}' for k, v in counts.items()))
+    return 1 if counts['failed'] else 0
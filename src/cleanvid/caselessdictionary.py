@@ -24,6 +24,10 @@ pair as the key's value (values become dictionaries)."""
             ans[key] = val
         return str(ans)
 
+    # pickle the original (key, value) pairs, the stored wrapper dicts would be wrapped again by __setitem__
+    def __reduce__(self):
+        return (self.__class__, (list(self.items()),))
+
     # __str__ for print()
     def __str__(self):
         return self.__repr__()
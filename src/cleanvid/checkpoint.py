@@ -0,0 +1,115 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, IO, Iterator, Optional
+
+CHECKPOINT_STATE_FILENAME = 'state.json'
+# bumped when stages change what they record, so work directories left by older versions start over
+CHECKPOINT_VERSION = 1
+
+
+def PartFileSpec(fileSpec: str) -> str:
+    """the temporary name an output is written under before it is renamed into place (extension kept for ffmpeg)"""
+    base, ext = os.path.splitext(fileSpec)
+    return f'{base}.part{ext}'
+
+
+def CommitPartFile(fileSpec: str) -> None:
+    """atomically replace fileSpec with its finished temporary file"""
+    os.replace(PartFileSpec(fileSpec), fileSpec)
+
+
+@contextlib.contextmanager
+def AtomicWrite(fileSpec: str, mode: str = 'w', **kwargs) -> Iterator[IO]:
+    """open a temporary file next to fileSpec, renamed over it only once everything has been written"""
+    partFileSpec = PartFileSpec(fileSpec)
+    try:
+        with open(partFileSpec, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partFileSpec, fileSpec)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(partFileSpec)
+        raise
+
+
+def JobWorkDir(baseDir: str, inFileSpec: str, outFileSpec: str) -> str:
+    """a job's own directory under baseDir, the same for every run writing the same output from the same input"""
+    key = f'{os.path.realpath(inFileSpec)}\0{os.path.abspath(outFileSpec)}'
+    return os.path.join(baseDir, hashlib.sha1(key.encode('utf-8')).hexdigest()[:16])
+
+
+class JobCheckpoint(object):
+    """Completed stages of one job, recorded in a small JSON state file in its work directory.
+
+The state is only reused by a run of the same job: identity (the input file's size and mtime, the options
+and whatever else the outputs depend on) must match what the state was recorded with, otherwise the
+directory is emptied and the job starts over. The state file is rewritten atomically after every stage,
+so an interrupted run loses at most the stage it was in. Safe to share between threads."""
+
+    def __init__(self, workDir: str, identity: Dict[str, Any]) -> None:
+        self.workDir = workDir
+        self.identity = json.loads(json.dumps(identity, sort_keys=True, default=str))
+        self.stages = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.workDir, exist_ok=True)
+        try:
+            with open(self.path(CHECKPOINT_STATE_FILENAME), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        if isinstance(state, dict) and (state.get('version') == CHECKPOINT_VERSION) and (state.get('identity') == self.identity):
+            self.stages = OrderedDict(state.get('stages', {}))
+        else:
+            # left by another version of the job (or none at all), nothing in it can be trusted
+            for name in os.listdir(self.workDir):
+                p = self.path(name)
+                if os.path.isdir(p):
+                    shutil.rmtree(p, ignore_errors=True)
+                else:
+                    with contextlib.suppress(OSError):
+                        os.remove(p)
+
+    @property
+    def resumed(self) -> bool:
+        return len(self.stages) > 0
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.workDir, name)
+
+    def done(self, stage: str) -> bool:
+        with self._lock:
+            return stage in self.stages
+
+    def get(self, stage: str, default: Any = None) -> Any:
+        with self._lock:
+            return self.stages.get(stage, default)
+
+    def complete(self, stage: str, value: Any = True) -> None:
+        """record a stage (with whatever it needs to be picked up again) as done"""
+        with self._lock:
+            self.stages[stage] = json.loads(json.dumps(value, default=str))
+            with AtomicWrite(self.path(CHECKPOINT_STATE_FILENAME), encoding='utf-8') as f:
+                json.dump({'version': CHECKPOINT_VERSION, 'identity': self.identity, 'stages': self.stages}, f, indent=1)
+
+    def saveFile(self, name: str, data: bytes) -> str:
+        with AtomicWrite(self.path(name), 'wb') as f:
+            f.write(data)
+        return self.path(name)
+
+    def loadFile(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self.path(name), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def discard(self) -> None:
+        """remove the work directory once the job has finished"""
+        shutil.rmtree(self.workDir, ignore_errors=True)
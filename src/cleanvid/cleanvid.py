@@ -2,18 +2,20 @@
 
 import argparse
 import base64
-import chardet
 import codecs
+import concurrent.futures
 import errno
+import importlib
 import json
 import os
 import shutil
 import sys
 import re
-import pysrt
 import subprocess
 import shlex
+import tempfile
 from datetime import datetime
+from functools import lru_cache
 from subliminal import Video, download_best_subtitles, save_subtitles
 import logging
 
@@ -22,54 +24,85 @@ from babelfish import Language
 from collections import OrderedDict
 
 try:
+    from cleanvid.audioparams import AUDIO_AUTO_PARAMS, AutoAudioParams
+    from cleanvid.audiosegments import RenderSegmentedAudio, SegmentEncoder
     from cleanvid.caselessdictionary import CaselessDictionary
+    from cleanvid.checkpoint import AtomicWrite, CommitPartFile, JobCheckpoint, JobWorkDir, PartFileSpec
+    from cleanvid.fftools import FilterArgEscape, RunCommand as _run_cmd, StartCommand
+    from cleanvid.lexicon import LoadLexicon, LoadProfileLexicon
+    from cleanvid.mediainfo import MediaInfo
+    from cleanvid.mutetimeline import MuteTimeline
+    from cleanvid.pcmmute import PcmEngineAvailable, PcmMuteEngine
+    from cleanvid.probecache import ProbeCache
+    from cleanvid.subrip import FormatSrtTime, IterSrtCues, SubtitleCue, WriteSrtCues
+    from cleanvid.videochunks import EncodeVideoChunks, SmartBurnParams, SmartBurnVideo, VerifyAvSync
 except ImportError:
+    from audioparams import AUDIO_AUTO_PARAMS, AutoAudioParams
+    from audiosegments import RenderSegmentedAudio, SegmentEncoder
     from caselessdictionary import CaselessDictionary
-from itertools import tee
+    from checkpoint import AtomicWrite, CommitPartFile, JobCheckpoint, JobWorkDir, PartFileSpec
+    from fftools import FilterArgEscape, RunCommand as _run_cmd, StartCommand
+    from lexicon import LoadLexicon, LoadProfileLexicon
+    from mediainfo import MediaInfo
+    from mutetimeline import MuteTimeline
+    from pcmmute import PcmEngineAvailable, PcmMuteEngine
+    from probecache import ProbeCache
+    from subrip import FormatSrtTime, IterSrtCues, SubtitleCue, WriteSrtCues
+    from videochunks import EncodeVideoChunks, SmartBurnParams, SmartBurnVideo, VerifyAvSync
 
 __script_location__ = os.path.dirname(os.path.realpath(__file__))
+SWEARS_DEFAULT_FILESPEC = os.path.join(__script_location__, 'swears.txt')
 
 VIDEO_DEFAULT_PARAMS = '-c:v libx264 -preset slow -crf 22'
 AUDIO_DEFAULT_PARAMS = '-c:a aac -ab 224k -ar 44100'
 # for downmixing, https://superuser.com/questions/852400 was helpful
 AUDIO_DOWNMIX_FILTER = 'pan=stereo|FL=0.8*FC + 0.6*FL + 0.6*BL + 0.5*LFE|FR=0.8*FC + 0.6*FR + 0.6*BR + 0.5*LFE'
+# every mute window drives this one filter through asendcmd, so the graph doesn't grow with the mute count.
+# Commands are addressed to the filter by its type, which every ffmpeg matches (6.0 doesn't match instance
+# names given with @), so each muted chain is a filter graph of its own with no other volume filter in it.
+AUDIO_MUTE_FILTER = 'volume'
+# audio options in --audio-params that are re-scoped to each muted output stream (e.g. -c:a -> -c:a:2)
+AUDIO_STREAM_OPTIONS = {
+    '-c:a': '-c',
+    '-codec:a': '-c',
+    '-acodec': '-c',
+    '-b:a': '-b',
+    '-ab': '-b',
+    '-ar': '-ar',
+    '-ac': '-ac',
+    '-q:a': '-q',
+    '-aq': '-q',
+}
+# names of --profile lexicons, which end up in file names and filter instance names
+PROFILE_NAME_PATTERN = r'[A-Za-z0-9_-]+'
 SUBTITLE_DEFAULT_LANG = 'eng'
+# subtitle codecs ffmpeg can convert to SRT (bitmap subtitles like PGS/VobSub can't be extracted as text)
+TEXT_SUBTITLE_CODECS = {
+    'ass', 'jacosub', 'microdvd', 'mov_text', 'mpl2', 'pjs', 'realtext', 'sami', 'srt', 'ssa', 'stl', 'subrip',
+    'subviewer', 'subviewer1', 'text', 'vplayer', 'webvtt',
+}
+VIDEO_FILE_EXTENSIONS = {
+    '.avi', '.flv', '.m2ts', '.m4v', '.mkv', '.mov', '.mp4', '.mpeg', '.mpg', '.ts', '.webm', '.wmv',
+}
+# "auto" prefers cchardet (C, faster) when installed and falls back to chardet
+ENCODING_DETECTORS = ['auto', 'cchardet', 'chardet', 'charset_normalizer']
+ENCODING_DETECTOR_DEFAULT = 'auto'
+ENCODING_DETECTION_SAMPLE_BYTES = 64 * 1024
+# "filter" runs the whole selected audio track through the mute filter, "segment" re-encodes only the
+# packets around each mute and stream-copies the rest, "pcm" applies a NumPy gain envelope to decoded audio
+MUTE_ENGINES = ['filter', 'segment', 'pcm']
+MUTE_ENGINE_DEFAULT = 'filter'
 PLEX_AUTO_SKIP_DEFAULT_CONFIG = '{"markers":{},"offsets":{},"tags":{},"allowed":{"users":[],"clients":[],"keys":[]},"blocked":{"users":[],"clients":[],"keys":[]},"clients":{},"mode":{}}'
 
 
-# thanks https://docs.python.org/3/library/itertools.html#recipes
-def pairwise(iterable):
-    a, b = tee(iterable)
-    next(b, None)
-    return zip(a, b)
-
-
-def _run_cmd(cmd_list):
-    try:
-        p = subprocess.run(cmd_list, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, text=True)
-        class R:
-            pass
-
-        r = R()
-        r.return_code = p.returncode
-        r.out = p.stdout
-        r.err = p.stderr
-        return r
-    except Exception as e:
-        class R:
-            pass
-
-        r = R()
-        r.return_code = 1
-        r.out = ''
-        r.err = str(e)
-        return r
-
-
-######## GetFormatAndStreamInfo ###############################################
-def GetFormatAndStreamInfo(vidFileSpec):
+######## GetMediaInfo #########################################################
+def GetMediaInfo(vidFileSpec, probeCache=None):
     result = None
-    if os.path.isfile(vidFileSpec):
+    if isinstance(vidFileSpec, MediaInfo):
+        result = vidFileSpec
+    elif (probeCache is not None) and (cached := probeCache.get(vidFileSpec)):
+        result = MediaInfo(vidFileSpec, cached)
+    elif vidFileSpec and os.path.isfile(vidFileSpec):
         cmd = [
             'ffprobe',
             '-loglevel', 'quiet',
@@ -81,76 +114,64 @@ def GetFormatAndStreamInfo(vidFileSpec):
         ffprobeResult = _run_cmd(cmd)
         if ffprobeResult.return_code == 0:
             try:
-                result = json.loads(ffprobeResult.out)
+                result = MediaInfo(vidFileSpec, json.loads(ffprobeResult.out))
             except Exception:
                 result = None
+            if (result is not None) and (probeCache is not None):
+                probeCache.put(vidFileSpec, result.probe)
     return result
 
 
+######## FindMediaFiles #######################################################
+def FindMediaFiles(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in VIDEO_FILE_EXTENSIONS:
+                        yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+
+
+######## ProbeMediaFiles ######################################################
+# probe many files in parallel (ffprobe does the work, so threads are enough) to fill the probe cache
+def ProbeMediaFiles(paths, probeCache=None, workers=None):
+    results = OrderedDict()
+    fileSpecs = list(FindMediaFiles(paths))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 2)) as executor:
+        for fileSpec, mediaInfo in zip(fileSpecs, executor.map(lambda x: GetMediaInfo(x, probeCache), fileSpecs)):
+            results[fileSpec] = mediaInfo
+    return results
+
+
+######## GetFormatAndStreamInfo ###############################################
+def GetFormatAndStreamInfo(vidFileSpec, mediaInfo=None):
+    if (mediaInfo := mediaInfo or GetMediaInfo(vidFileSpec)) is not None:
+        return mediaInfo.probe
+    return None
+
+
 ######## GetAudioStreamsInfo ###############################################
-def GetAudioStreamsInfo(vidFileSpec):
-    result = None
-    if os.path.isfile(vidFileSpec):
-        cmd = [
-            'ffprobe',
-            '-loglevel', 'quiet',
-            '-select_streams', 'a',
-            '-show_entries', 'stream=index,codec_name,sample_rate,channel_layout:stream_tags=language',
-            '-of', 'json',
-            vidFileSpec,
-        ]
-        ffprobeResult = _run_cmd(cmd)
-        if ffprobeResult.return_code == 0:
-            try:
-                result = json.loads(ffprobeResult.out)
-            except Exception:
-                result = None
-    return result
+def GetAudioStreamsInfo(vidFileSpec, mediaInfo=None):
+    if (mediaInfo := mediaInfo or GetMediaInfo(vidFileSpec)) is not None:
+        return mediaInfo.audioStreamsInfo()
+    return None
 
 
 ######## GetStreamSubtitleMap ###############################################
-def GetStreamSubtitleMap(vidFileSpec):
-    result = None
-    if os.path.isfile(vidFileSpec):
-        cmd = [
-            'ffprobe',
-            '-loglevel', 'quiet',
-            '-select_streams', 's',
-            '-show_entries', 'stream=index:stream_tags=language',
-            '-of', 'csv=p=0',
-            vidFileSpec,
-        ]
-        ffprobeResult = _run_cmd(cmd)
-        if ffprobeResult.return_code == 0:
-            result = OrderedDict()
-            try:
-                for l in [x.split(',') for x in ffprobeResult.out.split() if x.strip()]:
-                    result[int(l[0])] = l[1]
-            except Exception:
-                result = OrderedDict()
-    return result
+def GetStreamSubtitleMap(vidFileSpec, mediaInfo=None):
+    if (mediaInfo := mediaInfo or GetMediaInfo(vidFileSpec)) is not None:
+        return mediaInfo.subtitleMap()
+    return None
 
 
 ######## HasAudioMoreThanStereo ###############################################
-def HasAudioMoreThanStereo(vidFileSpec):
-    result = False
-    if os.path.isfile(vidFileSpec):
-        cmd = [
-            'ffprobe',
-            '-loglevel', 'quiet',
-            '-select_streams', 'a',
-            '-show_entries', 'stream=channels',
-            '-of', 'csv=p=0',
-            vidFileSpec,
-        ]
-        ffprobeResult = _run_cmd(cmd)
-        if ffprobeResult.return_code == 0:
-            try:
-                counts = [int(''.join([z for z in y if z.isdigit()])) for y in list(set(ffprobeResult.out.split()))]
-                result = any(x > 2 for x in counts)
-            except Exception:
-                result = False
-    return result
+def HasAudioMoreThanStereo(vidFileSpec, mediaInfo=None):
+    if (mediaInfo := mediaInfo or GetMediaInfo(vidFileSpec)) is not None:
+        return mediaInfo.hasAudioMoreThanStereo()
+    return False
 
 
 ######## SplitLanguageIfForced #####################################################
@@ -161,111 +182,312 @@ def SplitLanguageIfForced(lang):
     return srtLanguage, srtForceIndex
 
 
-######## ExtractSubtitles #####################################################
-def ExtractSubtitles(vidFileSpec, srtLanguage):
-    subFileSpec = ""
-    srtLanguage, srtForceIndex = SplitLanguageIfForced(srtLanguage)
-    if (streamInfo := GetStreamSubtitleMap(vidFileSpec)) and (
-        stream := (
-            next(iter([k for k, v in streamInfo.items() if (v == srtLanguage)]), None)
+######## SubtitleStreamsForLanguages ##########################################
+def SubtitleStreamsForLanguages(srtLanguages, mediaInfo):
+    result = OrderedDict()
+    textStreams = OrderedDict(
+        (x.index, x.language)
+        for x in mediaInfo.subtitleStreams
+        if (x.index is not None) and ((not x.codecName) or (x.codecName in TEXT_SUBTITLE_CODECS))
+    )
+    for lang in srtLanguages:
+        srtLanguage, srtForceIndex = SplitLanguageIfForced(lang)
+        if srtLanguage in result:
+            continue
+        stream = (
+            next(iter([k for k, v in textStreams.items() if (v == srtLanguage)]), None)
             if not srtForceIndex
             else srtForceIndex
         )
-    ):
+        if stream is not None:
+            result[srtLanguage] = stream
+    return result
+
+
+def _read_fd(fd):
+    with os.fdopen(fd, 'rb') as f:
+        return f.read()
+
+
+######## ExtractSubtitlesText #################################################
+# extract the subtitle stream for each of several languages with a single read of the input: every
+# wanted text subtitle stream is mapped to its own SRT output, which ffmpeg writes to its own pipe
+# (nothing touches the disk), and no audio/video stream is mapped (so nothing else is ever decoded)
+def ExtractSubtitlesText(vidFileSpec, srtLanguages, mediaInfo=None):
+    result = OrderedDict()
+    if not (mediaInfo := mediaInfo or GetMediaInfo(vidFileSpec)):
+        return result
+    if not (streams := SubtitleStreamsForLanguages(srtLanguages, mediaInfo)):
+        return result
+    cmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-nostats',
+        '-loglevel', 'error',
+        '-i',
+        vidFileSpec,
+    ]
+    if os.name == 'posix':
+        pipes = OrderedDict()
+        proc = None
+        try:
+            for srtLanguage, stream in streams.items():
+                pipes[srtLanguage] = os.pipe()
+                cmd += ['-map', f'0:{stream}', '-c:s', 'srt', '-f', 'srt', f'pipe:{pipes[srtLanguage][1]}']
+            proc = StartCommand(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                pass_fds=[w for r, w in pipes.values()],
+            )
+        except Exception as e:
+            logger.error(f'Could not extract subtitles from {vidFileSpec}: {e}')
+            for r, w in pipes.values():
+                os.close(r)
+        finally:
+            for r, w in pipes.values():
+                os.close(w)
+        if proc is not None:
+            # the pipes must all be drained at once, ffmpeg interleaves its writes to them
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(pipes)) as executor:
+                readers = OrderedDict((k, executor.submit(_read_fd, r)) for k, (r, w) in pipes.items())
+                err = proc.stderr.read().decode('utf-8', errors='replace')
+                proc.wait()
+                for srtLanguage, reader in readers.items():
+                    raw = reader.result()
+                    if (proc.returncode == 0) and raw:
+                        result[srtLanguage] = raw
+            if proc.returncode != 0:
+                logger.error(' '.join(shlex.quote(x) for x in cmd))
+                logger.error(err)
+    else:
+        for srtLanguage, stream in streams.items():
+            try:
+                p = subprocess.run(
+                    cmd + ['-map', f'0:{stream}', '-c:s', 'srt', '-f', 'srt', 'pipe:1'],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    check=False,
+                )
+            except Exception as e:
+                logger.error(f'Could not extract subtitles from {vidFileSpec}: {e}')
+                break
+            if (p.returncode == 0) and p.stdout:
+                result[srtLanguage] = p.stdout
+    return result
+
+
+######## ExtractSubtitles #####################################################
+# one language's embedded subtitles as SRT bytes (None if the video has none), nothing is written to disk
+def ExtractSubtitles(vidFileSpec, srtLanguage, mediaInfo=None):
+    return ExtractSubtitlesText(vidFileSpec, [srtLanguage], mediaInfo).get(SplitLanguageIfForced(srtLanguage)[0], None)
+
+
+######## DownloadSubtitles ####################################################
+def DownloadSubtitles(vidFileSpec, srtLanguage):
+    subFileSpec = ""
+    if os.path.isfile(vidFileSpec):
         subFileParts = os.path.splitext(vidFileSpec)
-        subFileSpec = subFileParts[0] + "." + srtLanguage + ".srt"
-        cmd = [
-            'ffmpeg',
-            '-hide_banner',
-            '-nostats',
-            '-loglevel', 'error',
-            '-y',
-            '-i',
-            vidFileSpec,
-            '-map',
-            f'0:{stream}',
-            subFileSpec,
-        ]
-        ffmpegResult = _run_cmd(cmd)
-        if (ffmpegResult.return_code != 0) or (not os.path.isfile(subFileSpec)):
-            subFileSpec = ""
+        srtLanguage, srtForceIndex = SplitLanguageIfForced(srtLanguage)
+        subFileSpec = subFileParts[0] + "." + str(Language(srtLanguage)) + ".srt"
+        if not os.path.isfile(subFileSpec):
+            video = Video.fromname(vidFileSpec)
+            bestSubtitles = download_best_subtitles([video], {Language(srtLanguage)})
+            savedSub = save_subtitles(video, [bestSubtitles[video][0]])
+
+    if subFileSpec and (not os.path.isfile(subFileSpec)):
+        subFileSpec = ""
+
     return subFileSpec
 
 
 ######## GetSubtitles #########################################################
-def GetSubtitles(vidFileSpec, srtLanguage, offline=False):
-    subFileSpec = ExtractSubtitles(vidFileSpec, srtLanguage)
-    if not os.path.isfile(subFileSpec):
-        if offline:
-            subFileSpec = ""
-        else:
-            if os.path.isfile(vidFileSpec):
-                subFileParts = os.path.splitext(vidFileSpec)
-                srtLanguage, srtForceIndex = SplitLanguageIfForced(srtLanguage)
-                subFileSpec = subFileParts[0] + "." + str(Language(srtLanguage)) + ".srt"
-                if not os.path.isfile(subFileSpec):
-                    video = Video.fromname(vidFileSpec)
-                    bestSubtitles = download_best_subtitles([video], {Language(srtLanguage)})
-                    savedSub = save_subtitles(video, [bestSubtitles[video][0]])
-
-            if subFileSpec and (not os.path.isfile(subFileSpec)):
-                subFileSpec = ""
+# a video's subtitles in one language as SRT bytes: the embedded ones, otherwise (unless offline) downloaded
+# ones, None if there are neither
+def GetSubtitles(vidFileSpec, srtLanguage, offline=False, mediaInfo=None):
+    raw = ExtractSubtitles(vidFileSpec, srtLanguage, mediaInfo)
+    if (raw is None) and (not offline) and (subFileSpec := DownloadSubtitles(vidFileSpec, srtLanguage)):
+        with open(subFileSpec, 'rb') as f:
+            raw = f.read()
+    return raw
+
+
+######## DetectEncoding #######################################################
+# tiered encoding detection: a BOM or a clean strict UTF-8 decode settle almost every subtitle file
+# immediately, only what's left is handed to a statistical detector and then only a bounded sample
+def DetectEncoding(raw, detector=ENCODING_DETECTOR_DEFAULT):
+    for bom, encoding in (
+        (codecs.BOM_UTF32_LE, 'utf-32'),
+        (codecs.BOM_UTF32_BE, 'utf-32'),
+        (codecs.BOM_UTF8, 'utf-8-sig'),
+        (codecs.BOM_UTF16_LE, 'utf-16'),
+        (codecs.BOM_UTF16_BE, 'utf-16'),
+    ):
+        if raw.startswith(bom):
+            return encoding, 'bom'
+    try:
+        raw.decode('utf-8')
+        return 'utf-8', 'utf-8'
+    except UnicodeDecodeError:
+        pass
 
-    return subFileSpec
+    sample = raw[:ENCODING_DETECTION_SAMPLE_BYTES]
+    for backend in ('cchardet', 'chardet') if (detector == 'auto') else (detector,):
+        try:
+            module = importlib.import_module(backend)
+        except ImportError:
+            continue
+        if backend == 'charset_normalizer':
+            best = module.from_bytes(sample).best()
+            encoding = best.encoding if best else None
+        else:
+            detected = module.detect(sample)
+            encoding = detected.get('encoding') if isinstance(detected, dict) else None
+        return (encoding or 'utf-8'), backend
 
+    return 'utf-8', 'fallback'
 
-######## UTF8Convert #########################################################
-# attempt to convert any text file to UTF-* without BOM and normalize line endings
-def UTF8Convert(fileSpec, universalEndline=True):
-    # Read from file
-    with open(fileSpec, 'rb') as f:
-        raw = f.read()
 
+######## DecodeSubtitleBytes ##################################################
+# attempt to decode any text to a str without BOM and with normalized line endings
+def DecodeSubtitleBytes(raw, universalEndline=True, encoding=None):
     # Decode (use detected encoding or fallback to utf-8)
-    detected = chardet.detect(raw)
-    encoding = detected.get('encoding') if isinstance(detected, dict) else None
     if not encoding:
-        encoding = 'utf-8'
-    raw = raw.decode(encoding, errors='replace')
+        encoding, method = DetectEncoding(raw)
+    try:
+        text = raw.decode(encoding, errors='replace')
+    except LookupError:
+        text = raw.decode('utf-8', errors='replace')
 
     # Remove windows line endings
     if universalEndline:
-        raw = raw.replace('\r\n', '\n')
-
-    # Encode to UTF-8
-    raw = raw.encode('utf8')
+        text = text.replace('\r\n', '\n')
 
     # Remove BOM
-    if raw.startswith(codecs.BOM_UTF8):
-        raw = raw.replace(codecs.BOM_UTF8, '', 1)
+    if text.startswith('\ufeff'):
+        text = text[1:]
+
+    return text
+
+
+######## MutedCues ############################################################
+def MutedCues(cues, scrubbed, padMillisec=0):
+    # for each subtitle in the set
+    # if text contains profanity...
+    # OR if the next text contains profanity and lies within the pad ...
+    # OR if the previous text contained profanity and lies within the pad ...
+    # then yield its index and mute window (padded if it was the one containing profanity)
+    for i, sub in enumerate(cues):
+        if scrubbed[i]:
+            yield i, [sub.start - padMillisec, sub.end + padMillisec]
+        elif (padMillisec > 0) and (
+            ((i + 1 < len(cues)) and scrubbed[i + 1] and ((cues[i + 1].start - sub.end) <= padMillisec))
+            or ((i > 0) and scrubbed[i - 1] and ((sub.start - cues[i - 1].end) <= padMillisec))
+        ):
+            yield i, [sub.start, sub.end]
+
+
+######## AudioStreamParams ####################################################
+def AudioStreamParams(aParams, outputIndex, stream=None, channels=None, scopedOnly=False):
+    # --audio-params for a single output audio stream: audio options (the bit rate exactly as given) are
+    # scoped to that stream, other options are kept unless scopedOnly. "auto" derives everything from the
+    # source stream instead.
+    if aParams.strip().lower() == AUDIO_AUTO_PARAMS:
+        if stream is not None:
+            return AutoAudioParams(stream, outputIndex, channels)
+        aParams = AUDIO_DEFAULT_PARAMS
+    args = shlex.split(aParams)
+    result = []
+    i = 0
+    while i < len(args):
+        if (option := AUDIO_STREAM_OPTIONS.get(args[i], None)) and (i + 1 < len(args)):
+            result += [f'{option}:a:{outputIndex}', args[i + 1]]
+            i += 2
+        else:
+            if not scopedOnly:
+                result.append(args[i])
+            i += 1
+    return result
+
 
-    # Write to file
+######## UTF8Convert #########################################################
+# attempt to convert any text file to UTF-* without BOM and normalize line endings
+def UTF8Convert(fileSpec, universalEndline=True, detector=ENCODING_DETECTOR_DEFAULT):
+    with open(fileSpec, 'rb') as f:
+        raw = f.read()
+
+    encoding, method = DetectEncoding(raw, detector)
     with open(fileSpec, 'wb') as f:
-        f.write(raw)
+        f.write(DecodeSubtitleBytes(raw, universalEndline, encoding).encode('utf8'))
+
+    return encoding, method
+
+
+######## ProfileFileSpec ######################################################
+def ProfileFileSpec(fileSpec, profile):
+    # a lexicon profile's own copy of an output file, e.g. movie_clean.mkv -> movie_clean.mild.mkv
+    if (not fileSpec) or (profile is None):
+        return fileSpec
+    fileParts = os.path.splitext(fileSpec)
+    return fileParts[0] + "." + profile + fileParts[1]
+
+
+#################################################################################
+class CleanVariant(object):
+    """One lexicon profile's mute windows and output files (profile None when there is just the one list)."""
+
+    __slots__ = (
+        'profile',
+        'outputVidFileSpec',
+        'cleanSubsFileSpec',
+        'edlFileSpec',
+        'jsonFileSpec',
+        'muteTimeline',
+        'languageTimelines',
+    )
+
+    def __init__(
+        self,
+        profile,
+        outputVidFileSpec="",
+        cleanSubsFileSpec="",
+        edlFileSpec="",
+        jsonFileSpec="",
+        muteTimeline=None,
+        languageTimelines=None,
+    ):
+        self.profile = profile
+        self.outputVidFileSpec = outputVidFileSpec
+        self.cleanSubsFileSpec = cleanSubsFileSpec
+        self.edlFileSpec = edlFileSpec
+        self.jsonFileSpec = jsonFileSpec
+        self.muteTimeline = muteTimeline if (muteTimeline is not None) else MuteTimeline()
+        self.languageTimelines = languageTimelines or {}
 
 
 #################################################################################
 class VidCleaner(object):
-            @staticmethod
-            def strip_subtitle_tags(text):
-                import re
-                return re.sub(r'\{[^}]+\}', '', text)
-        muteAudioIndex = 0
     inputVidFileSpec = ""
     inputSubsFileSpec = ""
+    inputSubsText = None
+    subsEncoding = None
+    encodingDetector = ENCODING_DETECTOR_DEFAULT
     cleanSubsFileSpec = ""
     edlFileSpec = ""
     jsonFileSpec = ""
-    tmpSubsFileSpec = ""
     assSubsFileSpec = ""
     outputVidFileSpec = ""
     swearsFileSpec = ""
+    swearsProfiles = None
     swearsPadMillisec = 0
     embedSubs = False
     fullSubs = False
     subsOnly = False
     edl = False
     hardCode = False
+    smartBurn = False
     reEncodeVideo = False
     reEncodeAudio = False
     unalteredVideo = False
@@ -278,10 +500,31 @@ class VidCleaner(object):
     threadsEncoding = None
     plexAutoSkipJson = ""
     plexAutoSkipId = ""
+    muteAudioIndex = None
+    mediaInfo = None
     swearsMap = CaselessDictionary({})
-    muteTimeList = []
+    lexicon = None
+    lexiconCacheDir = None
+    muteEngine = MUTE_ENGINE_DEFAULT
+    encodeWorkers = None
+    cueMatches = None
+    muteTimeline = MuteTimeline()
+    muteAudioStreams = None
+    languageSubs = None
+    audioOnly = False
+    mpvEdl = False
+    mpvEdlFileSpec = ""
+    languageTimelines = {}
+    variants = None
+    muteCommandsFileSpec = ""
+    workDir = None
+    checkpoint = None
     jsonDumpList = None
 
+    @staticmethod
+    def strip_subtitle_tags(text):
+        return re.sub(r'\{[^}]+\}', '', text)
+
     ######## init #################################################################
 
     def __init__(
@@ -309,6 +552,20 @@ class VidCleaner(object):
         threadsEncoding=None,
         plexAutoSkipJson="",
         plexAutoSkipId="",
+        muteAudioIndex=None,
+        mediaInfo=None,
+        subsText=None,
+        encodingDetector=ENCODING_DETECTOR_DEFAULT,
+        lexiconCacheDir=None,
+        muteEngine=MUTE_ENGINE_DEFAULT,
+        encodeWorkers=None,
+        smartBurn=False,
+        muteAudioStreams=None,
+        languageSubs=None,
+        audioOnly=False,
+        mpvEdl=False,
+        swearsProfiles=None,
+        checkpoint=None,
     ):
         if (iVidFileSpec is not None) and os.path.isfile(iVidFileSpec):
             self.inputVidFileSpec = iVidFileSpec
@@ -317,23 +574,36 @@ class VidCleaner(object):
 
         if (iSubsFileSpec is not None) and os.path.isfile(iSubsFileSpec):
             self.inputSubsFileSpec = iSubsFileSpec
+        self.inputSubsText = subsText
+        self.encodingDetector = encodingDetector
+        self.lexiconCacheDir = lexiconCacheDir
+        self.muteEngine = muteEngine
+        self.encodeWorkers = encodeWorkers
+        self.muteAudioStreams = muteAudioStreams
+        self.languageSubs = languageSubs
+        self.languageTimelines = {}
+        self.audioOnly = audioOnly
+        self.mpvEdl = mpvEdl
+        self.checkpoint = checkpoint
 
         if (iSwearsFileSpec is not None) and os.path.isfile(iSwearsFileSpec):
-        muteAudioIndex=0,
             self.swearsFileSpec = iSwearsFileSpec
         else:
-        self.muteAudioIndex = muteAudioIndex
             raise IOError(errno.ENOENT, os.strerror(errno.ENOENT), iSwearsFileSpec)
-
+        for profile, profileFileSpec in (swearsProfiles or {}).items():
+            if not re.fullmatch(PROFILE_NAME_PATTERN, profile):
+                raise ValueError(f'Invalid lexicon profile name {profile}')
+            if not os.path.isfile(profileFileSpec):
+                raise IOError(errno.ENOENT, os.strerror(errno.ENOENT), profileFileSpec)
+        self.swearsProfiles = swearsProfiles or None
+
+        # existing outputs are left alone until they are replaced (every output is written under a temporary
+        # name and renamed over the old one) or turn out not to be wanted
         if (oVidFileSpec is not None) and (len(oVidFileSpec) > 0):
             self.outputVidFileSpec = oVidFileSpec
-            if os.path.isfile(self.outputVidFileSpec):
-                os.remove(self.outputVidFileSpec)
 
         if (oSubsFileSpec is not None) and (len(oSubsFileSpec) > 0):
             self.cleanSubsFileSpec = oSubsFileSpec
-            if os.path.isfile(self.cleanSubsFileSpec):
-                os.remove(self.cleanSubsFileSpec)
 
         self.swearsPadMillisec = round(swearsPadSec * 1000.0)
         self.embedSubs = embedSubs
@@ -346,6 +616,7 @@ class VidCleaner(object):
         self.reEncodeVideo = reEncodeVideo
         self.reEncodeAudio = reEncodeAudio
         self.hardCode = hardCode
+        self.smartBurn = smartBurn
         self.subsLang = subsLang
         self.vParams = vParams
         self.audioStreamIdx = audioStreamIdx
@@ -353,6 +624,8 @@ class VidCleaner(object):
         self.aDownmix = aDownmix
         self.threadsInput = threadsInput
         self.threadsEncoding = threadsEncoding
+        self.muteAudioIndex = muteAudioIndex
+        self.mediaInfo = mediaInfo
         if self.vParams.startswith('base64:'):
             self.vParams = base64.b64decode(self.vParams[7:]).decode('utf-8')
         if self.aParams.startswith('base64:'):
@@ -361,40 +634,105 @@ class VidCleaner(object):
     ######## del ##################################################################
     def __del__(self):
         try:
-            if (not getattr(self, 'outputVidFileSpec', None) or not os.path.isfile(self.outputVidFileSpec)) and (
-                not getattr(self, 'unalteredVideo', False)
-            ):
-                for p in (getattr(self, 'cleanSubsFileSpec', None), getattr(self, 'edlFileSpec', None), getattr(self, 'jsonFileSpec', None)):
-                    try:
-                        if p and os.path.isfile(p):
-                            os.remove(p)
-                    except OSError:
-                        logger.debug(f'Could not remove file during cleanup: {p}')
-            for p in (getattr(self, 'tmpSubsFileSpec', None), getattr(self, 'assSubsFileSpec', None)):
+            # each lexicon profile's files go if its output wasn't written (a checkpointed job keeps them for the
+            # rerun picking it up)
+            variants = (getattr(self, 'variants', None) or [self]) if (getattr(self, 'checkpoint', None) is None) else []
+            for variant in variants:
+                outputVidFileSpec = getattr(variant, 'outputVidFileSpec', None)
+                if (not outputVidFileSpec or not os.path.isfile(outputVidFileSpec)) and (
+                    not getattr(self, 'unalteredVideo', False)
+                ):
+                    for p in (getattr(variant, 'cleanSubsFileSpec', None), getattr(variant, 'edlFileSpec', None), getattr(variant, 'jsonFileSpec', None)):
+                        try:
+                            if p and os.path.isfile(p):
+                                os.remove(p)
+                        except OSError:
+                            logger.debug(f'Could not remove file during cleanup: {p}')
+            for p in (getattr(self, 'assSubsFileSpec', None),):
                 try:
                     if p and os.path.isfile(p):
                         os.remove(p)
                 except OSError:
                     logger.debug(f'Could not remove file during cleanup: {p}')
+            if getattr(self, 'workDir', None):
+                shutil.rmtree(self.workDir, ignore_errors=True)
         except Exception as e:
             logger.debug(f'Exception in __del__: {e}')
 
+    ######## GetWorkDir ###########################################################
+    def GetWorkDir(self):
+        # scratch space for intermediate files (filter commands, etc.) that don't belong next to the media,
+        # kept between runs for a checkpointed job
+        if self.checkpoint is not None:
+            return self.checkpoint.workDir
+        if self.workDir is None:
+            self.workDir = tempfile.mkdtemp(prefix='cleanvid-')
+        return self.workDir
+
+    ######## GetInputMediaInfo ####################################################
+    def GetInputMediaInfo(self):
+        if self.mediaInfo is None:
+            self.mediaInfo = GetMediaInfo(self.inputVidFileSpec)
+        return self.mediaInfo
+
+    def _scrub_cues(self, cues):
+        # per lexicon profile (None without --profile): (per-cue matches, cleaned texts, whether each cue's
+        # text changed), all profiles from a single scan
+        scrubs = {}
+        for profile, matches in self.lexicon.scanProfiles([sub.text for sub in cues]).items():
+            newTexts = [
+                # Strip formatting tags from cleaned text
+                self.strip_subtitle_tags(self.lexicon.applyMatches(sub.text, cueMatches, profile))
+                for sub, cueMatches in zip(cues, matches)
+            ]
+            scrubs[profile] = (matches, newTexts, [newText != sub.text for sub, newText in zip(cues, newTexts)])
+        return scrubs
+
+    def _clip_timeline(self, timeline):
+        if (self.mediaInfo is not None) and (self.mediaInfo.duration is not None):
+            return timeline.clip(round(self.mediaInfo.duration * 1000.0))
+        return timeline
+
     ######## CreateCleanSubAndMuteList #################################################
     def CreateCleanSubAndMuteList(self):
-        if (self.inputSubsFileSpec is None) or (not os.path.isfile(self.inputSubsFileSpec)):
+        # subtitles are read (or extracted from the video over a pipe) and decoded in memory,
+        # only the requested outputs are ever written
+        if self.inputSubsText is not None:
+            raw = self.inputSubsText
+        elif self.inputSubsFileSpec and os.path.isfile(self.inputSubsFileSpec):
+            with open(self.inputSubsFileSpec, 'rb') as f:
+                raw = f.read()
+        else:
+            raw = ExtractSubtitlesText(self.inputVidFileSpec, [self.subsLang], self.GetInputMediaInfo()).get(
+                SplitLanguageIfForced(self.subsLang)[0], None
+            )
+        if not raw:
             raise IOError(
                 errno.ENOENT,
                 f"Input subtitle file unspecified or not found ({os.strerror(errno.ENOENT)})",
                 self.inputSubsFileSpec,
             )
+        if isinstance(raw, bytes):
+            encoding, method = DetectEncoding(raw, self.encodingDetector)
+            self.subsEncoding = {'encoding': encoding, 'detector': method}
+            if method not in ('bom', 'utf-8'):
+                logger.info(f'{self.inputSubsFileSpec or self.inputVidFileSpec}: subtitle encoding {encoding} detected by {method}')
+            subsText = DecodeSubtitleBytes(raw, encoding=encoding)
+        else:
+            subsText = raw.replace('\r\n', '\n').lstrip('\ufeff')
 
-        subFileParts = os.path.splitext(self.inputSubsFileSpec)
-
-        self.tmpSubsFileSpec = subFileParts[0] + "_utf8" + subFileParts[1]
-        shutil.copy2(self.inputSubsFileSpec, self.tmpSubsFileSpec)
-        UTF8Convert(self.tmpSubsFileSpec)
+        if self.inputSubsFileSpec:
+            subFileParts = os.path.splitext(self.inputSubsFileSpec)
+        else:
+            subFileParts = (
+                os.path.splitext(self.inputVidFileSpec)[0] + "." + SplitLanguageIfForced(self.subsLang)[0],
+                ".srt",
+            )
 
-        if not self.cleanSubsFileSpec:
+        if (not self.cleanSubsFileSpec) and self.audioOnly and self.outputVidFileSpec:
+            # nothing is written next to the (possibly read-only) media, the subtitles go with the sidecar
+            self.cleanSubsFileSpec = os.path.splitext(self.outputVidFileSpec)[0] + ".srt"
+        elif not self.cleanSubsFileSpec:
             self.cleanSubsFileSpec = subFileParts[0] + "_clean" + subFileParts[1]
 
         if not self.edlFileSpec:
@@ -405,235 +743,209 @@ class VidCleaner(object):
             cleanSubFileParts = os.path.splitext(self.cleanSubsFileSpec)
             self.jsonFileSpec = cleanSubFileParts[0] + '.json'
 
-        lines = []
+        if self._restore_clean_variants():
+            return
 
-        with open(self.swearsFileSpec) as f:
-            lines = [line.rstrip('\n') for line in f]
+        # compiled matcher comes from the lexicon cache unless the swears file has changed
+        if self.swearsProfiles:
+            self.lexicon = LoadProfileLexicon(self.swearsProfiles, self.lexiconCacheDir)
+        else:
+            self.lexicon = LoadLexicon(self.swearsFileSpec, self.lexiconCacheDir)
+        self.swearsMap = self.lexicon.swearsMap
+
+        # every cue's text is scanned once, in a single pass over all of them (and for every profile),
+        # before any pad/neighbour logic runs; the per-cue match table is kept for the outputs that report on it
+        cues = list(IterSrtCues(subsText))
+        scrubs = self._scrub_cues(cues)
+
+        # subtitles in other languages give the audio tracks in those languages their own mute windows
+        languageScrubs = {}
+        for lang, langRaw in (self.languageSubs or {}).items():
+            if isinstance(langRaw, bytes):
+                langRaw = DecodeSubtitleBytes(langRaw, encoding=DetectEncoding(langRaw, self.encodingDetector)[0])
+            langCues = list(IterSrtCues(langRaw))
+            languageScrubs[lang] = (langCues, self._scrub_cues(langCues))
+
+        # each profile gets its own clean subtitles, mute windows and reports, named after it
+        self.variants = []
+        for profile, (cueMatches, newTexts, scrubbed) in scrubs.items():
+            variant = CleanVariant(
+                profile,
+                ProfileFileSpec(self.outputVidFileSpec, profile),
+                ProfileFileSpec(self.cleanSubsFileSpec, profile),
+                ProfileFileSpec(self.edlFileSpec, profile),
+                ProfileFileSpec(self.jsonFileSpec, profile),
+            )
+            edits = self._write_clean_variant(variant, cues, cueMatches, newTexts, scrubbed)
+            variant.languageTimelines = {
+                lang: self._clip_timeline(
+                    MuteTimeline(x for _, x in MutedCues(langCues, langScrubs[profile][2], self.swearsPadMillisec))
+                )
+                for lang, (langCues, langScrubs) in languageScrubs.items()
+            }
+            if not self.variants:
+                self.cueMatches, self.muteTimeline, self.languageTimelines = (
+                    cueMatches,
+                    variant.muteTimeline,
+                    variant.languageTimelines,
+                )
+                if self.jsonDumpList is not None:
+                    self.jsonDumpList = edits
+            self.variants.append(variant)
+
+        if self.plexAutoSkipId and self.plexAutoSkipJson and self.muteTimeline:
+            # a PlexAutoSkip file describes one set of markers, the (first) profile's
+            plexDict = json.loads(PLEX_AUTO_SKIP_DEFAULT_CONFIG)
+            plexDict["markers"][self.plexAutoSkipId] = self.muteTimeline.toPlexMarkers("volume")
+            plexDict["mode"][self.plexAutoSkipId] = "volume"
+            with AtomicWrite(self.plexAutoSkipJson) as plexFile:
+                json.dump(plexDict, plexFile, indent=4)
 
-        for line in lines:
-            lineMap = line.split("|")
-            if len(lineMap) > 1:
-                self.swearsMap[lineMap[0]] = lineMap[1]
-            else:
-                self.swearsMap[lineMap[0]] = "*****"
+        if self.checkpoint is not None:
+            self.checkpoint.complete(
+                'clean',
+                [
+                    {
+                        'profile': x.profile,
+                        'mutes': list(x.muteTimeline),
+                        'languages': {lang: list(timeline) for lang, timeline in x.languageTimelines.items()},
+                    }
+                    for x in self.variants
+                ],
+            )
 
-        # Build matcher: Aho–Corasick preferred, else regex
-        try:
-            import ahocorasick
-            A = ahocorasick.Automaton()
-            keys = sorted(list(self.swearsMap.keys()), key=lambda x: -len(x))
-            for k in keys:
-                A.add_word(k.lower(), k)
-            A.make_automaton()
-            use_aho = True
-        except Exception:
-            use_aho = False
-            escaped_keys = [re.escape(k) for k in sorted(list(self.swearsMap.keys()), key=lambda x: -len(x))]
-            pattern = r'\b(' + '|'.join(escaped_keys) + r')\b' if escaped_keys else r'$^'
-            replacer = re.compile(pattern, re.IGNORECASE)
-
-        def _is_word_boundary(lowtext, start, end):
-            left = start - 1
-            right = end
-            left_ok = (left < 0) or (not lowtext[left].isalnum())
-            right_ok = (right >= len(lowtext)) or (not lowtext[right].isalnum())
-            return left_ok and right_ok
-
-        def _apply_aho(text):
-            low = text.lower()
-            matches = []
-            for end_idx, key in A.iter(low):
-                klen = len(key)
-                start_idx = end_idx - klen + 1
-                if _is_word_boundary(low, start_idx, end_idx + 1):
-                    matches.append((start_idx, end_idx + 1, key))
-            if not matches:
-                return text
-            matches.sort(key=lambda x: (x[0], -(x[1] - x[0])))
-            res = []
-            last = 0
-            for s, e, key in matches:
-                if s < last:
-                    continue
-                res.append(text[last:s])
-                replacement = self.swearsMap.get(key, '*****')
-                res.append(replacement)
-                last = e
-            res.append(text[last:])
-            return ''.join(res)
-
-        subs = pysrt.open(self.tmpSubsFileSpec)
-        newSubs = pysrt.SubRipFile()
+    def _restore_clean_variants(self):
+        # a checkpointed job past this stage picks its mute plan back up, as long as the clean subtitles (and
+        # EDL, JSON and PlexAutoSkip files) it wrote are all still there
+        if (self.checkpoint is None) or (not self.checkpoint.done('clean')):
+            return False
+        variants = []
+        for state in self.checkpoint.get('clean'):
+            profile = state['profile']
+            variant = CleanVariant(
+                profile,
+                ProfileFileSpec(self.outputVidFileSpec, profile),
+                ProfileFileSpec(self.cleanSubsFileSpec, profile),
+                ProfileFileSpec(self.edlFileSpec, profile),
+                ProfileFileSpec(self.jsonFileSpec, profile),
+                MuteTimeline(state['mutes']),
+                {lang: MuteTimeline(x) for lang, x in state['languages'].items()},
+            )
+            written = [variant.cleanSubsFileSpec]
+            if self.edl and variant.muteTimeline:
+                written.append(variant.edlFileSpec)
+            if self.jsonDumpList is not None:
+                written.append(variant.jsonFileSpec)
+            if not all(os.path.isfile(x) for x in written):
+                return False
+            variants.append(variant)
+        if (not variants) or (self.plexAutoSkipId and self.plexAutoSkipJson and variants[0].muteTimeline and not os.path.isfile(self.plexAutoSkipJson)):
+            return False
+        self.variants = variants
+        self.muteTimeline, self.languageTimelines = variants[0].muteTimeline, variants[0].languageTimelines
+        if self.jsonDumpList is not None:
+            with open(variants[0].jsonFileSpec, 'r') as f:
+                self.jsonDumpList = json.load(f).get('edits', [])
+        return True
+
+    def _write_clean_variant(self, variant, cues, cueMatches, newTexts, scrubbed):
+        # writes a profile's clean subtitles (and EDL/JSON if asked for) and fills in its mute timeline,
+        # returns its JSON edits (None if not dumping)
+        mutedCues = dict(MutedCues(cues, scrubbed, self.swearsPadMillisec))
         newTimestampPairs = []
+        edits = [] if (self.jsonDumpList is not None) else None
+
+        # muted subtitles make up the new set (along with the rest if full subtitles were asked for)
+        def _clean_cues():
+            for i, sub in enumerate(cues):
+                if i in mutedCues:
+                    if scrubbed[i] and (edits is not None):
+                        edits.append(
+                            {
+                                'old': sub.text,
+                                'new': newTexts[i],
+                                'start': FormatSrtTime(sub.start),
+                                'end': FormatSrtTime(sub.end),
+                                'matches': [key for s, e, key in cueMatches[i]],
+                            }
+                        )
+                    newTimestampPairs.append(mutedCues[i])
+                    # the parsed cues are shared by every profile, so they are left as they were
+                    yield SubtitleCue(sub.index, sub.start, sub.end, newTexts[i], sub.position)
+                elif self.fullSubs:
+                    yield sub
 
-        # append a dummy sub at the very end so that pairwise can peek and see nothing
-        subs.append(
-            pysrt.SubRipItem(
-                index=len(subs) + 1,
-                start=(subs[-1].end.seconds if subs else 0) + 1,
-                end=(subs[-1].end.seconds if subs else 0) + 2,
-                text='Fin',
-            )
-        )
+        with AtomicWrite(variant.cleanSubsFileSpec, encoding='utf-8', newline='') as f:
+            WriteSrtCues(_clean_cues(), f)
 
-        # for each subtitle in the set
-        # if text contains profanity...
-        # OR if the next text contains profanity and lies within the pad ...
-        # OR if the previous text contained profanity and lies within the pad ...
-        # then include the subtitle in the new set
-        prevNaughtySub = None
-        for sub, subPeek in pairwise(subs):
-            if use_aho:
-                newText = _apply_aho(sub.text)
-                newTextPeek = _apply_aho(subPeek.text) if (subPeek is not None) else None
-            else:
-                newText = replacer.sub(lambda x: self.swearsMap[x.group()], sub.text)
-                newTextPeek = (
-                    replacer.sub(lambda x: self.swearsMap[x.group()], subPeek.text) if (subPeek is not None) else None
-                )
-            # Strip formatting tags from cleaned text
-            newText = self.strip_subtitle_tags(newText)
-            if newTextPeek is not None:
-                newTextPeek = self.strip_subtitle_tags(newTextPeek)
-            # this sub contains profanity, or
-            if (
-                (newText != sub.text)
-                or
-                # we have defined a pad, and
-                (
-                    (self.swearsPadMillisec > 0)
-                    and (newTextPeek is not None)
-                    and
-                    # the next sub contains profanity and is within pad seconds of this one, or
-                    (
-                        (
-                            (newTextPeek != subPeek.text)
-                            and ((subPeek.start.ordinal - sub.end.ordinal) <= self.swearsPadMillisec)
-                        )
-                        or
-                        # the previous sub contained profanity and is within pad seconds of this one
-                        (
-                            (prevNaughtySub is not None)
-                            and ((sub.start.ordinal - prevNaughtySub.end.ordinal) <= self.swearsPadMillisec)
-                        )
-                    )
-                )
-            ):
-                subScrubbed = newText != sub.text
-                if subScrubbed and (self.jsonDumpList is not None):
-                    self.jsonDumpList.append(
-                        {
-                            'old': sub.text,
-                            'new': newText,
-                            'start': str(sub.start),
-                            'end': str(sub.end),
-                        }
-                    )
-                newSub = sub
-                newSub.text = newText
-                newSubs.append(newSub)
-                if subScrubbed:
-                    prevNaughtySub = sub
-                    newTimes = [
-                        pysrt.SubRipTime.from_ordinal(sub.start.ordinal - self.swearsPadMillisec).to_time(),
-                        pysrt.SubRipTime.from_ordinal(sub.end.ordinal + self.swearsPadMillisec).to_time(),
-                    ]
-                else:
-                    prevNaughtySub = None
-                    newTimes = [sub.start.to_time(), sub.end.to_time()]
-                newTimestampPairs.append(newTimes)
-            else:
-                if self.fullSubs:
-                    newSubs.append(sub)
-                prevNaughtySub = None
+        # overlapping and touching windows (pads, runs of neighbouring cues) collapse into one before
+        # anything is rendered from them
+        variant.muteTimeline = self._clip_timeline(MuteTimeline(newTimestampPairs))
 
-        newSubs.save(self.cleanSubsFileSpec)
-        if self.jsonDumpList is not None:
-            with open(self.jsonFileSpec, "w") as f:
+        if edits is not None:
+            with AtomicWrite(variant.jsonFileSpec) as f:
                 f.write(
                     json.dumps(
                         {
                             "now": datetime.now().isoformat(),
-                            "edits": self.jsonDumpList,
+                            "profile": variant.profile,
+                            "edits": edits,
+                            "mutes": variant.muteTimeline.toJson(),
                             "media": {
                                 "input": self.inputVidFileSpec,
-                                "output": self.outputVidFileSpec,
-                                "ffprobe": GetFormatAndStreamInfo(self.inputVidFileSpec),
+                                "output": variant.outputVidFileSpec,
+                                "ffprobe": GetFormatAndStreamInfo(self.inputVidFileSpec, self.GetInputMediaInfo()),
                             },
                             "subtitles": {
                                 "input": self.inputSubsFileSpec,
-                                "output": self.cleanSubsFileSpec,
+                                "output": variant.cleanSubsFileSpec,
+                                "encoding": self.subsEncoding,
                             },
                         },
                         indent=4,
                     )
                 )
 
-        self.muteTimeList = []
-        edlLines = []
-        plexDict = json.loads(PLEX_AUTO_SKIP_DEFAULT_CONFIG) if self.plexAutoSkipId and self.plexAutoSkipJson else None
-
-        if plexDict:
-            plexDict["markers"][self.plexAutoSkipId] = []
-            plexDict["mode"][self.plexAutoSkipId] = "volume"
-
-        # Append one at the very end of the file to work with pairwise
-        newTimes = [pysrt.SubRipTime.from_ordinal(subs[-1].end.ordinal).to_time(), None]
-        newTimestampPairs.append(newTimes)
-
-        for timePair, timePairPeek in pairwise(newTimestampPairs):
-            lineStart = (
-                (timePair[0].hour * 60.0 * 60.0)
-                + (timePair[0].minute * 60.0)
-                + timePair[0].second
-                + (timePair[0].microsecond / 1000000.0)
-            )
-            lineEnd = (
-                (timePair[1].hour * 60.0 * 60.0)
-                + (timePair[1].minute * 60.0)
-                + timePair[1].second
-                + (timePair[1].microsecond / 1000000.0)
-            )
-            lineStartPeek = (
-                (timePairPeek[0].hour * 60.0 * 60.0)
-                + (timePairPeek[0].minute * 60.0)
-                + timePairPeek[0].second
-                + (timePairPeek[0].microsecond / 1000000.0)
-            )
-            self.muteTimeList.append(
-                "afade=enable='between(t,"
-                + format(lineStart, '.3f')
-                + ","
-                + format(lineEnd, '.3f')
-                + ")':t=out:st="
-                + format(lineStart, '.3f')
-                + ":d=10ms"
-            )
-            self.muteTimeList.append(
-                "afade=enable='between(t,"
-                + format(lineEnd, '.3f')
-                + ","
-                + format(lineStartPeek, '.3f')
-                + ")':t=in:st="
-                + format(lineEnd, '.3f')
-                + ":d=10ms"
-            )
-            if self.edl:
-                edlLines.append(f"{format(lineStart, '.1f')}\t{format(lineEnd, '.3f')}\t1")
-            if plexDict:
-                plexDict["markers"][self.plexAutoSkipId].append(
-                    {"start": round(lineStart * 1000.0), "end": round(lineEnd * 1000.0), "mode": "volume"}
-                )
-        if self.edl and (len(edlLines) > 0):
-            with open(self.edlFileSpec, 'w') as edlFile:
-                for item in edlLines:
-                    edlFile.write(f"{item}\n")
-        if plexDict and (len(plexDict["markers"][self.plexAutoSkipId]) > 0):
-            json.dump(
-                plexDict,
-                open(self.plexAutoSkipJson, 'w'),
-                indent=4,
-            )
+        if self.edl and variant.muteTimeline:
+            with AtomicWrite(variant.edlFileSpec) as edlFile:
+                edlFile.write(variant.muteTimeline.toEdl())
+        return edits
+
+    ######## MutedAudioStreams ###################################################
+    def MutedAudioStreams(self, audioStreams):
+        # audio-only indexes of the streams to mute, all of them or those listed in muteAudioStreams, the
+        # audio track numbered muteAudioIndex, otherwise the one given by audioStreamIdx (which may be left
+        # out if there is only one)
+        streamIndexes = [stream.get('index', -1) for stream in audioStreams]
+        if self.muteAudioStreams == 'all':
+            return list(range(len(audioStreams)))
+        elif self.muteAudioStreams:
+            for streamIdx in self.muteAudioStreams:
+                if streamIdx not in streamIndexes:
+                    raise ValueError(f'Audio stream index {streamIdx} is invalid for {self.inputVidFileSpec}')
+            return sorted({streamIndexes.index(x) for x in self.muteAudioStreams})
+        elif self.muteAudioIndex is not None:
+            if not (0 <= self.muteAudioIndex < len(audioStreams)):
+                raise ValueError(f'Audio track {self.muteAudioIndex} is invalid for {self.inputVidFileSpec}')
+            return [self.muteAudioIndex]
+        elif self.audioStreamIdx is None:
+            if len(audioStreams) == 1:
+                if 'index' in audioStreams[0]:
+                    self.audioStreamIdx = audioStreams[0]['index']
+                else:
+                    raise ValueError(f'Could not determine audio stream index for {self.inputVidFileSpec}')
+            else:
+                raise ValueError('Multiple audio streams, specify audio stream index with --audio-stream-index')
+        elif self.audioStreamIdx not in streamIndexes:
+            raise ValueError(f'Audio stream index {self.audioStreamIdx} is invalid for {self.inputVidFileSpec}')
+        return [streamIndexes.index(self.audioStreamIdx)]
+
+    ######## AudioMuteTimeline ###################################################
+    def AudioMuteTimeline(self, stream, variant=None):
+        # tracks in a language with subtitles of their own are muted from those, the rest from the main ones
+        # (of the given lexicon profile's variant)
+        variant = variant or self
+        return variant.languageTimelines.get(stream.language, variant.muteTimeline)
 
     ######## MultiplexCleanVideo ###################################################
     def MultiplexCleanVideo(self):
@@ -643,14 +955,73 @@ class VidCleaner(object):
         # - we are hard-coding (burning) subs
         # - we are embedding a subtitle stream
         # - we are not doing "subs only" or EDL mode and there more than zero mute sections
+        # every lexicon profile gets its own output file from the one ffmpeg run
+        variants = self.variants or [
+            CleanVariant(
+                None,
+                self.outputVidFileSpec,
+                self.cleanSubsFileSpec,
+                self.edlFileSpec,
+                self.jsonFileSpec,
+                self.muteTimeline,
+                self.languageTimelines,
+            )
+        ]
         if (
-            self.reEncodeVideo
+            self.audioOnly
+            or self.reEncodeVideo
             or self.reEncodeAudio
             or self.hardCode
             or self.embedSubs
-            or ((not self.subsOnly) and (len(self.muteTimeList) > 0))
+            or (
+                (not self.subsOnly)
+                and any(x.muteTimeline or any(x.languageTimelines.values()) for x in variants)
+            )
         ):
-            if self.reEncodeVideo or self.hardCode:
+            if self.hardCode and (len(variants) > 1):
+                raise ValueError('Subtitles can not be burned in when rendering several lexicon profiles')
+            chunkedVideo = None
+            smartBurn = self.hardCode and self.smartBurn and (not self.reEncodeVideo) and os.path.isfile(self.cleanSubsFileSpec)
+            if self.GetInputMediaInfo() is None:
+                # nothing below can be worked out without the probe
+                raise ValueError(f'Could not determine audio streams in {self.inputVidFileSpec}')
+            videoStreams = self.GetInputMediaInfo().videoStreams
+            if smartBurn and not (videoStreams and SmartBurnParams(videoStreams[0])):
+                logger.info(f'Video codec of {self.inputVidFileSpec} can not be re-encoded in GOPs, burning in the whole video')
+                smartBurn = False
+            if self.audioOnly:
+                # the video is left where it is, only the audio is written
+                videoArgs = None
+            elif smartBurn:
+                # only the GOPs showing a cue are re-encoded, everything else is stream-copied around them
+                chunkedVideo = SmartBurnVideo(
+                    self.inputVidFileSpec,
+                    self.GetInputMediaInfo(),
+                    self.cleanSubsFileSpec,
+                    self.GetWorkDir(),
+                    self.encodeWorkers or 1,
+                    self.threadsEncoding,
+                    self.checkpoint,
+                )
+                videoArgs = "-c:v copy"
+            elif (self.reEncodeVideo or self.hardCode) and (
+                (self.encodeWorkers and (self.encodeWorkers > 1)) or (self.checkpoint is not None)
+            ):
+                # keyframe-aligned chunks are encoded in parallel (each burning in its own share of the
+                # subtitles) and spliced back together, the final pass only muxes them; a checkpointed job
+                # encodes in chunks even on one worker so a rerun can pick up after the last finished one
+                chunkedVideo = EncodeVideoChunks(
+                    self.inputVidFileSpec,
+                    self.GetInputMediaInfo(),
+                    self.vParams,
+                    self.GetWorkDir(),
+                    self.encodeWorkers or 1,
+                    self.threadsEncoding,
+                    self.cleanSubsFileSpec if (self.hardCode and os.path.isfile(self.cleanSubsFileSpec)) else None,
+                    self.checkpoint,
+                )
+                videoArgs = "-c:v copy"
+            elif self.reEncodeVideo or self.hardCode:
                 if self.hardCode and os.path.isfile(self.cleanSubsFileSpec):
                     self.assSubsFileSpec = self.cleanSubsFileSpec + '.ass'
                     cmd = [
@@ -667,56 +1038,116 @@ class VidCleaner(object):
                     if (subConvResult.return_code == 0) and os.path.isfile(self.assSubsFileSpec):
                         videoArgs = f"{self.vParams} -vf \"ass={self.assSubsFileSpec}\""
                     else:
-                                        logger.error(' '.join(shlex.quote(x) for x in cmd))
-                                        logger.error(subConvResult.err)
-                                        raise ValueError(f'Could not process {self.cleanSubsFileSpec}')
+                        logger.error(' '.join(shlex.quote(x) for x in cmd))
+                        logger.error(subConvResult.err)
+                        raise ValueError(f'Could not process {self.cleanSubsFileSpec}')
                 else:
                     videoArgs = self.vParams
             else:
                 videoArgs = "-c:v copy"
 
-            audioStreamOnlyIndex = 0
-            audio_info = GetAudioStreamsInfo(self.inputVidFileSpec)
+            audio_info = GetAudioStreamsInfo(self.inputVidFileSpec, self.GetInputMediaInfo())
             audioStreams = (audio_info or {}).get('streams', [])
             if not audioStreams:
                 raise ValueError(f'Could not determine audio streams in {self.inputVidFileSpec}')
-            if audioStreams:
-                if len(audioStreams) > 0:
-                    if self.audioStreamIdx is None:
-                        if len(audioStreams) == 1:
-                            if 'index' in audioStreams[0]:
-                                self.audioStreamIdx = audioStreams[0]['index']
-                            else:
-                                raise ValueError(f'Could not determine audio stream index for {self.inputVidFileSpec}')
-                        else:
-                            raise ValueError(
-                                f'Multiple audio streams, specify audio stream index with --audio-stream-index'
-                            )
-                    elif any(stream.get('index', -1) == self.audioStreamIdx for stream in audioStreams):
-                        audioStreamOnlyIndex = next(
-                            (
-                                i
-                                for i, stream in enumerate(audioStreams)
-                                if stream.get('index', -1) == self.audioStreamIdx
-                            ),
-                            0,
-                        )
-                    else:
-                        raise ValueError(
-                            f'Audio stream index {self.audioStreamIdx} is invalid for {self.inputVidFileSpec}'
-                        )
+            mutedAudio = self.MutedAudioStreams(audioStreams)
+            mediaAudioStreams = self.GetInputMediaInfo().audioStreams
+            timelines = [
+                {n: (MuteTimeline() if self.subsOnly else self.AudioMuteTimeline(mediaAudioStreams[n], x)) for n in mutedAudio}
+                for x in variants
+            ]
+            downmix = {
+                n: self.aDownmix and ((mediaAudioStreams[n].channels or 0) > 2) for n in range(len(mediaAudioStreams))
+            }
+
+            def _output_origin(n):
+                # an audio-only sidecar keeps the source's timestamps, so its mutes and spliced audio go where the
+                # file's timeline starts on them rather than at zero
+                return self.GetInputMediaInfo().timelineOrigin(mediaAudioStreams[n]) if self.audioOnly else 0
+
+            # the segment and pcm engines handle a single muted track of a single profile, several are muted in
+            # one filter graph
+            engineIndex = mutedAudio[0] if (len(mutedAudio) == 1) and (len(variants) == 1) else None
+            segmentedAudio = None
+            pcmEngine = None
+            if (engineIndex is None) and (self.muteEngine != MUTE_ENGINE_DEFAULT):
+                logger.info('Muting several audio tracks or profiles, using the filter mute engine')
+            elif (self.muteEngine == 'segment') and timelines[0][engineIndex]:
+                audioStream = mediaAudioStreams[engineIndex]
+                if self.reEncodeAudio or downmix[engineIndex]:
+                    logger.info('Re-encoding or downmixing the whole audio track, using the filter mute engine')
+                elif SegmentEncoder(audioStream) is None:
+                    logger.info(f'Audio codec {audioStream.codecName} can not be spliced, using the filter mute engine')
                 else:
-                    raise ValueError(f'No audio streams found in {self.inputVidFileSpec}')
-            else:
-                raise ValueError(f'Could not determine audio streams in {self.inputVidFileSpec}')
-            self.aParams = re.sub(r"-c:a(\s+)", rf"-c:a:{str(audioStreamOnlyIndex)}\1", self.aParams)
-            audio_map_args = []
-            for i in range(len(audioStreams)):
-                if i != audioStreamOnlyIndex:
-                    audio_map_args += ['-map', f'0:a:{i}']
-
-            if self.aDownmix and HasAudioMoreThanStereo(self.inputVidFileSpec):
-                self.muteTimeList.insert(0, AUDIO_DOWNMIX_FILTER)
+                    segmentedAudio = RenderSegmentedAudio(
+                        self.inputVidFileSpec,
+                        audioStream,
+                        engineIndex,
+                        timelines[0][engineIndex],
+                        self.GetWorkDir(),
+                        AUDIO_MUTE_FILTER,
+                        self.GetInputMediaInfo().timelineOrigin(audioStream),
+                    )
+            elif (self.muteEngine == 'pcm') and timelines[0][engineIndex]:
+                audioStream = mediaAudioStreams[engineIndex]
+                if not PcmEngineAvailable():
+                    logger.warning('numpy is not installed, using the filter mute engine')
+                elif not (audioStream.sampleRate and audioStream.channels):
+                    logger.info(f'Unknown audio format in {self.inputVidFileSpec}, using the filter mute engine')
+                else:
+                    # downmixing happens in the decoder, the envelope is applied to what comes out of it
+                    pcmChannels = 2 if downmix[engineIndex] else audioStream.channels
+                    # the decoded PCM starts where the track does on the file's timeline, not where it begins
+                    pcmStart = self.GetInputMediaInfo().relativeStart(audioStream)
+                    pcmEngine = PcmMuteEngine(
+                        timelines[0][engineIndex].shift(-round(pcmStart * 1000)).clip(None),
+                        audioStream.sampleRate,
+                        pcmChannels,
+                    )
+                    decodeCmd = [
+                        'ffmpeg',
+                        '-hide_banner',
+                        '-nostats',
+                        '-loglevel', 'error',
+                    ]
+                    if self.threadsInput is not None:
+                        decodeCmd += ['-threads', str(int(self.threadsInput))]
+                    decodeCmd += ['-i', self.inputVidFileSpec, '-map', f'0:a:{engineIndex}']
+                    if downmix[engineIndex]:
+                        decodeCmd += ['-af', AUDIO_DOWNMIX_FILTER]
+                    decodeCmd += ['-f', 'f32le', '-ac', str(pcmChannels), '-ar', str(audioStream.sampleRate), 'pipe:1']
+
+            # every other muted track gets a chain per profile, each in a -filter_complex of its own as asendcmd
+            # commands reach every volume filter in their graph; the track is still decoded only once
+            audioFilters = {}
+            for n in mutedAudio:
+                if (n == engineIndex) and ((segmentedAudio is not None) or (pcmEngine is not None)):
+                    continue
+                branches = []
+                for vi in range(len(variants)):
+                    branches.append([])
+                    if timelines[vi][n]:
+                        # the mute windows live in a commands file read by asendcmd, so the graph itself is the
+                        # same two filters however many windows there are
+                        if engineIndex is not None:
+                            tag = ''
+                        elif len(variants) == 1:
+                            tag = f'{n}'
+                        else:
+                            tag = f'{n}_{vi}'
+                        commandsFileSpec = os.path.join(self.GetWorkDir(), f'mute{tag}.cmd')
+                        muteTimeline = timelines[vi][n].shift(round(_output_origin(n) * 1000))
+                        with open(commandsFileSpec, 'w') as f:
+                            f.write(muteTimeline.toSendCmd(AUDIO_MUTE_FILTER))
+                        self.muteCommandsFileSpec = self.muteCommandsFileSpec or commandsFileSpec
+                        branches[-1].append(f"asendcmd=f={FilterArgEscape(commandsFileSpec)}")
+                        branches[-1].append(f"{AUDIO_MUTE_FILTER}=1")
+                shared = [AUDIO_DOWNMIX_FILTER] if downmix[n] else []
+                if shared or any(branches):
+                    audioFilters[n] = (shared, branches)
+
+            def _filtered(n, vi):
+                return f'a{n}' if (len(variants) == 1) else f'a{n}_{vi}'
 
             cmd = [
                 'ffmpeg',
@@ -725,55 +1156,182 @@ class VidCleaner(object):
                 '-loglevel', 'error',
                 '-y',
             ]
+            if self.audioOnly:
+                # the sidecar keeps the source's timestamps so it lines up with the untouched video
+                cmd += ['-copyts']
             if self.threadsInput is not None:
                 cmd += ['-threads', str(int(self.threadsInput))]
             cmd += ['-i', self.inputVidFileSpec]
-            if self.embedSubs and os.path.isfile(self.cleanSubsFileSpec):
-                cmd += ['-i', self.cleanSubsFileSpec]
-
-            if (not self.subsOnly) and (len(self.muteTimeList) > 0):
-                filter_expr = f"[0:a:{audioStreamOnlyIndex}]" + ",".join(self.muteTimeList) + f"[a{audioStreamOnlyIndex}]"
-                cmd += ['-filter_complex', filter_expr]
-
-            cmd += ['-map', '0:v', '-map', f"[a{audioStreamOnlyIndex}]"]
-            if audio_map_args:
-                cmd += audio_map_args
-
-            if self.embedSubs and os.path.isfile(self.cleanSubsFileSpec):
-                outFileParts = os.path.splitext(self.outputVidFileSpec)
-                subs_codec = 'mov_text' if outFileParts[1] == '.mp4' else 'srt'
-                cmd += ['-map', '1:s', '-c:s', subs_codec, '-disposition:s:0', 'default', '-metadata:s:s:0', f'language={self.subsLang}']
-            else:
-                cmd += ['-sn']
-
-            # add video args and audio params (they may contain multiple tokens)
-            if videoArgs:
-                cmd += shlex.split(videoArgs)
-            if self.aParams:
-                cmd += shlex.split(self.aParams)
-            if self.threadsEncoding is not None:
-                cmd += ['-threads', str(int(self.threadsEncoding))]
-            cmd += [self.outputVidFileSpec]
-
-            ffmpegResult = _run_cmd(cmd)
-            if (ffmpegResult.return_code != 0) or (not os.path.isfile(self.outputVidFileSpec)):
+            nextInput = 1
+            subsInputs = []
+            for variant in variants:
+                subsInputs.append(None)
+                if self.embedSubs and (not self.audioOnly) and os.path.isfile(variant.cleanSubsFileSpec):
+                    cmd += ['-i', variant.cleanSubsFileSpec]
+                    subsInputs[-1], nextInput = nextInput, nextInput + 1
+            videoMap = '0:v'
+            if chunkedVideo is not None:
+                # encoded chunks spliced back together, starting where the original stream does on the file's
+                # timeline (which the output's is rebased to)
+                videoListFileSpec, videoStart = chunkedVideo
+                cmd += ['-itsoffset', f'{float(videoStart):.6f}', '-f', 'concat', '-safe', '0', '-i', videoListFileSpec]
+                videoMap, nextInput = f'{nextInput}:v', nextInput + 1
+
+            audioInput = None
+            if segmentedAudio is not None:
+                # muted spans spliced between stream-copied ones, starting where the original track does on the
+                # file's timeline
+                audioListFileSpec, audioStart = segmentedAudio
+                audioStart += _output_origin(engineIndex)
+                cmd += ['-itsoffset', f'{float(audioStart):.6f}', '-f', 'concat', '-safe', '0', '-i', audioListFileSpec]
+                audioInput, nextInput = nextInput, nextInput + 1
+            elif pcmEngine is not None:
+                # muted PCM arrives on stdin from the engine, starting where the original track does on the file's
+                # timeline
+                cmd += ['-itsoffset', f'{float(pcmStart + _output_origin(engineIndex)):.6f}']
+                cmd += ['-f', 'f32le', '-ar', str(pcmEngine.sampleRate), '-ac', str(pcmEngine.channels), '-i', 'pipe:0']
+                audioInput, nextInput = nextInput, nextInput + 1
+            for n, (shared, branches) in audioFilters.items():
+                for vi, filters in enumerate(branches):
+                    cmd += ['-filter_complex', f"[0:a:{n}]" + ",".join((shared + filters) or ['anull']) + f"[{_filtered(n, vi)}]"]
+
+            # audio tracks keep their order, muted ones are encoded with --audio-params scoped to each (and the
+            # bit rate derived from its source stream), the rest are copied unchanged (or left out of a sidecar)
+            outputAudio = [n for n in range(len(audioStreams)) if (n in mutedAudio) or (not self.audioOnly)]
+            for vi, variant in enumerate(variants):
+                if not self.audioOnly:
+                    cmd += ['-map', videoMap]
+                audioArgs = []
+                for outputIdx, n in enumerate(outputAudio):
+                    if (n == engineIndex) and (audioInput is not None):
+                        cmd += ['-map', f"{audioInput}:a"]
+                    elif n in audioFilters:
+                        cmd += ['-map', f"[{_filtered(n, vi)}]"]
+                    else:
+                        cmd += ['-map', f"0:a:{n}"]
+                    if (n == engineIndex) and (segmentedAudio is not None):
+                        audioArgs += [f'-c:a:{outputIdx}', 'copy']
+                    elif n in mutedAudio:
+                        audioArgs += AudioStreamParams(
+                            self.aParams,
+                            outputIdx,
+                            mediaAudioStreams[n],
+                            2 if downmix[n] else None,
+                            scopedOnly=(n != mutedAudio[0]),
+                        )
+                    else:
+                        audioArgs += [f'-c:a:{outputIdx}', 'copy']
+                    if (((n == engineIndex) and (audioInput is not None)) or (n in audioFilters)) and mediaAudioStreams[n].language:
+                        # filtered and piped tracks don't carry over the source stream's tags
+                        audioArgs += [f'-metadata:s:a:{outputIdx}', f'language={mediaAudioStreams[n].language}']
+
+                if subsInputs[vi] is not None:
+                    outFileParts = os.path.splitext(variant.outputVidFileSpec)
+                    subs_codec = 'mov_text' if outFileParts[1] == '.mp4' else 'srt'
+                    cmd += ['-map', f'{subsInputs[vi]}:s', '-c:s', subs_codec, '-disposition:s:0', 'default', '-metadata:s:s:0', f'language={self.subsLang}']
+                else:
+                    cmd += ['-sn']
+
+                # add video args and audio params (they may contain multiple tokens)
+                if videoArgs:
+                    cmd += shlex.split(videoArgs)
+                cmd += audioArgs
+                if self.threadsEncoding is not None:
+                    cmd += ['-threads', str(int(self.threadsEncoding))]
+                cmd += [PartFileSpec(variant.outputVidFileSpec)]
+
+            ffmpegResult = pcmEngine.run(decodeCmd, cmd) if (pcmEngine is not None) else _run_cmd(cmd)
+            if (ffmpegResult.return_code != 0) or (
+                not all(os.path.isfile(PartFileSpec(x.outputVidFileSpec)) for x in variants)
+            ):
                 logger.error(' '.join(shlex.quote(x) for x in cmd))
                 logger.error(ffmpegResult.err)
+                # whatever ffmpeg got written before failing (or being killed) is of no use
+                for variant in variants:
+                    if os.path.isfile(PartFileSpec(variant.outputVidFileSpec)):
+                        os.remove(PartFileSpec(variant.outputVidFileSpec))
                 raise ValueError(f'Could not process {self.inputVidFileSpec}')
+            if (chunkedVideo is not None) or (audioInput is not None):
+                # spliced chunks and engine audio are checked against the source before they replace anything
+                syncTypes = ('audio',) if self.audioOnly else ('video', 'audio')
+                syncTracks = (engineIndex, outputAudio.index(engineIndex)) if (audioInput is not None) else (0, 0)
+                for variant in variants:
+                    partFileSpec = PartFileSpec(variant.outputVidFileSpec)
+                    try:
+                        if (outputInfo := GetMediaInfo(partFileSpec)) is None:
+                            raise ValueError(f'A/V sync check failed: could not probe {partFileSpec}')
+                        VerifyAvSync(
+                            self.GetInputMediaInfo(),
+                            outputInfo,
+                            syncTypes,
+                            audioTracks=syncTracks,
+                            sameTimestamps=self.audioOnly,
+                        )
+                    except ValueError:
+                        for x in variants:
+                            if os.path.isfile(PartFileSpec(x.outputVidFileSpec)):
+                                os.remove(PartFileSpec(x.outputVidFileSpec))
+                        raise
+            # the finished outputs replace any earlier ones in one step
+            for variant in variants:
+                CommitPartFile(variant.outputVidFileSpec)
+            for variant in variants:
+                if self.audioOnly and self.mpvEdl:
+                    self.WriteMpvEdl(variant)
         else:
             self.unalteredVideo = True
+            # no output was needed, so one left by an earlier run would be out of date
+            for fileSpec in {self.outputVidFileSpec} | {x.outputVidFileSpec for x in variants}:
+                if fileSpec and os.path.isfile(fileSpec):
+                    os.remove(fileSpec)
+
+    ######## WriteMpvEdl ##########################################################
+    def WriteMpvEdl(self, variant=None):
+        # an mpv EDL (opened by mpv like any media file) playing the untouched video with the sidecar audio,
+        # which comes first so it is the default audio track, and the clean subtitles (of a lexicon profile)
+        variant = variant or self
+        mpvEdlFileSpec = os.path.splitext(variant.outputVidFileSpec)[0] + '.mpv.edl'
+        if getattr(variant, 'profile', None) is None:
+            self.mpvEdlFileSpec = self.mpvEdlFileSpec or mpvEdlFileSpec
+            mpvEdlFileSpec = self.mpvEdlFileSpec
+        edlDir = os.path.dirname(os.path.abspath(mpvEdlFileSpec))
+
+        def _entry(fileSpec):
+            # paths are relative to the EDL where possible, and length-prefixed so they need no escaping
+            try:
+                path = os.path.relpath(os.path.abspath(fileSpec), edlDir)
+            except ValueError:
+                path = os.path.abspath(fileSpec)
+            return f"%{len(path.encode('utf-8'))}%{path}\n"
+
+        with AtomicWrite(mpvEdlFileSpec, encoding='utf-8') as f:
+            f.write("# mpv EDL v0\n")
+            f.write(_entry(variant.outputVidFileSpec))
+            for fileSpec in (self.inputVidFileSpec, variant.cleanSubsFileSpec):
+                if fileSpec and os.path.isfile(fileSpec):
+                    f.write("!new_stream\n!no_clip\n")
+                    f.write(_entry(fileSpec))
 
 
 #################################################################################
-def RunCleanvid():
-        parser.add_argument(
-            '--mute-audio-index',
-            help='Index of audio track to mute (others will be copied unchanged)',
-            metavar='<int>',
-            dest='muteAudioIndex',
-            type=int,
-            default=0,
-        )
+def _audio_stream_indexes(value):
+    if value.strip().lower() == 'all':
+        return 'all'
+    try:
+        return [int(x) for x in value.split(',') if x.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid audio stream list: {value}')
+
+
+def _lexicon_profile(value):
+    profile, sep, fileSpec = value.partition('=')
+    if (not sep) or (not fileSpec) or (not re.fullmatch(PROFILE_NAME_PATTERN, profile.strip())):
+        raise argparse.ArgumentTypeError(f'invalid lexicon profile (expected <name>=<profanity file>): {value}')
+    return profile.strip(), fileSpec
+
+
+#################################################################################
+def CleanvidArgumentParser():
     parser = argparse.ArgumentParser()
     parser.add_argument(
         '--gpu',
@@ -787,7 +1345,7 @@ def RunCleanvid():
         help='.srt subtitle file (will attempt auto-download if unspecified and not --offline)',
         metavar='<srt>',
     )
-    parser.add_argument('-i', '--input', required=True, help='input video file', metavar='<input video>')
+    parser.add_argument('-i', '--input', help='input video file', metavar='<input video>')
     parser.add_argument('-o', '--output', help='output video file', metavar='<output video>')
     parser.add_argument(
         '--plex-auto-skip-json',
@@ -806,13 +1364,22 @@ def RunCleanvid():
         '-w',
         '--swears',
         help='text file containing profanity (with optional mapping)',
-        default=os.path.join(__script_location__, 'swears.txt'),
+        default=SWEARS_DEFAULT_FILESPEC,
         metavar='<profanity file>',
     )
+    parser.add_argument(
+        '--profile',
+        help='named profanity file used instead of --swears, repeat to write a muted output (and clean subtitles) per profile in one pass, named <output>.<name>.<ext>',
+        metavar='<name>=<profanity file>',
+        dest="swearsProfiles",
+        type=_lexicon_profile,
+        action='append',
+        default=[],
+    )
     parser.add_argument(
         '-l',
         '--lang',
-        help=f'language for extracting srt from video file or srt download (default is "{SUBTITLE_DEFAULT_LANG}")',
+        help=f'language for extracting srt from video file or srt download (default is "{SUBTITLE_DEFAULT_LANG}"); additional comma-separated languages are extracted in the same pass',
         default=SUBTITLE_DEFAULT_LANG,
         metavar='<language>',
     )
@@ -862,6 +1429,12 @@ def RunCleanvid():
     parser.add_argument(
         '-b', '--burn', help='Hard-coded subtitles (implies re-encode)', dest='hardCode', action='store_true'
     )
+    parser.add_argument(
+        '--smart-burn',
+        help='Hard-coded subtitles, re-encoding only the video around them (implies --burn)',
+        dest='smartBurn',
+        action='store_true',
+    )
     parser.add_argument(
         '-v',
         '--video-params',
@@ -870,7 +1443,11 @@ def RunCleanvid():
         default=VIDEO_DEFAULT_PARAMS,
     )
     parser.add_argument(
-        '-a', '--audio-params', help='Audio parameters for ffmpeg', dest='aParams', default=AUDIO_DEFAULT_PARAMS
+        '-a',
+        '--audio-params',
+        help=f'Audio parameters for ffmpeg, or "{AUDIO_AUTO_PARAMS}" to match the source codec, sample rate, channels and bit rate',
+        dest='aParams',
+        default=AUDIO_DEFAULT_PARAMS,
     )
     parser.add_argument(
         '-d', '--downmix', help='Downmix to stereo (if not already stereo)', dest='aDownmix', action='store_true'
@@ -883,6 +1460,26 @@ def RunCleanvid():
         type=int,
         default=None,
     )
+    parser.add_argument(
+        '--audio-only',
+        help='Write only the cleaned audio track(s) as a sidecar (.mka, or .m4a by the output extension) for the untouched video',
+        dest='audioOnly',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--mpv-edl',
+        help='With --audio-only, also write an mpv EDL playing the untouched video with the sidecar audio',
+        dest='mpvEdl',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--mute-audio-streams',
+        help='Comma-separated indexes of audio streams to mute (or "all"), tracks in another --lang language are muted from its subtitles',
+        metavar='<int,int,...|all>',
+        dest="muteAudioStreams",
+        type=_audio_stream_indexes,
+        default=None,
+    )
     parser.add_argument(
         '--audio-stream-list',
         help='Show list of audio streams (to get index for --audio-stream-index)',
@@ -913,22 +1510,339 @@ def RunCleanvid():
         type=int,
         default=None,
     )
+    parser.add_argument(
+        '--encoding-detector',
+        help=f'backend for detecting the encoding of subtitles that are not UTF-8 (default "{ENCODING_DETECTOR_DEFAULT}")',
+        choices=ENCODING_DETECTORS,
+        dest="encodingDetector",
+        default=ENCODING_DETECTOR_DEFAULT,
+    )
+    parser.add_argument(
+        '--encode-workers',
+        help='split video re-encodes (--re-encode-video, --burn) into keyframe-aligned chunks encoded by this many ffmpeg processes at once',
+        metavar='<int>',
+        dest="encodeWorkers",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--mute-engine',
+        help=f'how muted audio is produced: "filter" re-encodes the whole track, "segment" re-encodes only around mutes, "pcm" mutes decoded audio with NumPy (default "{MUTE_ENGINE_DEFAULT}")',
+        choices=MUTE_ENGINES,
+        dest="muteEngine",
+        default=MUTE_ENGINE_DEFAULT,
+    )
+    parser.add_argument(
+        '--lexicon-cache',
+        help='directory for caching the compiled profanity list (default is the user cache directory)',
+        metavar='<directory>',
+        dest="lexiconCacheDir",
+        default=None,
+    )
+    parser.add_argument(
+        '--no-lexicon-cache',
+        help="don't cache the compiled profanity list on disk",
+        dest="lexiconCacheDir",
+        action='store_const',
+        const='',
+    )
+    parser.add_argument(
+        '--probe-cache',
+        help='cache ffprobe results for unchanged files in this SQLite file (default location if no file is given)',
+        metavar='<cache file>',
+        dest="probeCache",
+        nargs='?',
+        const='',
+        default=None,
+    )
+    parser.add_argument(
+        '--probe-dir',
+        help='probe every video file under this directory in parallel to fill --probe-cache, then exit (may be repeated)',
+        metavar='<directory>',
+        dest="probeDirs",
+        action='append',
+        default=[],
+    )
+    parser.add_argument(
+        '--probe-workers',
+        help='number of parallel ffprobe processes for --probe-dir',
+        metavar='<int>',
+        dest="probeWorkers",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--work-dir',
+        help='record completed stages of the job under this directory, so an interrupted run picks up where it stopped',
+        metavar='<directory>',
+        dest="workDir",
+        default=None,
+    )
+    parser.add_argument(
+        '--mute-audio-index',
+        help='Audio track to mute, counting audio tracks only from 0 (others will be copied unchanged)',
+        metavar='<int>',
+        dest='muteAudioIndex',
+        type=int,
+        default=None,
+    )
     parser.set_defaults(
         audioStreamIdxList=False,
         edl=False,
         embedSubs=False,
         fullSubs=False,
         hardCode=False,
+        smartBurn=False,
+        audioOnly=False,
+        mpvEdl=False,
         offline=False,
         reEncodeAudio=False,
         reEncodeVideo=False,
         subsOnly=False,
         gpu=False,
     )
+    return parser
+
+
+######## CheckCleanvidArgs ####################################################
+def CheckCleanvidArgs(parser, args):
+    # option combinations argparse itself can't rule out
+    if args.audioOnly and (args.hardCode or args.smartBurn or args.reEncodeVideo or args.embedSubs):
+        parser.error('--audio-only leaves the video untouched, it can not be combined with --burn, --smart-burn, --re-encode-video or --embed-subs')
+    swearsProfiles = OrderedDict(args.swearsProfiles)
+    if len(swearsProfiles) != len(args.swearsProfiles):
+        parser.error('--profile names must be unique')
+    if swearsProfiles and (args.hardCode or args.smartBurn):
+        parser.error('--profile writes an output per profile, it can not be combined with --burn or --smart-burn')
+    if (args.muteAudioIndex is not None) and (args.muteAudioStreams or (args.audioStreamIdx is not None)):
+        parser.error('--mute-audio-index selects the track to mute, it can not be combined with --mute-audio-streams or --audio-stream-index')
+
+
+######## DefaultOutputFileSpec ################################################
+def DefaultOutputFileSpec(inFile, lang=SUBTITLE_DEFAULT_LANG, audioOnly=False):
+    inFileParts = os.path.splitext(inFile)
+    if audioOnly:
+        # named so media servers pick it up as an external track of the video
+        return inFileParts[0] + "." + SplitLanguageIfForced(lang)[0] + ".clean.mka"
+    else:
+        return inFileParts[0] + "_clean" + inFileParts[1]
+
+
+######## DetectGpuEncoder #####################################################
+# the hardware H.264 encoder for the first GPU found (None for none), detected once per process
+@lru_cache(maxsize=None)
+def DetectGpuEncoder():
+    encoder = None
+    # NVIDIA detection
+    nvidia_smi = shutil.which('nvidia-smi')
+    if nvidia_smi:
+        encoder = 'h264_nvenc'
+    else:
+        # Intel detection (VAAPI)
+        vainfo = shutil.which('vainfo')
+        if vainfo:
+            # Check for VAAPI support
+            vaapi_out = subprocess.run([vainfo], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            if 'H264' in vaapi_out.stdout or 'H264' in vaapi_out.stderr:
+                encoder = 'h264_vaapi'
+        # AMD detection (AMF/VAAPI)
+        if not encoder:
+            lspci = shutil.which('lspci')
+            if lspci:
+                lspci_out = subprocess.run([lspci], stdout=subprocess.PIPE, text=True).stdout
+                if 'AMD' in lspci_out or 'ATI' in lspci_out:
+                    encoder = 'h264_vaapi'  # fallback for AMD
+    return encoder
+
+
+######## JobIdentity ##########################################################
+# options that only change how fast a job runs, not what it writes
+CHECKPOINT_IGNORED_OPTIONS = {
+    'threads',
+    'threadsInput',
+    'threadsEncoding',
+    'probeCache',
+    'probeDirs',
+    'probeWorkers',
+    'lexiconCacheDir',
+    'workDir',
+    'audioStreamIdxList',
+}
+
+
+# what a job's checkpointed stages depend on: its options and the files it reads, as they are now
+def JobIdentity(args):
+    identity = OrderedDict(sorted((k, v) for k, v in vars(args).items() if k not in CHECKPOINT_IGNORED_OPTIONS))
+    fileSpecs = [args.input, args.subs, args.swears] + [fileSpec for _, fileSpec in args.swearsProfiles]
+    identity['files'] = [
+        (fileSpec, key[1:3] if (key := ProbeCache.fileKey(fileSpec)) else None) for fileSpec in fileSpecs if fileSpec
+    ]
+    return identity
+
+
+######## CleanMediaFile #######################################################
+def CleanMediaFile(args, mediaInfo=None):
+    # clean one input file as told by parsed command line arguments, returns the VidCleaner
+    inFile = args.input
+    outFile = args.output
+    subsFile = args.subs
+    lang, *extraLangs = [x.strip() for x in args.lang.split(',') if x.strip()] or [SUBTITLE_DEFAULT_LANG]
+    plexFile = args.plexAutoSkipJson
+    subsText = None
+    languageSubs = None
+    checkpoint = None
+    if inFile:
+        inFileParts = os.path.splitext(inFile)
+        if not outFile:
+            outFile = DefaultOutputFileSpec(inFile, lang, args.audioOnly)
+        if args.workDir:
+            checkpoint = JobCheckpoint(JobWorkDir(args.workDir, inFile, outFile), JobIdentity(args))
+            if checkpoint.resumed:
+                logger.info(f'Resuming {inFile} from {checkpoint.workDir} ({", ".join(checkpoint.stages)} done)')
+            if (mediaInfo is None) and checkpoint.done('probe'):
+                mediaInfo = MediaInfo(inFile, checkpoint.get('probe'))
+            if mediaInfo is None:
+                mediaInfo = GetMediaInfo(inFile, ProbeCache(args.probeCache) if (args.probeCache is not None) else None)
+            if (mediaInfo is not None) and not checkpoint.done('probe'):
+                checkpoint.complete('probe', mediaInfo.probe)
+        if not subsFile:
+            # embedded subtitles are extracted straight into memory, other requested languages
+            # are saved alongside the output video
+            extracted = None
+            if (checkpoint is not None) and checkpoint.done('subtitles'):
+                extracted = OrderedDict((x, checkpoint.loadFile(f'subtitles.{x}.srt')) for x in checkpoint.get('subtitles'))
+                if any(raw is None for raw in extracted.values()):
+                    extracted = None
+            if extracted is None:
+                extracted = ExtractSubtitlesText(inFile, [lang] + extraLangs, mediaInfo)
+                if checkpoint is not None:
+                    for extractedLang, raw in extracted.items():
+                        checkpoint.saveFile(f'subtitles.{extractedLang}.srt', raw)
+                    checkpoint.complete('subtitles', list(extracted.keys()))
+            subsText = extracted.pop(SplitLanguageIfForced(lang)[0], None)
+            outFileParts = os.path.splitext(outFile)
+            for extraLang, raw in extracted.items():
+                with AtomicWrite(outFileParts[0] + "." + extraLang + ".srt", 'wb') as f:
+                    f.write(raw)
+            if args.muteAudioStreams:
+                languageSubs = extracted
+            if (subsText is None) and (not args.offline):
+                subsFile = DownloadSubtitles(inFile, lang)
+        if args.plexAutoSkipId and not plexFile:
+            plexFile = inFileParts[0] + "_PlexAutoSkip_clean.json"
+
+    if plexFile and not args.plexAutoSkipId:
+        raise ValueError(
+            'Content ID must be specified if creating a PlexAutoSkip JSON file (https://github.com/mdhiggins/PlexAutoSkip/wiki/Identifiers)'
+        )
+
+    # GPU detection and encoder selection
+    vParams = args.vParams
+    if args.gpu:
+        try:
+            encoder = DetectGpuEncoder()
+            if encoder:
+                # Replace -c:v in vParams or append if missing
+                if '-c:v' in vParams:
+                    vParams = re.sub(r'-c:v\s+\S+', f'-c:v {encoder}', vParams)
+                else:
+                    vParams = f'-c:v {encoder} ' + vParams
+                print(f"[cleanvid] GPU detected, using encoder: {encoder}")
+            else:
+                print("[cleanvid] No supported GPU detected, using CPU encoding.")
+        except Exception as e:
+            print(f"[cleanvid] GPU detection failed: {e}\nFalling back to CPU encoding.")
+
+    cleaner = VidCleaner(
+        inFile,
+        subsFile,
+        outFile,
+        args.subsOut,
+        args.swears,
+        args.pad,
+        args.embedSubs,
+        args.fullSubs,
+        args.subsOnly,
+        args.edl,
+        args.json,
+        lang,
+        args.reEncodeVideo,
+        args.reEncodeAudio,
+        args.hardCode or args.smartBurn,
+        vParams,
+        args.audioStreamIdx,
+        args.aParams,
+        args.aDownmix,
+        args.threadsInput if args.threadsInput is not None else args.threads,
+        args.threadsEncoding if args.threadsEncoding is not None else args.threads,
+        plexFile,
+        args.plexAutoSkipId,
+        args.muteAudioIndex,
+        mediaInfo,
+        subsText,
+        args.encodingDetector,
+        args.lexiconCacheDir,
+        args.muteEngine,
+        args.encodeWorkers,
+        args.smartBurn,
+        args.muteAudioStreams,
+        languageSubs,
+        args.audioOnly,
+        args.mpvEdl,
+        OrderedDict(args.swearsProfiles),
+        checkpoint,
+    )
+    cleaner.CreateCleanSubAndMuteList()
+    cleaner.MultiplexCleanVideo()
+    if checkpoint is not None:
+        checkpoint.discard()
+    return cleaner
+
+
+#################################################################################
+def RunCleanvid():
+    if sys.argv[1:2] == ['batch']:
+        try:
+            from cleanvid.batch import RunBatch
+        except ImportError:
+            from batch import RunBatch
+
+        return RunBatch(sys.argv[2:])
+    if sys.argv[1:2] == ['watch']:
+        try:
+            from cleanvid.watch import RunWatch
+        except ImportError:
+            from watch import RunWatch
+
+        return RunWatch(sys.argv[2:])
+    if sys.argv[1:2] == ['serve']:
+        try:
+            from cleanvid.server import RunServer
+        except ImportError:
+            from server import RunServer
+
+        return RunServer(sys.argv[2:])
+
+    parser = CleanvidArgumentParser()
     args = parser.parse_args()
+    CheckCleanvidArgs(parser, args)
+
+    probeCache = ProbeCache(args.probeCache) if (args.probeCache is not None) or args.probeDirs else None
+
+    if args.probeDirs:
+        for fileSpec, mediaInfo in ProbeMediaFiles(args.probeDirs, probeCache, args.probeWorkers).items():
+            if mediaInfo is None:
+                logger.warning(f'Could not probe {fileSpec}')
+        return
+
+    if not args.input:
+        parser.error('the following arguments are required: -i/--input')
+
+    # a checkpointed job probes the input itself, unless an earlier run already has
+    mediaInfo = None if (args.workDir and not args.audioStreamIdxList) else GetMediaInfo(args.input, probeCache)
 
     if args.audioStreamIdxList:
-        audioStreamsInfo = GetAudioStreamsInfo(args.input)
+        audioStreamsInfo = GetAudioStreamsInfo(args.input, mediaInfo) or {}
         # e.g.:
         #   1: aac, 44100 Hz, stereo, eng
         #   3: opus, 48000 Hz, stereo, jpn
@@ -942,90 +1856,7 @@ def RunCleanvid():
         )
 
     else:
-        inFile = args.input
-        outFile = args.output
-        subsFile = args.subs
-        lang = args.lang
-        plexFile = args.plexAutoSkipJson
-        if inFile:
-            inFileParts = os.path.splitext(inFile)
-            if not outFile:
-                outFile = inFileParts[0] + "_clean" + inFileParts[1]
-            if not subsFile:
-                subsFile = GetSubtitles(inFile, lang, args.offline)
-            if args.plexAutoSkipId and not plexFile:
-                plexFile = inFileParts[0] + "_PlexAutoSkip_clean.json"
-
-        if plexFile and not args.plexAutoSkipId:
-            raise ValueError(
-                f'Content ID must be specified if creating a PlexAutoSkip JSON file (https://github.com/mdhiggins/PlexAutoSkip/wiki/Identifiers)'
-            )
-
-        # GPU detection and encoder selection
-        vParams = args.vParams
-        if args.gpu:
-            import platform, subprocess
-            encoder = None
-            try:
-                # NVIDIA detection
-                nvidia_smi = shutil.which('nvidia-smi')
-                if nvidia_smi:
-                    encoder = 'h264_nvenc'
-                else:
-                    # Intel detection (VAAPI)
-                    vainfo = shutil.which('vainfo')
-                    if vainfo:
-                        # Check for VAAPI support
-                        vaapi_out = subprocess.run([vainfo], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                        if 'H264' in vaapi_out.stdout or 'H264' in vaapi_out.stderr:
-                            encoder = 'h264_vaapi'
-                    # AMD detection (AMF/VAAPI)
-                    if not encoder:
-                        lspci = shutil.which('lspci')
-                        if lspci:
-                            lspci_out = subprocess.run([lspci], stdout=subprocess.PIPE, text=True).stdout
-                            if 'AMD' in lspci_out or 'ATI' in lspci_out:
-                                encoder = 'h264_vaapi'  # fallback for AMD
-                if encoder:
-                    # Replace -c:v in vParams or append if missing
-                    if '-c:v' in vParams:
-                        vParams = re.sub(r'-c:v\s+\S+', f'-c:v {encoder}', vParams)
-                    else:
-                        vParams = f'-c:v {encoder} ' + vParams
-                    print(f"[cleanvid] GPU detected, using encoder: {encoder}")
-                else:
-                    print("[cleanvid] No supported GPU detected, using CPU encoding.")
-            except Exception as e:
-                print(f"[cleanvid] GPU detection failed: {e}\nFalling back to CPU encoding.")
-
-        cleaner = VidCleaner(
-            inFile,
-            subsFile,
-            outFile,
-            args.subsOut,
-            args.swears,
-            args.pad,
-            args.embedSubs,
-            args.fullSubs,
-            args.subsOnly,
-            args.edl,
-            args.json,
-            lang,
-            args.reEncodeVideo,
-            args.reEncodeAudio,
-            args.hardCode,
-            vParams,
-            args.audioStreamIdx,
-            args.aParams,
-            args.aDownmix,
-            args.threadsInput if args.threadsInput is not None else args.threads,
-            args.threadsEncoding if args.threadsEncoding is not None else args.threads,
-            plexFile,
-            args.plexAutoSkipId,
-            args.muteAudioIndex,
-        )
-        cleaner.CreateCleanSubAndMuteList()
-        cleaner.MultiplexCleanVideo()
+        CleanMediaFile(args, mediaInfo)
 
 
 #################################################################################
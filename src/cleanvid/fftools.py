@@ -0,0 +1,100 @@
+import errno
+import re
+import subprocess
+import threading
+import weakref
+from fractions import Fraction
+from functools import lru_cache
+from typing import FrozenSet, List, Sequence, Tuple, Union
+
+
+class CommandResult(object):
+    """Exit status and captured output of a finished command."""
+
+    __slots__ = ('return_code', 'out', 'err')
+
+    def __init__(self, return_code: int, out: str = '', err: str = '') -> None:
+        self.return_code = return_code
+        self.out = out
+        self.err = err
+
+
+# commands started through StartCommand that may still be running, so a job that has run out of time (or
+# was cancelled) can have its ffmpeg children killed; once killed, no new ones start until reset
+_runningCommands = weakref.WeakSet()
+_runningCommandsLock = threading.Lock()
+_commandsKilled = threading.Event()
+
+
+def StartCommand(cmdList: List[str], **kwargs) -> subprocess.Popen:
+    """subprocess.Popen, tracked so KillCommands() can stop it (raises OSError once commands are killed)"""
+    with _runningCommandsLock:
+        if _commandsKilled.is_set():
+            raise OSError(errno.ECANCELED, 'Commands were killed', cmdList[0])
+        proc = subprocess.Popen(cmdList, **kwargs)
+        _runningCommands.add(proc)
+    return proc
+
+
+def KillCommands() -> int:
+    """kill every running command this process started and refuse new ones until ResetCommands(), returns the count"""
+    with _runningCommandsLock:
+        _commandsKilled.set()
+        procs = [x for x in _runningCommands if x.poll() is None]
+    for proc in procs:
+        try:
+            proc.kill()
+        except OSError:
+            pass
+    return len(procs)
+
+
+def ResetCommands() -> None:
+    _commandsKilled.clear()
+
+
+def CommandsKilled() -> bool:
+    return _commandsKilled.is_set()
+
+
+def RunCommand(cmdList: List[str]) -> CommandResult:
+    """run a command to completion, capturing its output (never raises, failures are in return_code/err)"""
+    try:
+        proc = StartCommand(cmdList, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except Exception as e:
+        return CommandResult(1, '', str(e))
+    with proc:
+        try:
+            out, err = proc.communicate()
+        except BaseException:
+            proc.kill()
+            raise
+    return CommandResult(proc.returncode, out, err)
+
+
+@lru_cache(maxsize=None)
+def AvailableEncoders(codecType: str = 'A') -> FrozenSet[str]:
+    """names of the (non-experimental) encoders of a type (A, V or S) this ffmpeg was built with, asked once"""
+    result = RunCommand(['ffmpeg', '-hide_banner', '-encoders'])
+    encoders = set()
+    for line in result.out.splitlines():
+        # e.g. " A....D aac                  AAC (Advanced Audio Coding)", the 4th flag marks experimental ones
+        flags, name, *_ = line.split() + ['', '']
+        if (len(flags) == 6) and (flags[0] == codecType) and (flags[3] != 'X') and name and (name != '='):
+            encoders.add(name)
+    return frozenset(encoders)
+
+
+def FilterArgEscape(value: str) -> str:
+    """quote a value for use as a filter option inside a -filter_complex/-af graph (both escaping levels)"""
+    value = re.sub(r"([\\':])", r'\\\1', value)
+    return re.sub(r"([\\'\[\],;])", r'\\\1', value)
+
+
+def WriteConcatList(fileSpec: str, pieces: Sequence[Tuple[str, Union[Fraction, float]]]) -> str:
+    """write an ffmpeg concat demuxer script of (file, duration) pieces, returns fileSpec"""
+    with open(fileSpec, 'w') as f:
+        for pieceFileSpec, duration in pieces:
+            quoted = pieceFileSpec.replace("'", "'\\''")
+            f.write(f"file '{quoted}'\nduration {float(duration):.6f}\n")
+    return fileSpec
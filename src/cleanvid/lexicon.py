@@ -0,0 +1,451 @@
+import bisect
+import hashlib
+import io
+import logging
+import os
+import pickle
+import tempfile
+import unicodedata
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from cleanvid.caselessdictionary import CaselessDictionary
+    from cleanvid.probecache import DefaultCacheDir
+except ImportError:
+    from caselessdictionary import CaselessDictionary
+    from probecache import DefaultCacheDir
+
+logger = logging.getLogger(__name__)
+
+# bump whenever the compiled form of a Lexicon changes so stale cache entries are never loaded
+LEXICON_MATCHER_VERSION = 5
+LEXICON_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LEXICON_CACHE_MAX_ENTRIES = 32
+LEXICON_DEFAULT_REPLACEMENT = '*****'
+# joins texts for a batched scan, never part of a word (so it is a word boundary) or of an entry
+SCAN_SEPARATOR = '\x00'
+
+# compiled lexicons already loaded by this process, keyed like the cache files
+_loadedLexicons = {}
+
+# folding applied to both the lexicon and the subtitle text before matching: casefold, NFKC,
+# diacritics and zero-width characters dropped, apostrophe variants unified, whitespace runs
+# (including line breaks) collapsed to one space, and leetspeak substitutions inside words
+LEET_MAP = {'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's', '!': 'i'}
+ZERO_WIDTH_CHARS = {'\u00ad', '\u180e', '\u200b', '\u200c', '\u200d', '\u2060', '\ufeff'}
+APOSTROPHE_CHARS = {'\u0060', '\u00b4', '\u2018', '\u2019', '\u201b', '\u02bc', '\u2032', '\uff07'}
+# obfuscation characters a lexicon entry's vowels (or interior) may be masked with, e.g. f*ck, sh**
+MASK_CHARS = ('*',)
+MASK_VOWELS = set('aeiouy')
+_ASCII_FOLD_TABLE = str.maketrans(
+    {**{chr(c): chr(c).lower() for c in range(ord('A'), ord('Z') + 1)}, **{c: ' ' for c in '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f'}}
+)
+_LEET_CHARS = set(LEET_MAP)
+# per-character folding, filled in as characters are first seen
+_foldTable = {}
+
+
+def DefaultLexiconCacheDir() -> str:
+    return os.path.join(DefaultCacheDir(), 'lexicon')
+
+
+def _matcher_backend() -> str:
+    try:
+        import ahocorasick
+
+        return 'ahocorasick'
+    except ImportError:
+        return 'python'
+
+
+def _fold_char(ch: str) -> str:
+    if (folded := _foldTable.get(ch)) is None:
+        if ch in ZERO_WIDTH_CHARS:
+            folded = ''
+        elif ch.isspace():
+            folded = ' '
+        elif ch in APOSTROPHE_CHARS:
+            folded = "'"
+        else:
+            folded = ''.join(
+                c
+                for c in unicodedata.normalize('NFKD', unicodedata.normalize('NFKC', ch).casefold())
+                if not unicodedata.combining(c)
+            )
+        _foldTable[ch] = folded
+    return folded
+
+
+def _leet_ok(text: str, i: int) -> bool:
+    # only substitute inside a word (or @/$ leading one), so "sh!t" folds but "shit!" and "2010" don't
+    prev = text[i - 1] if i > 0 else ''
+    nxt = text[i + 1] if i + 1 < len(text) else ''
+    prevWordish = prev.isalpha() or (prev in _LEET_CHARS)
+    nextWordish = nxt.isalpha() or (nxt in _LEET_CHARS)
+    if prevWordish and nextWordish and (prev.isalpha() or nxt.isalpha()):
+        return True
+    return (text[i] in '@$') and (not prevWordish) and nxt.isalpha()
+
+
+def FoldText(text: str) -> Tuple[str, Optional[Tuple[List[int], List[int]]]]:
+    """Fold text for matching, returns (folded, offsets).
+
+offsets is None when the folded text lines up character for character with the original, otherwise
+it is (starts, ends): for each folded character the span of the original text it came from."""
+    if text.isascii():
+        # ASCII folds one-to-one (only whitespace runs can change the length), so it's a translate plus
+        # in-place leetspeak substitution
+        folded = text.translate(_ASCII_FOLD_TABLE)
+        if '  ' not in folded:
+            if not _LEET_CHARS.isdisjoint(folded):
+                chars = None
+                for ch in _LEET_CHARS:
+                    i = text.find(ch)
+                    while i >= 0:
+                        if _leet_ok(text, i):
+                            chars = chars or list(folded)
+                            chars[i] = LEET_MAP[ch]
+                        i = text.find(ch, i + 1)
+                if chars is not None:
+                    folded = ''.join(chars)
+            return folded, None
+
+    chars, starts, ends = [], [], []
+    for i, ch in enumerate(text):
+        folded = LEET_MAP[ch] if (ch in _LEET_CHARS) and _leet_ok(text, i) else _fold_char(ch)
+        if (folded == ' ') and chars and (chars[-1] == ' '):
+            ends[-1] = i + 1
+            continue
+        for c in folded:
+            chars.append(c)
+            starts.append(i)
+            ends.append(i + 1)
+    return ''.join(chars), (starts, ends)
+
+
+def _masked_variants(folded: str) -> Iterator[str]:
+    # f*ck, sh*t, f**k: one vowel masked, every vowel masked, the whole interior masked
+    if (len(folded) < 3) or (' ' in folded) or (not folded.isalpha()):
+        return
+    interior = range(1, len(folded) - 1)
+    vowels = [i for i in interior if folded[i] in MASK_VOWELS]
+    for mask in MASK_CHARS:
+        for i in vowels:
+            yield folded[:i] + mask + folded[i + 1 :]
+        if len(vowels) > 1:
+            yield ''.join(mask if i in vowels else c for i, c in enumerate(folded))
+        if len(folded) >= 4:
+            yield folded[0] + (mask * (len(folded) - 2)) + folded[-1]
+
+
+def _is_word_boundary(lowtext: str, start: int, end: int) -> bool:
+    left = start - 1
+    right = end
+    left_ok = (left < 0) or (not lowtext[left].isalnum())
+    right_ok = (right >= len(lowtext)) or (not lowtext[right].isalnum())
+    return left_ok and right_ok
+
+
+class Automaton(object):
+    """Pure-Python Aho-Corasick automaton, a drop-in for the subset of ahocorasick.Automaton used here.
+
+Failure links are resolved and output sets merged along them once in make_automaton, so iter() is a
+single linear pass over the text reporting the same (end index, value) matches as pyahocorasick."""
+
+    def __init__(self) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Any, ...]] = [()]
+
+    def add_word(self, key: str, value: Any) -> bool:
+        if not key:
+            return False
+        state = 0
+        for ch in key:
+            nextState = self._goto[state].get(ch)
+            if nextState is None:
+                nextState = len(self._goto)
+                self._goto[state][ch] = nextState
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nextState
+        self._out[state] = (value,)
+        return True
+
+    def make_automaton(self) -> None:
+        # breadth-first, so every state's failure target is finished before its children need it
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, child in goto[state].items():
+                f = fail[state]
+                while f and (ch not in goto[f]):
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                out[child] = out[child] + out[fail[child]]
+                queue.append(child)
+
+    def iter(self, text: str) -> Iterator[Tuple[int, Any]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and (ch not in goto[state]):
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for value in out[state]:
+                yield i, value
+
+
+class Lexicon(object):
+    """A profanity list (word|replacement lines) compiled into a matcher.
+
+Uses a pyahocorasick automaton when available, otherwise the pure-Python Automaton, which finds the
+same matches. Instances pickle with their compiled matcher so they can be cached on disk with LoadLexicon.
+
+Several named lists (profiles, e.g. "mild" and "strict") can be compiled into one matcher, every entry
+tagged with the profiles it belongs to, so one scan finds the matches of all of them. swearsMap is then
+the first profile's list."""
+
+    def __init__(
+        self,
+        lines: Iterable[str] = (),
+        backend: Optional[str] = None,
+        profiles: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> None:
+        # profile name -> its entries, a single list is the one profile None
+        self.profiles = {}
+        for profile, profileLines in (profiles.items() if profiles else [(None, lines)]):
+            swearsMap = CaselessDictionary({})
+            for line in profileLines:
+                lineMap = line.rstrip('\n').split("|")
+                if len(lineMap) > 1:
+                    swearsMap[lineMap[0]] = lineMap[1]
+                else:
+                    swearsMap[lineMap[0]] = LEXICON_DEFAULT_REPLACEMENT
+            self.profiles[profile] = swearsMap
+        self.swearsMap = next(iter(self.profiles.values()))
+
+        self.backend = backend or _matcher_backend()
+        if self.backend == 'ahocorasick':
+            import ahocorasick
+
+            self.automaton = ahocorasick.Automaton()
+        else:
+            self.automaton = Automaton()
+
+        # entries are compiled against the same folding as the text; entries folding to the same string
+        # (b1tch, bitch) share an automaton entry, a hit spelled exactly like one of them gets that entry's
+        # replacement and any other hit the one already in folded form (or else the longest)
+        profileKeys = {}
+        for profile, swearsMap in self.profiles.items():
+            foldedKeys = {}
+            for k in sorted(list(swearsMap.keys()), key=lambda x: -len(x)):
+                if (folded := FoldText(k)[0]) and (SCAN_SEPARATOR not in folded):
+                    keys = foldedKeys.setdefault(folded, [])
+                    if k.lower() == folded:
+                        keys.insert(0, k)
+                    else:
+                        keys.append(k)
+            maskedKeys = {}
+            for folded, keys in foldedKeys.items():
+                for masked in _masked_variants(folded):
+                    if (masked not in foldedKeys) and (masked not in maskedKeys):
+                        maskedKeys[masked] = keys[:1]
+            for folded, keys in chain(foldedKeys.items(), maskedKeys.items()):
+                profileKeys.setdefault(folded, {})[profile] = tuple(keys)
+        # each automaton entry carries its length and the (profile, keys) pairs it is a hit for
+        for folded, keys in profileKeys.items():
+            self.automaton.add_word(folded, (len(folded), tuple(keys.items())))
+        self.automaton.make_automaton()
+
+    @classmethod
+    def fromFile(cls, fileSpec: str, backend: Optional[str] = None) -> 'Lexicon':
+        with open(fileSpec) as f:
+            return cls(f, backend)
+
+    def scanProfiles(self, texts: List[str]) -> Dict[Optional[str], List[List[Tuple[int, int, str]]]]:
+        """Find the profanity in every text for every profile with one automaton pass over all of them.
+
+The folded texts are joined with a separator that can't be part of a word or a lexicon entry,
+scanned once, and each hit is mapped back to its text and through the folding offsets to the
+original characters, then handed to each profile it is tagged with. Returns, per profile and then
+per text, the non-overlapping (start, end, key) matches that replace() would substitute, in order."""
+        folds = [FoldText(x) for x in texts]
+        offsets = []
+        pos = 0
+        for folded, foldOffsets in folds:
+            offsets.append(pos)
+            pos += len(folded) + len(SCAN_SEPARATOR)
+        buffer = SCAN_SEPARATOR.join(x[0] for x in folds)
+
+        hits = {profile: [[] for _ in folds] for profile in self.profiles}
+        for end_idx, (klen, keys) in self.automaton.iter(buffer):
+            start_idx = end_idx - klen + 1
+            if _is_word_boundary(buffer, start_idx, end_idx + 1):
+                idx = bisect.bisect_right(offsets, start_idx) - 1
+                s, e = start_idx - offsets[idx], end_idx + 1 - offsets[idx]
+                if (foldOffsets := folds[idx][1]) is not None:
+                    s, e = foldOffsets[0][s], foldOffsets[1][e - 1]
+                for profile, candidates in keys:
+                    key = candidates[0]
+                    if len(candidates) > 1:
+                        spelled = texts[idx][s:e].lower()
+                        key = next((k for k in candidates if k.lower() == spelled), key)
+                    hits[profile][idx].append((s, e, key))
+
+        result = {}
+        for profile, profileHits in hits.items():
+            result[profile] = []
+            for matches in profileHits:
+                selected = []
+                if matches:
+                    matches.sort(key=lambda x: (x[0], -(x[1] - x[0])))
+                    last = 0
+                    for s, e, key in matches:
+                        if s < last:
+                            continue
+                        selected.append((s, e, key))
+                        last = e
+                result[profile].append(selected)
+        return result
+
+    def scan(self, texts: List[str], profile: Optional[str] = None) -> List[List[Tuple[int, int, str]]]:
+        """scanProfiles() for one profile (the first if None)"""
+        results = self.scanProfiles(texts)
+        return results[profile] if profile in results else next(iter(results.values()))
+
+    def applyMatches(self, text: str, matches: List[Tuple[int, int, str]], profile: Optional[str] = None) -> str:
+        if not matches:
+            return text
+        swearsMap = self.profiles.get(profile, self.swearsMap)
+        res = []
+        last = 0
+        for s, e, key in matches:
+            res.append(text[last:s])
+            res.append(swearsMap.get(key, LEXICON_DEFAULT_REPLACEMENT))
+            last = e
+        res.append(text[last:])
+        return ''.join(res)
+
+    def replace(self, text: str, profile: Optional[str] = None) -> str:
+        return self.applyMatches(text, self.scan([text], profile)[0], profile)
+
+
+def LexiconCacheKey(content: bytes, backend: Optional[str] = None) -> str:
+    digest = hashlib.sha256(content).hexdigest()
+    return f'{digest}-{backend or _matcher_backend()}-v{LEXICON_MATCHER_VERSION}'
+
+
+def _evict(cacheDir: str, maxBytes: int, maxEntries: int) -> None:
+    # least recently used first (hits refresh the mtime)
+    entries = []
+    for name in os.listdir(cacheDir):
+        if name.endswith('.pickle'):
+            try:
+                st = os.stat(os.path.join(cacheDir, name))
+                entries.append((st.st_mtime, st.st_size, name))
+            except OSError:
+                pass
+    entries.sort(reverse=True)
+    total = 0
+    for i, (mtime, size, name) in enumerate(entries):
+        total += size
+        if (i >= maxEntries) or (total > maxBytes):
+            try:
+                os.remove(os.path.join(cacheDir, name))
+            except OSError:
+                pass
+
+
+def _load_compiled(
+    content: bytes,
+    build: Callable[[], Lexicon],
+    cacheDir: Optional[str],
+    maxBytes: int,
+    maxEntries: int,
+) -> Lexicon:
+    key = LexiconCacheKey(content)
+    if (lexicon := _loadedLexicons.get(key)) is not None:
+        return lexicon
+
+    cacheFileSpec = None
+    if cacheDir is None:
+        cacheDir = DefaultLexiconCacheDir()
+    if cacheDir:
+        cacheFileSpec = os.path.join(cacheDir, key + '.pickle')
+        try:
+            with open(cacheFileSpec, 'rb') as f:
+                lexicon = pickle.load(f)
+            os.utime(cacheFileSpec)
+        except FileNotFoundError:
+            lexicon = None
+        except Exception as e:
+            logger.debug(f'Could not load cached lexicon {cacheFileSpec}: {e}')
+            lexicon = None
+
+    if lexicon is None:
+        lexicon = build()
+        if cacheFileSpec:
+            tmpFileSpec = None
+            try:
+                os.makedirs(cacheDir, exist_ok=True)
+                with tempfile.NamedTemporaryFile(dir=cacheDir, suffix='.tmp', delete=False) as f:
+                    tmpFileSpec = f.name
+                    pickle.dump(lexicon, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmpFileSpec, cacheFileSpec)
+                _evict(cacheDir, maxBytes, maxEntries)
+            except Exception as e:
+                logger.debug(f'Could not cache lexicon {cacheFileSpec}: {e}')
+                if tmpFileSpec and os.path.isfile(tmpFileSpec):
+                    os.remove(tmpFileSpec)
+
+    _loadedLexicons[key] = lexicon
+    return lexicon
+
+
+def _lines(content: bytes) -> io.TextIOWrapper:
+    return io.TextIOWrapper(io.BytesIO(content), encoding='utf-8', errors='replace')
+
+
+def LoadLexicon(
+    fileSpec: str,
+    cacheDir: Optional[str] = None,
+    maxBytes: int = LEXICON_CACHE_MAX_BYTES,
+    maxEntries: int = LEXICON_CACHE_MAX_ENTRIES,
+) -> Lexicon:
+    """Load the compiled Lexicon for a profanity list file.
+
+The compiled matcher is pickled to cacheDir (the user cache directory if None, no disk cache if '')
+under the content hash of the list plus the matcher version, and kept in memory for the life of the
+process. The disk cache is trimmed least-recently-used first to maxEntries files and maxBytes."""
+    with open(fileSpec, 'rb') as f:
+        content = f.read()
+    return _load_compiled(content, lambda: Lexicon(_lines(content)), cacheDir, maxBytes, maxEntries)
+
+
+def LoadProfileLexicon(
+    profiles: Dict[str, str],
+    cacheDir: Optional[str] = None,
+    maxBytes: int = LEXICON_CACHE_MAX_BYTES,
+    maxEntries: int = LEXICON_CACHE_MAX_ENTRIES,
+) -> Lexicon:
+    """Load one compiled Lexicon for several named profanity list files (profile name -> file), in order.
+
+Cached like LoadLexicon, under the hash of the profile names and the contents of their lists."""
+    contents = {}
+    for profile, fileSpec in profiles.items():
+        with open(fileSpec, 'rb') as f:
+            contents[profile] = f.read()
+    # names and lengths are framed in so no two sets of profiles hash the same content
+    content = b'profiles\0' + b''.join(
+        f'{profile}\0{len(x)}\0'.encode('utf-8') + x for profile, x in contents.items()
+    )
+    return _load_compiled(
+        content,
+        lambda: Lexicon(profiles={profile: _lines(x) for profile, x in contents.items()}),
+        cacheDir,
+        maxBytes,
+        maxEntries,
+    )
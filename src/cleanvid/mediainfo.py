@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Any, Dict, List, Optional
+
+
+def _int_or_none(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _tag(raw: Dict[str, Any], name: str) -> Optional[str]:
+    tags = raw.get('tags', {})
+    return tags.get(name, tags.get(name.lower(), None))
+
+
+class StreamInfo(object):
+    """A single stream from an ffprobe -show_streams result."""
+
+    __slots__ = (
+        'index',
+        'codecType',
+        'codecName',
+        'language',
+        'channels',
+        'channelLayout',
+        'sampleRate',
+        'bitRate',
+        'startTime',
+        'duration',
+        'raw',
+    )
+
+    def __init__(self, raw: Dict[str, Any]) -> None:
+        self.raw = raw
+        self.index = _int_or_none(raw.get('index'))
+        self.codecType = raw.get('codec_type', '')
+        self.codecName = raw.get('codec_name', '')
+        self.language = raw.get('tags', {}).get('language', '')
+        self.channels = _int_or_none(raw.get('channels'))
+        self.channelLayout = raw.get('channel_layout', '')
+        self.sampleRate = _int_or_none(raw.get('sample_rate'))
+        self.bitRate = _int_or_none(raw.get('bit_rate'))
+        if self.bitRate is None:
+            # matroska (mkvmerge) keeps per-stream bit rates in statistics tags
+            self.bitRate = _int_or_none(_tag(raw, 'BPS') or _tag(raw, 'BPS-eng'))
+        self.startTime = _float_or_none(raw.get('start_time'))
+        self.duration = _float_or_none(raw.get('duration'))
+        if (self.duration is None) and (tagDuration := _tag(raw, 'DURATION')):
+            # matroska only has per-stream durations as HH:MM:SS.nnnnnnnnn tags
+            hours, _, rest = tagDuration.partition(':')
+            minutes, _, seconds = rest.partition(':')
+            self.duration = _float_or_none(seconds)
+            if self.duration is not None:
+                self.duration += (_int_or_none(hours) or 0) * 3600 + (_int_or_none(minutes) or 0) * 60
+
+    def __repr__(self):
+        return f'StreamInfo({self.index}, {self.codecType}, {self.codecName}, {self.language})'
+
+
+class MediaInfo(object):
+    """Parsed result of a single ffprobe -show_format -show_streams probe of a media file.
+
+Everything cleanvid needs to know about an input (subtitle languages, audio stream layout, channel
+counts, duration) is answered from this object so that a file is only probed once per run."""
+
+    def __init__(self, fileSpec: str, probe: Dict[str, Any]) -> None:
+        self.fileSpec = fileSpec
+        self.probe = probe if isinstance(probe, dict) else {}
+        self.format = self.probe.get('format', {})
+        self.streams = [StreamInfo(x) for x in self.probe.get('streams', [])]
+
+    def __repr__(self):
+        return f'MediaInfo({self.fileSpec}, {self.streams})'
+
+    @property
+    def duration(self) -> Optional[float]:
+        return _float_or_none(self.format.get('duration'))
+
+    @property
+    def startTime(self) -> Optional[float]:
+        return _float_or_none(self.format.get('start_time'))
+
+    def timelineOrigin(self, stream: Optional[StreamInfo] = None) -> Fraction:
+        """the packet time (seconds) the file's timeline begins at: subtitle cue and mute times count from it and
+ffmpeg shifts input timestamps to start there. That's the file's start time (or the stream's, if unknown),
+and .ts/.m2ts files rarely start at 0."""
+        start = self.startTime if (self.startTime is not None) else (stream.startTime if stream is not None else None)
+        return Fraction(str(start)) if start is not None else Fraction(0)
+
+    def relativeStart(self, stream: StreamInfo) -> Fraction:
+        """where a stream starts on the file's timeline (what -itsoffset puts a spliced copy of it at)"""
+        if stream.startTime is None:
+            return Fraction(0)
+        return Fraction(str(stream.startTime)) - self.timelineOrigin(stream)
+
+    def streamsOfType(self, codecType: str) -> List[StreamInfo]:
+        return [x for x in self.streams if x.codecType == codecType]
+
+    @property
+    def videoStreams(self) -> List[StreamInfo]:
+        return self.streamsOfType('video')
+
+    @property
+    def audioStreams(self) -> List[StreamInfo]:
+        return self.streamsOfType('audio')
+
+    @property
+    def subtitleStreams(self) -> List[StreamInfo]:
+        return self.streamsOfType('subtitle')
+
+    def subtitleMap(self) -> 'OrderedDict[int, str]':
+        result = OrderedDict()
+        for stream in self.subtitleStreams:
+            if stream.index is not None:
+                result[stream.index] = stream.language
+        return result
+
+    def audioStreamsInfo(self) -> Dict[str, List[Dict[str, Any]]]:
+        # same shape as ffprobe -select_streams a -show_entries stream=index,codec_name,sample_rate,channel_layout:stream_tags=language
+        result = []
+        for stream in self.audioStreams:
+            entry = {
+                k: stream.raw[k] for k in ('index', 'codec_name', 'sample_rate', 'channel_layout') if k in stream.raw
+            }
+            if stream.language:
+                entry['tags'] = {'language': stream.language}
+            result.append(entry)
+        return {'streams': result}
+
+    def hasAudioMoreThanStereo(self) -> bool:
+        return any((x.channels or 0) > 2 for x in self.audioStreams)
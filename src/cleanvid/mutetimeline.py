@@ -0,0 +1,141 @@
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from cleanvid.subrip import FormatSrtTime
+except ImportError:
+    from subrip import FormatSrtTime
+
+
+def _normalized(intervals: Iterable[Sequence[int]]) -> array:
+    # sort, drop empty intervals, clamp to zero and merge overlapping/touching intervals into flat bounds
+    bounds = array('q')
+    for start, end in sorted((max(int(start), 0), int(end)) for start, end in intervals):
+        if end <= start:
+            continue
+        if bounds and (start <= bounds[-1]):
+            if end > bounds[-1]:
+                bounds[-1] = end
+        else:
+            bounds.append(start)
+            bounds.append(end)
+    return bounds
+
+
+class MuteTimeline(object):
+    """Sorted, non-overlapping [start, end) mute intervals in integer milliseconds.
+
+Intervals are kept flat in a single array('q') (start0, end0, start1, end1, ...), which is strictly
+increasing once normalized, so point and range queries are a bisect. Operations return new timelines;
+every output (ffmpeg commands, EDL, PlexAutoSkip markers, JSON) is rendered from the same plan."""
+
+    __slots__ = ('_bounds',)
+
+    def __init__(self, intervals: Iterable[Sequence[int]] = ()) -> None:
+        self._bounds = _normalized(intervals)
+
+    def __len__(self) -> int:
+        return len(self._bounds) // 2
+
+    def __bool__(self) -> bool:
+        return len(self._bounds) > 0
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        bounds = self._bounds
+        return zip(bounds[0::2], bounds[1::2])
+
+    def __getitem__(self, idx: int) -> Tuple[int, int]:
+        idx = range(len(self))[idx]
+        return (self._bounds[2 * idx], self._bounds[2 * idx + 1])
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, MuteTimeline) and (self._bounds == other._bounds)
+
+    def __repr__(self):
+        return f'MuteTimeline({list(self)})'
+
+    @property
+    def start(self) -> Optional[int]:
+        return self._bounds[0] if self._bounds else None
+
+    @property
+    def end(self) -> Optional[int]:
+        return self._bounds[-1] if self._bounds else None
+
+    @property
+    def duration(self) -> int:
+        """total muted milliseconds"""
+        bounds = self._bounds
+        return sum(bounds[1::2]) - sum(bounds[0::2])
+
+    def contains(self, t: int) -> bool:
+        return (bisect_right(self._bounds, t) % 2) == 1
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """True if any interval intersects [start, end)"""
+        if end <= start:
+            return False
+        idx = bisect_right(self._bounds, start)
+        return (idx % 2 == 1) or ((idx < len(self._bounds)) and (self._bounds[idx] < end))
+
+    def overlapping(self, start: int, end: int) -> 'MuteTimeline':
+        """the intervals intersecting [start, end), whole (not clipped)"""
+        bounds = self._bounds
+        lo = bisect_right(bounds, start)
+        lo -= lo % 2
+        hi = bisect_right(bounds, end - 1)
+        hi += hi % 2
+        return self._fromBounds(bounds[lo:hi])
+
+    def pad(self, before: int, after: Optional[int] = None) -> 'MuteTimeline':
+        after = before if after is None else after
+        return MuteTimeline((start - before, end + after) for start, end in self)
+
+    def shift(self, offset: int) -> 'MuteTimeline':
+        return MuteTimeline((start + offset, end + offset) for start, end in self)
+
+    def merge(self, *others: 'MuteTimeline') -> 'MuteTimeline':
+        """union of this timeline and others"""
+        intervals = list(self)
+        for other in others:
+            intervals.extend(other)
+        return MuteTimeline(intervals)
+
+    def clip(self, end: Optional[int], start: int = 0) -> 'MuteTimeline':
+        """intersection with [start, end), e.g. clip(durationMs) to keep mutes inside the media"""
+        if end is None:
+            end = max(self.end or 0, start)
+        return MuteTimeline((max(s, start), min(e, end)) for s, e in self.overlapping(start, end))
+
+    def invert(self, duration: int) -> 'MuteTimeline':
+        """the unmuted gaps within [0, duration)"""
+        edges = [0] + list(self.clip(duration)._bounds) + [duration]
+        return MuteTimeline(zip(edges[0::2], edges[1::2]))
+
+    @classmethod
+    def _fromBounds(cls, bounds: array) -> 'MuteTimeline':
+        timeline = cls.__new__(cls)
+        timeline._bounds = array('q', bounds)
+        return timeline
+
+    ######## renderers ###########################################################
+
+    def toSendCmd(self, target: str) -> str:
+        """asendcmd script silencing the named volume filter for the duration of each interval"""
+        return ''.join(
+            f"{format(start / 1000.0, '.3f')}-{format(end / 1000.0, '.3f')} "
+            f"[enter] {target} volume 0, [leave] {target} volume 1;\n"
+            for start, end in self
+        )
+
+    def toEdl(self) -> str:
+        """MPlayer EDL mute actions"""
+        return ''.join(f"{format(start / 1000.0, '.1f')}\t{format(end / 1000.0, '.3f')}\t1\n" for start, end in self)
+
+    def toPlexMarkers(self, mode: str = 'volume') -> List[Dict[str, Any]]:
+        """PlexAutoSkip markers"""
+        return [{"start": start, "end": end, "mode": mode} for start, end in self]
+
+    def toJson(self) -> List[Dict[str, str]]:
+        return [{"start": FormatSrtTime(start), "end": FormatSrtTime(end)} for start, end in self]
@@ -0,0 +1,148 @@
+import queue
+import subprocess
+import tempfile
+import threading
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from cleanvid.fftools import CommandResult, StartCommand
+    from cleanvid.mutetimeline import MuteTimeline
+except ImportError:
+    from fftools import CommandResult, StartCommand
+    from mutetimeline import MuteTimeline
+
+PCM_CHUNK_FRAMES = 1 << 16
+# decoded chunks allowed in flight between the decoder and the encoder, which bounds memory use
+PCM_QUEUE_CHUNKS = 8
+PCM_FADE_MS = 10
+
+
+def PcmEngineAvailable() -> bool:
+    return np is not None
+
+
+class PcmMuteEngine(object):
+    """Mute decoded audio with a NumPy gain envelope between two ffmpeg processes.
+
+The decoder writes 32-bit float PCM to a pipe, which is read in fixed-size chunks. Each chunk is multiplied
+by the envelope of the mute windows that overlap it. The envelope is zero inside a window, with precomputed
+linear fades applied by slicing at either edge. The chunk is then queued for a writer feeding the encoder's
+stdin. The queue is bounded, so memory use doesn't depend on the length of the film, and the decoder, the
+NumPy work and the encoder all run at the same time."""
+
+    def __init__(
+        self,
+        timeline: MuteTimeline,
+        sampleRate: int,
+        channels: int,
+        fadeMs: int = PCM_FADE_MS,
+        chunkFrames: int = PCM_CHUNK_FRAMES,
+        queueChunks: int = PCM_QUEUE_CHUNKS,
+    ) -> None:
+        if np is None:
+            raise ImportError('numpy is required for the pcm mute engine')
+        self.timeline = timeline
+        self.sampleRate = sampleRate
+        self.channels = channels
+        self.chunkFrames = chunkFrames
+        self.queueChunks = queueChunks
+        self.fadeFrames = max(round(fadeMs * sampleRate / 1000), 1)
+        self.fadeOut = np.linspace(1.0, 0.0, self.fadeFrames + 1, dtype=np.float32)[1:]
+        self.fadeIn = self.fadeOut[::-1].copy()
+        self.fadeMs = self.fadeFrames * 1000 / sampleRate
+        self.framesProcessed = 0
+
+    def _frame(self, ms: int) -> int:
+        return (ms * self.sampleRate) // 1000
+
+    def envelope(self, firstFrame: int, frames: int) -> Optional['np.ndarray']:
+        """gain for frames [firstFrame, firstFrame + frames), None if nothing in that range is muted"""
+        startMs = (firstFrame * 1000) // self.sampleRate
+        endMs = -(-((firstFrame + frames) * 1000) // self.sampleRate)
+        windows = self.timeline.overlapping(startMs - int(self.fadeMs) - 1, endMs + int(self.fadeMs) + 1)
+        if not windows:
+            return None
+        gain = np.ones(frames, dtype=np.float32)
+        lastFrame = firstFrame + frames
+        for start, end in windows:
+            muteStart, muteEnd = self._frame(start), self._frame(end)
+            for rampStart, ramp in ((muteStart - self.fadeFrames, self.fadeOut), (muteEnd, self.fadeIn)):
+                lo, hi = max(rampStart, firstFrame), min(rampStart + self.fadeFrames, lastFrame)
+                if lo < hi:
+                    np.minimum(
+                        gain[lo - firstFrame : hi - firstFrame],
+                        ramp[lo - rampStart : hi - rampStart],
+                        out=gain[lo - firstFrame : hi - firstFrame],
+                    )
+            lo, hi = max(muteStart, firstFrame), min(muteEnd, lastFrame)
+            if lo < hi:
+                gain[lo - firstFrame : hi - firstFrame] = 0.0
+        return gain
+
+    def _read_chunks(self, source, chunks: queue.Queue, errors: list) -> None:
+        frameBytes = 4 * self.channels
+        try:
+            while True:
+                buf = bytearray(self.chunkFrames * frameBytes)
+                view = memoryview(buf)
+                filled = 0
+                while (filled < len(buf)) and (count := source.readinto(view[filled:])):
+                    filled += count
+                filled -= filled % frameBytes
+                if filled == 0:
+                    break
+                samples = np.frombuffer(buf, dtype=np.float32, count=filled // 4).reshape(-1, self.channels)
+                if (gain := self.envelope(self.framesProcessed, len(samples))) is not None:
+                    samples *= gain[:, np.newaxis]
+                self.framesProcessed += len(samples)
+                chunks.put(view[:filled])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            chunks.put(None)
+
+    def run(self, decodeCmd: List[str], encodeCmd: List[str]) -> CommandResult:
+        """run decodeCmd (writing f32le PCM to stdout) into encodeCmd (reading it from stdin) through the envelope"""
+        with tempfile.TemporaryFile() as decodeErr, tempfile.TemporaryFile() as encodeErr:
+            try:
+                decoder = StartCommand(decodeCmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=decodeErr)
+            except OSError as e:
+                return CommandResult(1, '', str(e))
+            try:
+                encoder = StartCommand(encodeCmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=encodeErr)
+            except OSError as e:
+                decoder.kill()
+                decoder.wait()
+                return CommandResult(1, '', str(e))
+
+            chunks = queue.Queue(maxsize=self.queueChunks)
+            errors = []
+            reader = threading.Thread(target=self._read_chunks, args=(decoder.stdout, chunks, errors), daemon=True)
+            reader.start()
+            try:
+                while (chunk := chunks.get()) is not None:
+                    encoder.stdin.write(chunk)
+            except BrokenPipeError:
+                # the encoder has gone away, its exit status and stderr say why
+                decoder.kill()
+                while chunks.get() is not None:
+                    pass
+            finally:
+                try:
+                    encoder.stdin.close()
+                except BrokenPipeError:
+                    pass
+            reader.join()
+            decoder.stdout.close()
+            decodeCode, encodeCode = decoder.wait(), encoder.wait()
+            decodeErr.seek(0)
+            encodeErr.seek(0)
+            err = (decodeErr.read() + encodeErr.read()).decode('utf-8', errors='replace')
+            if errors:
+                err += f'\n{errors[0]}'
+            return CommandResult(decodeCode or encodeCode or (1 if errors else 0), '', err)
@@ -0,0 +1,76 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+def DefaultCacheDir() -> str:
+    return os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'cleanvid')
+
+
+def DefaultProbeCacheFileSpec() -> str:
+    return os.path.join(DefaultCacheDir(), 'probe.sqlite')
+
+
+class ProbeCache(object):
+    """Persistent SQLite store of ffprobe results.
+
+Entries are keyed by the file's real path and are only returned while its size, mtime and inode are
+unchanged, so a modified or replaced file is transparently probed again. Safe to share between threads."""
+
+    def __init__(self, fileSpec: Optional[str] = None) -> None:
+        self.fileSpec = fileSpec if fileSpec else DefaultProbeCacheFileSpec()
+        if os.path.dirname(self.fileSpec):
+            os.makedirs(os.path.dirname(self.fileSpec), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.fileSpec, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS probe ('
+                'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, probed REAL, probe TEXT)'
+            )
+
+    def __del__(self):
+        self.close()
+
+    def close(self) -> None:
+        conn = getattr(self, '_conn', None)
+        if conn is not None:
+            self._conn = None
+            conn.close()
+
+    @staticmethod
+    def fileKey(fileSpec: str) -> Optional[Tuple[str, int, int, int]]:
+        try:
+            st = os.stat(fileSpec)
+        except OSError:
+            return None
+        return (os.path.realpath(fileSpec), st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def get(self, fileSpec: str) -> Optional[Dict[str, Any]]:
+        if (self._conn is None) or ((key := self.fileKey(fileSpec)) is None):
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT probe FROM probe WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?', key
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def put(self, fileSpec: str, probe: Dict[str, Any]) -> None:
+        if (self._conn is None) or ((key := self.fileKey(fileSpec)) is None):
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO probe (path, size, mtime_ns, inode, probed, probe) VALUES (?, ?, ?, ?, ?, ?)',
+                key + (time.time(), json.dumps(probe)),
+            )
+
+    def __contains__(self, fileSpec: object) -> bool:
+        return self.get(str(fileSpec)) is not None
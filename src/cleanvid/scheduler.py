@@ -0,0 +1,172 @@
+import argparse
+import concurrent.futures
+import math
+import os
+import shutil
+import subprocess
+import threading
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from cleanvid.fftools import KillCommands, ResetCommands
+except ImportError:
+    from fftools import KillCommands, ResetCommands
+
+# what a job mostly does, from its options: "copy" remuxes the video and re-encodes only the muted audio
+# (I/O bound), "audio" writes just the audio, "encode" re-encodes (or burns subtitles into) the video
+JOB_CLASSES = ['copy', 'audio', 'encode']
+# cores (ffmpeg -threads) a job of each class is given out of the budget
+JOB_CLASS_THREADS = {'copy': 1, 'audio': 1, 'encode': 8}
+# rough seconds of work per second of media, to order jobs shortest first
+JOB_CLASS_COST = {'copy': 0.02, 'audio': 0.01, 'encode': 1.0}
+SCHEDULE_ORDERS = ['fifo', 'sjf', 'priority']
+SCHEDULE_ORDER_DEFAULT = 'fifo'
+
+
+def ClassifyJob(args: argparse.Namespace) -> str:
+    """the job class of parsed cleanvid arguments"""
+    if args.reEncodeVideo or args.hardCode or args.smartBurn:
+        return 'encode'
+    if args.audioOnly:
+        return 'audio'
+    return 'copy'
+
+
+def JobThreads(args: argparse.Namespace) -> Optional[int]:
+    """the most threads any of the job's ffmpeg processes was explicitly given, None if left to ffmpeg"""
+    threads = [x for x in (args.threads, args.threadsInput, args.threadsEncoding) if x is not None]
+    return max(threads) if threads else None
+
+
+class ScheduledJob(object):
+    """A job with what the scheduler decided about it."""
+
+    __slots__ = ('index', 'args', 'jobClass', 'threads', 'cost', 'priority', 'timeout')
+
+    def __init__(
+        self,
+        index: int,
+        args: argparse.Namespace,
+        jobClass: str,
+        threads: int,
+        cost: float,
+        priority: int = 0,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.index = index
+        self.args = args
+        self.jobClass = jobClass
+        self.threads = threads
+        self.cost = cost
+        self.priority = priority
+        self.timeout = timeout
+
+
+def PlanJobs(
+    jobs: Sequence[argparse.Namespace],
+    durations: Sequence[Optional[float]],
+    coreBudget: int,
+    order: str = SCHEDULE_ORDER_DEFAULT,
+    priorities: Optional[Sequence[int]] = None,
+    timeouts: Optional[Sequence[Optional[float]]] = None,
+) -> List[ScheduledJob]:
+    """Classify every job, size its share of the core budget and put them in the order they should start.
+
+Jobs without explicit thread options get their class's share (never more than the whole budget), and
+their ffmpeg processes are told to use that many threads; chunked encodes split it between their workers.
+"sjf" runs the least work (class cost times probed duration, unknown durations last) first, "priority"
+runs higher priorities first and shortest first within one, "fifo" keeps the given order."""
+    planned = []
+    for i, args in enumerate(jobs):
+        jobClass = ClassifyJob(args)
+        if (threads := JobThreads(args)) is None:
+            threads = max(min(JOB_CLASS_THREADS[jobClass], coreBudget), 1)
+            args.threads = threads
+            if args.encodeWorkers and (args.encodeWorkers > 1) and (jobClass == 'encode'):
+                args.threads = None
+                args.threadsEncoding = max(threads // args.encodeWorkers, 1)
+                threads = max(threads, args.encodeWorkers)
+        cost = (JOB_CLASS_COST[jobClass] * durations[i]) if durations[i] else math.inf
+        planned.append(
+            ScheduledJob(
+                i,
+                args,
+                jobClass,
+                threads,
+                cost,
+                priorities[i] if priorities else 0,
+                timeouts[i] if timeouts else None,
+            )
+        )
+    if order == 'sjf':
+        planned.sort(key=lambda x: (x.cost, x.index))
+    elif order == 'priority':
+        planned.sort(key=lambda x: (-x.priority, x.cost, x.index))
+    return planned
+
+
+def RunScheduledJobs(
+    executor: concurrent.futures.Executor,
+    planned: Sequence[ScheduledJob],
+    coreBudget: int,
+    fn: Callable[[ScheduledJob], Any],
+    maxJobs: Optional[int] = None,
+) -> Iterator[Tuple[ScheduledJob, concurrent.futures.Future]]:
+    """Submit planned jobs to executor while their threads fit in the core budget, yielding each as it finishes.
+
+Jobs are started in order, a later job that fits may start ahead of one that doesn't (so cores aren't left
+idle behind a big encode), and a job bigger than the whole budget runs once nothing else is."""
+    pending = list(planned)
+    running = {}
+    used = 0
+    while pending or running:
+        i = 0
+        while (i < len(pending)) and ((maxJobs is None) or (len(running) < maxJobs)):
+            job = pending[i]
+            if (not running) or (used + job.threads <= coreBudget):
+                running[executor.submit(fn, job)] = job
+                used += job.threads
+                pending.pop(i)
+            else:
+                i += 1
+        done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            job = running.pop(future)
+            used -= job.threads
+            yield job, future
+
+
+def LowerPriority(niceness: Optional[int] = None, idleIo: bool = False) -> None:
+    """lower this process's CPU (nice) and I/O (ionice idle class) priority, inherited by the ffmpeg it starts"""
+    if niceness and hasattr(os, 'nice'):
+        os.nice(niceness)
+    if idleIo and (ionice := shutil.which('ionice')):
+        subprocess.run([ionice, '-c', '3', '-p', str(os.getpid())], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class JobDeadline(object):
+    """Kills the running commands (ffmpeg) of this process if a job outlives its timeout.
+
+Used as a context manager around one job; expired is True afterwards if it had to."""
+
+    def __init__(self, timeout: Optional[float]) -> None:
+        self.timeout = timeout
+        self.expired = False
+        self._timer = None
+
+    def _expire(self) -> None:
+        self.expired = True
+        KillCommands()
+
+    def __enter__(self) -> 'JobDeadline':
+        ResetCommands()
+        if self.timeout:
+            self._timer = threading.Timer(self.timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        ResetCommands()
@@ -0,0 +1,621 @@
+import argparse
+import asyncio
+import concurrent.futures
+import hmac
+import inspect
+import ipaddress
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    from cleanvid.batch import _load_batch_lexicons
+    from cleanvid.cleanvid import (
+        SUBTITLE_DEFAULT_LANG,
+        SWEARS_DEFAULT_FILESPEC,
+        DefaultOutputFileSpec,
+        ExtractSubtitlesText,
+        GetMediaInfo,
+        SplitLanguageIfForced,
+        VidCleaner,
+    )
+    from cleanvid.fftools import KillCommands
+    from cleanvid.scheduler import JobDeadline, LowerPriority
+    from cleanvid.watch import _warm_encoders
+except ImportError:
+    from batch import _load_batch_lexicons
+    from cleanvid import (
+        SUBTITLE_DEFAULT_LANG,
+        SWEARS_DEFAULT_FILESPEC,
+        DefaultOutputFileSpec,
+        ExtractSubtitlesText,
+        GetMediaInfo,
+        SplitLanguageIfForced,
+        VidCleaner,
+    )
+    from fftools import KillCommands
+    from scheduler import JobDeadline, LowerPriority
+    from watch import _warm_encoders
+
+logger = logging.getLogger(__name__)
+
+SERVER_HOST_DEFAULT = '127.0.0.1'
+SERVER_PORT_DEFAULT = 8765
+SERVER_WORKERS_DEFAULT = 2
+SERVER_MAX_BODY_BYTES = 1024 * 1024
+SERVER_MAX_HEADERS = 100
+# seconds between keep-alive comments on an idle event stream
+SERVER_KEEPALIVE_SECONDS = 15.0
+# finished jobs (with their events) kept for GET /jobs, the oldest are dropped first
+SERVER_FINISHED_JOBS_KEPT = 1000
+# pool processes learn which jobs are cancelled from this many shared slots (job serial modulo the count)
+SERVER_CANCEL_SLOTS = 256
+# VidCleaner.__init__ arguments a job can't give: the server probes the input itself, raw ffmpeg parameters
+# could name files anywhere (and so get around the output root), and the lexicon cache is the server's own
+SERVER_JOB_INTERNAL_OPTIONS = {'self', 'mediaInfo', 'checkpoint', 'vParams', 'aParams', 'lexiconCacheDir'}
+SERVER_JOB_FINAL_STATES = {'cleaned', 'unchanged', 'failed', 'cancelled'}
+# job options naming files a job writes, which must be under the server's output root
+SERVER_JOB_OUTPUT_OPTIONS = ('oVidFileSpec', 'oSubsFileSpec', 'plexAutoSkipJson')
+
+
+def JobOptions(options: Any, outputRoot: Optional[str] = None) -> Dict[str, Any]:
+    """VidCleaner keyword arguments for a job's options (named as VidCleaner.__init__'s arguments).
+
+iVidFileSpec is required, the output defaults to cleanvid's usual name (in outputRoot if given, otherwise
+next to the input), the clean subtitles (and EDL and JSON files) go next to the output, the profanity
+list defaults to the bundled one, and subtitles not given are extracted from the input. With outputRoot,
+relative output paths are taken from it and every output must be under it. Raises ValueError for
+anything VidCleaner doesn't take or a job may not write."""
+    if not isinstance(options, dict):
+        raise ValueError('A job is a JSON object of VidCleaner options')
+    params = inspect.signature(VidCleaner.__init__).parameters
+    unknown = sorted(str(x) for x in options if (x not in params) or (x in SERVER_JOB_INTERNAL_OPTIONS))
+    if unknown:
+        raise ValueError(f'Unknown VidCleaner option(s) {", ".join(unknown)}')
+    if not options.get('iVidFileSpec'):
+        raise ValueError('iVidFileSpec is required')
+    kwargs = dict(options)
+    kwargs.setdefault('iSubsFileSpec', None)
+    kwargs.setdefault('oSubsFileSpec', None)
+    kwargs.setdefault('iSwearsFileSpec', SWEARS_DEFAULT_FILESPEC)
+    if not kwargs.get('oVidFileSpec'):
+        kwargs['oVidFileSpec'] = DefaultOutputFileSpec(
+            kwargs['iVidFileSpec'], kwargs.get('subsLang') or SUBTITLE_DEFAULT_LANG, bool(kwargs.get('audioOnly'))
+        )
+        if outputRoot:
+            kwargs['oVidFileSpec'] = os.path.basename(kwargs['oVidFileSpec'])
+    if outputRoot:
+        root = os.path.realpath(outputRoot)
+        for option in SERVER_JOB_OUTPUT_OPTIONS:
+            if kwargs.get(option):
+                if not isinstance(kwargs[option], str):
+                    raise ValueError(f'{option} is a file name')
+                kwargs[option] = os.path.join(root, kwargs[option])
+                if os.path.commonpath([os.path.realpath(kwargs[option]), root]) != root:
+                    raise ValueError(f'{option} must be under {root}')
+    if not kwargs['oSubsFileSpec']:
+        kwargs['oSubsFileSpec'] = os.path.splitext(kwargs['oVidFileSpec'])[0] + '.srt'
+    if kwargs.get('swearsProfiles'):
+        if not isinstance(kwargs['swearsProfiles'], dict):
+            raise ValueError('swearsProfiles is an object of profile names and profanity files')
+        kwargs['swearsProfiles'] = OrderedDict(kwargs['swearsProfiles'])
+    try:
+        inspect.signature(VidCleaner).bind(**kwargs)
+    except TypeError as e:
+        raise ValueError(str(e))
+    return kwargs
+
+
+######## pool processes ###########################################################
+
+_jobEvents = None
+_cancelledJobs = None
+_currentSerial = None
+
+
+def _init_server_worker(events: Any, cancelled: Any, niceness: Optional[int], idleIo: bool) -> None:
+    global _jobEvents, _cancelledJobs
+    _jobEvents = events
+    _cancelledJobs = cancelled
+    # the server decides when jobs stop: it is told about Ctrl+C, and cancels jobs with SIGUSR1
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, _cancel_signalled)
+    LowerPriority(niceness, idleIo)
+    _load_batch_lexicons([SWEARS_DEFAULT_FILESPEC], None)
+    _warm_encoders()
+
+
+def _cancel_requested(serial: int) -> bool:
+    return _cancelledJobs[serial % SERVER_CANCEL_SLOTS] == serial
+
+
+def _cancel_signalled(signum, frame) -> None:
+    # only the job the signal was meant for is stopped, not one this process has moved on to, and not from
+    # the handler itself, which may have interrupted StartCommand holding the commands lock
+    if (_currentSerial is not None) and _cancel_requested(_currentSerial):
+        threading.Thread(target=KillCommands, daemon=True).start()
+
+
+def _emit(serial: int, event: str, **fields) -> None:
+    _jobEvents.put((serial, {'event': event, 'time': time.time(), **fields}))
+
+
+def _run_server_job(serial: int, kwargs: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+    # runs in a pool process, every failure is reported rather than raised, the result is also the last event
+    global _currentSerial
+    _currentSerial = serial
+    result = {'status': 'failed', 'outputs': [], 'seconds': 0.0, 'error': ''}
+    started = time.monotonic()
+    _emit(serial, 'running', pid=os.getpid())
+    with JobDeadline(timeout) as deadline:
+        if _cancel_requested(serial):
+            KillCommands()
+        try:
+            kwargs = dict(kwargs)
+            _emit(serial, 'stage', stage='probe')
+            kwargs['mediaInfo'] = GetMediaInfo(kwargs['iVidFileSpec'])
+            if (not kwargs['iSubsFileSpec']) and (kwargs.get('subsText') is None):
+                _emit(serial, 'stage', stage='subtitles')
+                lang = kwargs.get('subsLang') or SUBTITLE_DEFAULT_LANG
+                kwargs['subsText'] = ExtractSubtitlesText(kwargs['iVidFileSpec'], [lang], kwargs['mediaInfo']).get(
+                    SplitLanguageIfForced(lang)[0]
+                )
+            cleaner = VidCleaner(**kwargs)
+            _emit(serial, 'stage', stage='clean')
+            cleaner.CreateCleanSubAndMuteList()
+            _emit(serial, 'stage', stage='encode', mutes=len(cleaner.muteTimeline))
+            cleaner.MultiplexCleanVideo()
+            result['outputs'] = [
+                x.outputVidFileSpec
+                for x in (cleaner.variants or [cleaner])
+                if x.outputVidFileSpec and os.path.isfile(x.outputVidFileSpec)
+            ]
+            result['status'] = 'unchanged' if cleaner.unalteredVideo else 'cleaned'
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+    if (result['status'] == 'failed') and _cancel_requested(serial):
+        result['status'] = 'cancelled'
+        result['error'] = ''
+    elif deadline.expired:
+        result['status'] = 'failed'
+        result['error'] = f'timed out after {timeout:g} seconds'
+    result['seconds'] = round(time.monotonic() - started, 3)
+    _currentSerial = None
+    _emit(serial, 'finished', **result)
+    return result
+
+
+######## server ###################################################################
+
+
+class ServerJob(object):
+    """A submitted job, its state and every event it has had."""
+
+    __slots__ = ('id', 'serial', 'options', 'state', 'events', 'created', 'future', 'pid', 'cancelRequested', 'result', 'listeners')
+
+    def __init__(self, serial: int, options: Dict[str, Any]) -> None:
+        self.id = uuid.uuid4().hex
+        self.serial = serial
+        self.options = options
+        self.state = 'queued'
+        self.events = []
+        self.created = time.time()
+        self.future = None
+        self.pid = None
+        self.cancelRequested = False
+        self.result = None
+        self.listeners = []
+
+    def summary(self, events: bool = False) -> Dict[str, Any]:
+        summary = {
+            'id': self.id,
+            'state': self.state,
+            'input': self.options['iVidFileSpec'],
+            'output': self.options['oVidFileSpec'],
+            'created': self.created,
+            'result': self.result,
+        }
+        if events:
+            summary['events'] = list(self.events)
+        return summary
+
+
+class CleanvidServer(object):
+    """Runs submitted jobs in a pool of (at most workers) processes, keeping every job's events for the
+HTTP handlers to return and stream. Runs on an asyncio loop, pool processes report back through a
+multiprocessing queue."""
+
+    def __init__(
+        self,
+        workers: int = SERVER_WORKERS_DEFAULT,
+        timeout: Optional[float] = None,
+        niceness: Optional[int] = None,
+        idleIo: bool = False,
+        outputRoot: Optional[str] = None,
+        token: Optional[str] = None,
+    ) -> None:
+        self.timeout = timeout
+        self.outputRoot = outputRoot
+        self.token = token
+        self.jobs = OrderedDict()
+        self._bySerial = {}
+        self._serial = 0
+        self._listeners = []
+        self._loop = None
+        self._jobEvents = multiprocessing.Queue()
+        self._cancelledJobs = multiprocessing.Array('q', SERVER_CANCEL_SLOTS, lock=False)
+        # the profanity list and encoders are loaded before the pool processes are forked from this one
+        _load_batch_lexicons([SWEARS_DEFAULT_FILESPEC], None)
+        _warm_encoders()
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max(workers, 1),
+            initializer=_init_server_worker,
+            initargs=(self._jobEvents, self._cancelledJobs, niceness, idleIo),
+        )
+
+    def submit(self, options: Any) -> ServerJob:
+        kwargs = JobOptions(options, self.outputRoot)
+        self._serial += 1
+        job = ServerJob(self._serial, kwargs)
+        self.jobs[job.id] = job
+        self._bySerial[job.serial] = job
+        self._publish(job, {'event': 'queued', 'time': job.created, 'input': kwargs['iVidFileSpec']})
+        job.future = self.executor.submit(_run_server_job, job.serial, kwargs, self.timeout)
+        job.future.add_done_callback(lambda f: self._loop.call_soon_threadsafe(self._future_done, job, f))
+        self._prune()
+        return job
+
+    def cancel(self, job: ServerJob) -> bool:
+        """stop a queued or running job, False if it had already finished"""
+        if job.state in SERVER_JOB_FINAL_STATES:
+            return False
+        if not job.cancelRequested:
+            job.cancelRequested = True
+            self._cancelledJobs[job.serial % SERVER_CANCEL_SLOTS] = job.serial
+            self._publish(job, {'event': 'cancelling', 'time': time.time()})
+        if not job.future.cancel():
+            # already handed to a pool process, which checks for this before it starts the job
+            self._signal(job)
+        return True
+
+    def _signal(self, job: ServerJob) -> None:
+        if job.pid and (job.state == 'running'):
+            try:
+                os.kill(job.pid, signal.SIGUSR1)
+            except ProcessLookupError:
+                pass
+
+    def _publish(self, job: ServerJob, event: Dict[str, Any]) -> None:
+        event['job'] = job.id
+        job.events.append(event)
+        for listener in job.listeners + self._listeners:
+            listener.put_nowait(event)
+
+    def _finish(self, job: ServerJob, result: Dict[str, Any], event: Optional[Dict[str, Any]] = None) -> None:
+        job.state = result['status']
+        job.result = {k: v for k, v in result.items() if k in ('status', 'outputs', 'seconds', 'error')}
+        self._bySerial.pop(job.serial, None)
+        self._publish(job, event if (event is not None) else {'event': 'finished', 'time': time.time(), **job.result})
+
+    def _future_done(self, job: ServerJob, future: concurrent.futures.Future) -> None:
+        # a job that ran reports its result as its last event, this only covers jobs that never got to
+        if job.state in SERVER_JOB_FINAL_STATES:
+            return
+        if future.cancelled():
+            self._finish(job, {'status': 'cancelled', 'outputs': [], 'seconds': 0.0, 'error': ''})
+        elif (e := future.exception()) is not None:
+            # the pool process itself died
+            self._finish(job, {'status': 'failed', 'outputs': [], 'seconds': 0.0, 'error': f'{type(e).__name__}: {e}'})
+
+    def _prune(self) -> None:
+        finished = [x for x in self.jobs.values() if x.state in SERVER_JOB_FINAL_STATES]
+        for job in finished[: max(len(finished) - SERVER_FINISHED_JOBS_KEPT, 0)]:
+            del self.jobs[job.id]
+
+    async def _pump_events(self) -> None:
+        while (item := await self._loop.run_in_executor(None, self._jobEvents.get)) is not None:
+            serial, event = item
+            if ((job := self._bySerial.get(serial)) is None) or (job.state in SERVER_JOB_FINAL_STATES):
+                continue
+            if event['event'] == 'finished':
+                self._finish(job, event, event)
+                continue
+            if event['event'] == 'running':
+                job.state = 'running'
+                job.pid = event['pid']
+                if job.cancelRequested:
+                    self._signal(job)
+            self._publish(job, event)
+
+    ######## HTTP ###############################################################
+
+    def _refused(self, headers: Dict[str, str]) -> Optional[Tuple[int, Dict[str, Any], Dict[str, str]]]:
+        # jobs read and write files and take ffmpeg options, so requests web pages can make (cross-origin, or
+        # to a rebound DNS name) are turned away, and over TCP only a client that knows the token is served
+        if 'origin' in headers:
+            return 403, {'error': 'Cross-origin requests are not allowed'}, {}
+        if not _loopback(urlsplit('//' + headers.get('host', '')).hostname or ''):
+            return 403, {'error': 'The Host header must name a loopback address'}, {}
+        if self.token and not hmac.compare_digest(headers.get('authorization', ''), f'Bearer {self.token}'):
+            return 401, {'error': 'A valid bearer token is required'}, {'WWW-Authenticate': 'Bearer'}
+        return None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, headers, body = await _read_request(reader)
+            except ValueError as e:
+                await _respond(writer, 400, {'error': str(e)})
+                return
+            if (refused := self._refused(headers)) is not None:
+                await _respond(writer, *refused)
+                return
+            parts = [x for x in urlsplit(path).path.split('/') if x]
+            job = self.jobs.get(parts[1]) if (len(parts) >= 2) and (parts[0] == 'jobs') else None
+
+            if parts == ['jobs'] and method == 'GET':
+                await _respond(writer, 200, {'jobs': [x.summary() for x in self.jobs.values()]})
+            elif parts == ['jobs'] and method == 'POST':
+                if headers.get('content-type', '').partition(';')[0].strip().lower() != 'application/json':
+                    await _respond(writer, 415, {'error': 'Jobs are submitted as Content-Type: application/json'})
+                    return
+                try:
+                    job = self.submit(json.loads(body or b'null'))
+                except ValueError as e:
+                    await _respond(writer, 400, {'error': str(e)})
+                else:
+                    await _respond(writer, 202, job.summary(), {'Location': f'/jobs/{job.id}'})
+            elif parts == ['events'] and method == 'GET':
+                await _stream(writer, headers, [], self._listeners, False)
+            elif (len(parts) >= 2) and (parts[0] == 'jobs') and (job is None):
+                await _respond(writer, 404, {'error': f'No job {parts[1]}'})
+            elif (len(parts) == 2) and method == 'GET':
+                await _respond(writer, 200, job.summary(events=True))
+            elif (len(parts) == 2) and method == 'DELETE':
+                if self.cancel(job):
+                    await _respond(writer, 202, job.summary())
+                else:
+                    await _respond(writer, 409, {'error': f'Job {job.id} has already finished', **job.summary()})
+            elif (len(parts) == 3) and (parts[2] == 'events') and method == 'GET':
+                await _stream(writer, headers, list(job.events), job.listeners, True)
+            elif parts and (parts[0] in ('jobs', 'events')):
+                await _respond(writer, 405, {'error': f'{method} is not allowed here'})
+            else:
+                await _respond(writer, 404, {'error': f'Nothing at {path}'})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(
+        self,
+        host: str = SERVER_HOST_DEFAULT,
+        port: int = SERVER_PORT_DEFAULT,
+        socketFileSpec: Optional[str] = None,
+    ) -> None:
+        """serve until SIGINT or SIGTERM, then cancel whatever is still queued or running"""
+        self._loop = asyncio.get_running_loop()
+        pump = asyncio.ensure_future(self._pump_events())
+        if socketFileSpec:
+            if os.path.exists(socketFileSpec):
+                os.remove(socketFileSpec)
+            server = await asyncio.start_unix_server(self.handle, socketFileSpec)
+            os.chmod(socketFileSpec, 0o600)
+            print(f'[cleanvid] serving on unix:{socketFileSpec}')
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"[cleanvid] serving on http://{host}:{server.sockets[0].getsockname()[1]}")
+            if self.token:
+                print(f'[cleanvid] requests need the header "Authorization: Bearer {self.token}"')
+        stopping = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self._loop.add_signal_handler(signum, stopping.set)
+        try:
+            async with server:
+                await stopping.wait()
+        finally:
+            print('[cleanvid] server: stopping')
+            for job in list(self.jobs.values()):
+                self.cancel(job)
+            await self._loop.run_in_executor(None, lambda: self.executor.shutdown(wait=True, cancel_futures=True))
+            self._jobEvents.put(None)
+            await pump
+            if socketFileSpec and os.path.exists(socketFileSpec):
+                os.remove(socketFileSpec)
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+    """(method, path, lower-cased headers, body) of an HTTP/1.x request, ValueError if it isn't one"""
+    requestLine = (await reader.readline()).decode('latin-1').split()
+    if len(requestLine) != 3 or not requestLine[2].startswith('HTTP/1.'):
+        raise ValueError('Malformed request line')
+    headers = {}
+    while line := (await reader.readline()).decode("latin-1").strip():
+        if len(headers) >= SERVER_MAX_HEADERS:
+            raise ValueError('Too many headers')
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise ValueError('Invalid Content-Length')
+    if not (0 <= length <= SERVER_MAX_BODY_BYTES):
+        raise ValueError(f'Request bodies are at most {SERVER_MAX_BODY_BYTES} bytes')
+    body = await reader.readexactly(length) if length else b''
+    return requestLine[0].upper(), requestLine[1], headers, body
+
+
+async def _respond(
+    writer: asyncio.StreamWriter,
+    status: int,
+    payload: Any,
+    headers: Optional[Dict[str, str]] = None,
+) -> None:
+    body = (json.dumps(payload, indent=2) + '\n').encode('utf-8')
+    head = [f'HTTP/1.1 {status} {_REASONS.get(status, "")}', 'Content-Type: application/json']
+    head += [f'{k}: {v}' for k, v in (headers or {}).items()]
+    head += [f'Content-Length: {len(body)}', 'Connection: close', '', '']
+    writer.write('\r\n'.join(head).encode('latin-1') + body)
+    await writer.drain()
+
+
+async def _stream(
+    writer: asyncio.StreamWriter,
+    headers: Dict[str, str],
+    replay: List[Dict[str, Any]],
+    listeners: List[asyncio.Queue],
+    untilFinished: bool,
+) -> None:
+    # Server-Sent Events, or JSON lines when the client asks for (nd)json
+    sse = 'json' not in headers.get('accept', '')
+    writer.write(
+        '\r\n'.join(
+            [
+                'HTTP/1.1 200 OK',
+                'Content-Type: ' + ('text/event-stream' if sse else 'application/x-ndjson'),
+                'Cache-Control: no-cache',
+                'Connection: close',
+                '',
+                '',
+            ]
+        ).encode('latin-1')
+    )
+    events = asyncio.Queue()
+    for event in replay:
+        events.put_nowait(event)
+    listeners.append(events)
+    try:
+        await writer.drain()
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), SERVER_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                writer.write(b': keep-alive\n\n' if sse else b'\n')
+            else:
+                data = json.dumps(event)
+                writer.write((f"event: {event['event']}\ndata: {data}\n\n" if sse else data + '\n').encode('utf-8'))
+            await writer.drain()
+            if untilFinished and (event['event'] == 'finished'):
+                break
+    finally:
+        listeners.remove(events)
+
+
+_REASONS = {
+    200: 'OK',
+    202: 'Accepted',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    415: 'Unsupported Media Type',
+}
+
+
+def _loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def RunServer(argv: List[str]) -> int:
+    """cleanvid serve [--host <loopback address>] [--port <port> | --socket <path>] [options]"""
+    parser = argparse.ArgumentParser(
+        prog='cleanvid serve',
+        description='Accept cleaning jobs (JSON objects of VidCleaner options) over HTTP on localhost or a unix socket: '
+        'POST /jobs, GET /jobs, GET /jobs/<id>, DELETE /jobs/<id> to cancel, and GET /jobs/<id>/events or GET /events '
+        'for progress as Server-Sent Events (or JSON lines with "Accept: application/x-ndjson").',
+    )
+    parser.add_argument(
+        '--host',
+        help=f'loopback address to listen on (default: {SERVER_HOST_DEFAULT}), jobs read and write any file this user can',
+        metavar='<address>',
+        dest='host',
+        default=SERVER_HOST_DEFAULT,
+    )
+    parser.add_argument(
+        '--port',
+        help=f'port to listen on (default: {SERVER_PORT_DEFAULT}, 0 for any free one)',
+        metavar='<port>',
+        dest='port',
+        type=int,
+        default=SERVER_PORT_DEFAULT,
+    )
+    parser.add_argument(
+        '--socket',
+        help='listen on this unix socket (only accessible by this user, no token needed) instead of TCP',
+        metavar='<path>',
+        dest='socketFileSpec',
+        default=None,
+    )
+    parser.add_argument(
+        '--output-root',
+        help='directory every output a job writes must be under (relative output paths are taken from it)',
+        metavar='<directory>',
+        dest='outputRoot',
+        required=True,
+    )
+    parser.add_argument(
+        '--workers',
+        help=f'most jobs run at once, the rest wait in the queue (default: {SERVER_WORKERS_DEFAULT})',
+        metavar='<int>',
+        dest='workers',
+        type=int,
+        default=SERVER_WORKERS_DEFAULT,
+    )
+    parser.add_argument(
+        '--timeout',
+        help='kill a job (and its ffmpeg processes) still running after this many seconds',
+        metavar='<seconds>',
+        dest='timeout',
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        '--nice',
+        help='run jobs at this lower CPU priority (nice increment)',
+        metavar='<int>',
+        dest='niceness',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--idle-io',
+        help='run jobs in the idle I/O scheduling class (ionice -c 3)',
+        dest='idleIo',
+        action='store_true',
+    )
+    serverArgs = parser.parse_args(argv)
+    if (not serverArgs.socketFileSpec) and not _loopback(serverArgs.host):
+        parser.error(f'{serverArgs.host} is not a loopback address, use --socket or a reverse proxy to share the server')
+    if not hasattr(signal, 'SIGUSR1'):
+        parser.error('the server needs POSIX signals to cancel jobs')
+    if not os.path.isdir(serverArgs.outputRoot):
+        parser.error(f'{serverArgs.outputRoot} is not a directory')
+
+    # any local process can connect over TCP, so it takes a token only whoever started the server knows
+    server = CleanvidServer(
+        serverArgs.workers,
+        serverArgs.timeout,
+        serverArgs.niceness,
+        serverArgs.idleIo,
+        os.path.abspath(serverArgs.outputRoot),
+        None if serverArgs.socketFileSpec else secrets.token_urlsafe(32),
+    )
+    asyncio.run(server.serve(serverArgs.host, serverArgs.port, serverArgs.socketFileSpec))
+    return 0
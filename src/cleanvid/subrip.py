@@ -0,0 +1,113 @@
+import os
+import re
+from itertools import chain
+from typing import IO, Iterable, Iterator, Optional, Union
+
+TIMESTAMP_SEPARATOR = '-->'
+RE_TIME_SEP = re.compile(r'\:|\.|\,')
+RE_INTEGER = re.compile(r'^(\d+)')
+
+
+class SubtitleCue(object):
+    """A single SRT cue with its start and end kept as integer milliseconds."""
+
+    __slots__ = ('index', 'start', 'end', 'position', 'text')
+
+    def __init__(self, index: Union[int, str, None], start: int, end: int, text: str = '', position: str = '') -> None:
+        try:
+            self.index = int(index)
+        except (TypeError, ValueError):
+            self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+        self.position = position
+
+    def __repr__(self):
+        return f'SubtitleCue({self.index}, {self.start}, {self.end}, {self.text!r})'
+
+    def __str__(self):
+        position = f' {self.position}' if self.position.strip() else ''
+        return f'{self.index}\n{FormatSrtTime(self.start)} --> {FormatSrtTime(self.end)}{position}\n{self.text}\n'
+
+
+def _parse_int(digits: str) -> int:
+    try:
+        return int(digits)
+    except ValueError:
+        match = RE_INTEGER.match(digits)
+        return int(match.group()) if match else 0
+
+
+def ParseSrtTime(source: str) -> int:
+    """HH:MM:SS,mmm -> milliseconds (raises ValueError)"""
+    items = RE_TIME_SEP.split(source)
+    if len(items) != 4:
+        raise ValueError(f'Invalid SRT time: {source}')
+    hours, minutes, seconds, milliseconds = (_parse_int(x) for x in items)
+    return (((hours * 60) + minutes) * 60 + seconds) * 1000 + milliseconds
+
+
+def FormatSrtTime(ordinal: int) -> str:
+    """milliseconds -> HH:MM:SS,mmm (negative times are represented as zero)"""
+    if ordinal < 0:
+        ordinal = 0
+    seconds, milliseconds = divmod(ordinal, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return '%02d:%02d:%02d,%03d' % (hours, minutes, seconds, milliseconds)
+
+
+def _cue_from_lines(lines: list) -> Optional[SubtitleCue]:
+    if len(lines) < 2:
+        return None
+    lines = [x.rstrip() for x in lines]
+    index = None
+    if TIMESTAMP_SEPARATOR not in lines[0]:
+        index = lines.pop(0)
+    timestamps = lines[0].split(TIMESTAMP_SEPARATOR)
+    if len(timestamps) != 2:
+        return None
+    start, endAndPosition = timestamps
+    endAndPosition = endAndPosition.lstrip().split(' ', 1)
+    try:
+        return SubtitleCue(
+            index,
+            ParseSrtTime(start.strip()),
+            ParseSrtTime(endAndPosition[0].strip()),
+            '\n'.join(lines[1:]),
+            endAndPosition[1].strip() if len(endAndPosition) > 1 else '',
+        )
+    except ValueError:
+        return None
+
+
+def IterSrtCues(source: Union[str, Iterable[str]]) -> Iterator[SubtitleCue]:
+    """Lazily parse SRT text (or an iterable of lines, like an open file) into SubtitleCue records.
+
+Blocks are split on blank lines and malformed blocks are skipped, the same as pysrt's default
+(ERROR_PASS) parsing, so cues, indexes and text come out exactly as pysrt would read them."""
+    lines = source.splitlines(True) if isinstance(source, str) else source
+    block = []
+    for line in chain(lines, '\n'):
+        if line.strip():
+            block.append(line)
+        elif block:
+            if (cue := _cue_from_lines(block)) is not None:
+                yield cue
+            block = []
+
+
+def WriteSrtCues(cues: Iterable[SubtitleCue], outputFile: IO[str], eol: Optional[str] = None) -> int:
+    """Serialize cues to an open text file as they are produced, returns the number of cues written."""
+    eol = eol or os.linesep
+    count = 0
+    for cue in cues:
+        item = str(cue)
+        if eol != '\n':
+            item = item.replace('\n', eol)
+        outputFile.write(item)
+        if not item.endswith(2 * eol):
+            outputFile.write(eol)
+        count += 1
+    return count
@@ -0,0 +1,460 @@
+import math
+import os
+import shlex
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fractions import Fraction
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    from cleanvid.checkpoint import CommitPartFile, JobCheckpoint, PartFileSpec
+    from cleanvid.fftools import FilterArgEscape, RunCommand, WriteConcatList
+    from cleanvid.mediainfo import MediaInfo, StreamInfo
+    from cleanvid.subrip import IterSrtCues, SubtitleCue, WriteSrtCues
+except ImportError:
+    from checkpoint import CommitPartFile, JobCheckpoint, PartFileSpec
+    from fftools import FilterArgEscape, RunCommand, WriteConcatList
+    from mediainfo import MediaInfo, StreamInfo
+    from subrip import IterSrtCues, SubtitleCue, WriteSrtCues
+
+# each worker gets a couple of chunks so one slow chunk doesn't leave the others idle at the end
+VIDEO_CHUNKS_PER_WORKER = 2
+VIDEO_CHUNK_MIN_SECONDS = 20
+# longest chunk of a checkpointed job, so an interrupted encode loses at most about this much work
+VIDEO_CHUNK_CHECKPOINT_SECONDS = 300
+# a segment length no video reaches
+VIDEO_SPLIT_WHOLE_SECONDS = 1000000000
+AV_SYNC_TOLERANCE_SECONDS = 0.1
+# source codec -> (encoder, its private options argument, bitstream filter) for GOPs re-encoded in between
+# stream-copied ones. Both sides carry their parameter sets in-band at every keyframe, so the re-encoded
+# GOPs don't need to share the source's.
+SMART_BURN_ENCODERS = {
+    'h264': ('libx264', '-x264-params', 'h264_mp4toannexb'),
+    'hevc': ('libx265', '-x265-params', 'hevc_mp4toannexb'),
+}
+SMART_BURN_PROFILES = {
+    'h264': {
+        'Constrained Baseline': 'baseline',
+        'Baseline': 'baseline',
+        'Main': 'main',
+        'High': 'high',
+        'High 10': 'high10',
+        'High 4:2:2': 'high422',
+        'High 4:4:4 Predictive': 'high444',
+    },
+    'hevc': {
+        'Main': 'main',
+        'Main 10': 'main10',
+    },
+}
+SMART_BURN_CRF = 18
+
+
+def _fraction(value, default: str = '0') -> Fraction:
+    try:
+        return Fraction(str(value if value is not None else default))
+    except (ValueError, ZeroDivisionError):
+        return Fraction(default)
+
+
+def GetKeyframeTimes(fileSpec: str, videoIndex: int, timeBase: Fraction) -> List[Fraction]:
+    """presentation times (seconds) of the keyframes of the video stream (by video-only index), sorted"""
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-select_streams', f'v:{videoIndex}',
+        '-show_entries', 'packet=pts,flags',
+        '-of', 'csv=p=0',
+        fileSpec,
+    ]
+    result = RunCommand(cmd)
+    if result.return_code != 0:
+        raise ValueError(f'Could not read video packets of {fileSpec}: {result.err.strip()}')
+    keyframes = set()
+    for line in result.out.splitlines():
+        pts, _, flags = line.strip().partition(',')
+        if flags.startswith('K') and pts.lstrip('-').isdigit():
+            keyframes.add(int(pts) * timeBase)
+    return sorted(keyframes)
+
+
+def _keyframe_times(fileSpec: str, timeBase: Fraction, checkpoint: Optional[JobCheckpoint] = None) -> List[Fraction]:
+    # reading every packet of a long video takes a while, so a checkpointed job only does it once
+    if (checkpoint is not None) and checkpoint.done('keyframes'):
+        return [Fraction(x) for x in checkpoint.get('keyframes')]
+    keyframes = GetKeyframeTimes(fileSpec, 0, timeBase)
+    if checkpoint is not None:
+        checkpoint.complete('keyframes', [str(x) for x in keyframes])
+    return keyframes
+
+
+def PlanVideoChunks(
+    keyframes: Sequence[Fraction],
+    end: Fraction,
+    chunks: int,
+    minSeconds: int = VIDEO_CHUNK_MIN_SECONDS,
+) -> List[Fraction]:
+    """keyframe times to cut the video at for (at most) the requested number of chunks
+
+Each ideal cut (an even split up to end) moves to the first keyframe at or after it and cuts closer
+than minSeconds to the previous one are skipped, so the same file and chunk count always give the same cuts."""
+    if not keyframes:
+        return []
+    start = keyframes[0]
+    chunks = max(min(chunks, int((end - start) // minSeconds)), 1)
+    cuts = []
+    for i in range(1, chunks):
+        idx = bisect_left(keyframes, start + (end - start) * i / chunks)
+        if (
+            (idx < len(keyframes))
+            and (keyframes[idx] - (cuts[-1] if cuts else start) >= minSeconds)
+            and (end - keyframes[idx] >= minSeconds)
+        ):
+            cuts.append(keyframes[idx])
+    return cuts
+
+
+def SplitVideo(
+    fileSpec: str,
+    videoIndex: int,
+    start: Fraction,
+    cuts: Sequence[Fraction],
+    workDir: str,
+    prefix: str = 'video',
+    bitstreamFilter: Optional[str] = None,
+    checkpoint: Optional[JobCheckpoint] = None,
+) -> List[str]:
+    """stream-copy one video stream (first packet at start) into pieces beginning at each cut (keyframe) time,
+unless a checkpoint has recorded them as split already"""
+    pieces = [os.path.join(workDir, f'{prefix}{i:05d}.mkv') for i in range(len(cuts) + 1)]
+    if (checkpoint is not None) and checkpoint.done(f'{prefix}.split') and all(os.path.isfile(x) for x in pieces):
+        return pieces
+    cmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-nostats',
+        '-loglevel', 'error',
+        '-y',
+        '-i', fileSpec,
+        '-map', f'0:v:{videoIndex}',
+        '-c', 'copy',
+        '-f', 'segment',
+        '-segment_format', 'matroska',
+        '-reset_timestamps', '1',
+    ]
+    if bitstreamFilter:
+        cmd += ['-bsf:v', bitstreamFilter]
+    if cuts:
+        # segment times count from the stream's first packet, and fall a hair before each keyframe so
+        # rounding can't push the cut to the next one
+        cmd += ['-segment_times', ','.join(f'{float(x - start) - 0.0005:.6f}' for x in cuts)]
+    else:
+        # one piece, the segment muxer would otherwise cut one every 2 seconds
+        cmd += ['-segment_time', str(VIDEO_SPLIT_WHOLE_SECONDS)]
+    cmd += [os.path.join(workDir, f'{prefix}%05d.mkv')]
+    result = RunCommand(cmd)
+    if result.return_code != 0:
+        raise ValueError(f'Could not split video of {fileSpec}: {result.err.strip()}')
+    if not all(os.path.isfile(x) for x in pieces):
+        raise ValueError(f'Could not split video of {fileSpec} at keyframes')
+    if checkpoint is not None:
+        checkpoint.complete(f'{prefix}.split')
+    return pieces
+
+
+def ShiftedSubtitles(cues: Sequence[SubtitleCue], startMs: int, endMs: int, fileSpec: str) -> bool:
+    """write the cues shown during [startMs, endMs) to an SRT with times relative to startMs, False if there are none"""
+    shifted = [
+        SubtitleCue(i + 1, max(cue.start - startMs, 0), cue.end - startMs, cue.text, cue.position)
+        for i, cue in enumerate(x for x in cues if (x.end > startMs) and (x.start < endMs))
+    ]
+    if shifted:
+        with open(fileSpec, 'w', encoding='utf-8', newline='') as f:
+            WriteSrtCues(shifted, f)
+    return len(shifted) > 0
+
+
+def EncodeVideoPiece(
+    pieceFileSpec: str,
+    outFileSpec: str,
+    vParams: str,
+    threads: Optional[int] = None,
+    subsFileSpec: Optional[str] = None,
+) -> None:
+    """re-encode one video piece with vParams, burning in an (already piece-relative) SRT if given
+
+The output only appears under its own name once it has been completely written."""
+    videoArgs = shlex.split(vParams)
+    if subsFileSpec:
+        assFileSpec = os.path.splitext(subsFileSpec)[0] + '.ass'
+        cmd = ['ffmpeg', '-hide_banner', '-nostats', '-loglevel', 'error', '-y', '-i', subsFileSpec, assFileSpec]
+        result = RunCommand(cmd)
+        if (result.return_code != 0) or (not os.path.isfile(assFileSpec)):
+            raise ValueError(f'Could not process {subsFileSpec}: {result.err.strip()}')
+        videoArgs += ['-vf', f'ass={FilterArgEscape(assFileSpec)}']
+    cmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-nostats',
+        '-loglevel', 'error',
+        '-y',
+        '-i', pieceFileSpec,
+        '-map', '0:v:0',
+        '-an',
+        '-sn',
+        '-dn',
+    ]
+    cmd += videoArgs
+    if threads:
+        cmd += ['-threads', str(int(threads))]
+    cmd += [PartFileSpec(outFileSpec)]
+    result = RunCommand(cmd)
+    if (result.return_code != 0) or (not os.path.isfile(PartFileSpec(outFileSpec))):
+        raise ValueError(f'Could not encode {pieceFileSpec}: {result.err.strip()}')
+    CommitPartFile(outFileSpec)
+
+
+def EncodeVideoPieces(
+    jobs: Sequence[Tuple[str, str, Optional[str]]],
+    vParams: str,
+    workers: int = 1,
+    threads: Optional[int] = None,
+    checkpoint: Optional[JobCheckpoint] = None,
+    stage: str = 'video.encoded',
+) -> None:
+    """Encode (piece, output, piece-relative SRT) jobs with EncodeVideoPiece, workers at a time.
+
+With a checkpoint, pieces it has recorded (under stage) as encoded are skipped if their output is still
+there, and every piece is recorded as it finishes, so an interrupted run picks up with the pieces it
+hadn't finished. The first failure is raised once the pieces already running have finished."""
+    encoded = set(checkpoint.get(stage, [])) if (checkpoint is not None) else set()
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(workers or 1, 1)) as executor:
+        futures = {
+            executor.submit(EncodeVideoPiece, pieceFileSpec, outFileSpec, vParams, threads, subsFileSpec): i
+            for i, (pieceFileSpec, outFileSpec, subsFileSpec) in enumerate(jobs)
+            if not ((i in encoded) and os.path.isfile(outFileSpec))
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            if checkpoint is not None:
+                encoded.add(futures[future])
+                checkpoint.complete(stage, sorted(encoded))
+    if errors:
+        raise errors[0]
+
+
+def EncodeVideoChunks(
+    fileSpec: str,
+    mediaInfo: MediaInfo,
+    vParams: str,
+    workDir: str,
+    workers: int,
+    threads: Optional[int] = None,
+    subsFileSpec: Optional[str] = None,
+    checkpoint: Optional[JobCheckpoint] = None,
+) -> Tuple[str, Fraction]:
+    """Re-encode the first video stream as keyframe-aligned chunks in parallel.
+
+The stream is stream-copied into chunks at keyframes, every chunk is encoded by its own ffmpeg (workers at
+a time, each with an even share of the CPUs unless threads is given) with the subtitles that fall inside it
+shifted to its start and burned in, and a concat demuxer list of the encoded chunks is returned along
+with where the original stream starts on the file's timeline (see MediaInfo.relativeStart). With a checkpoint (workDir being its directory) chunks are
+at most VIDEO_CHUNK_CHECKPOINT_SECONDS long, and a rerun only encodes those that weren't finished."""
+    if not (videoStreams := mediaInfo.videoStreams):
+        raise ValueError(f'No video stream found in {fileSpec}')
+    stream = videoStreams[0]
+    timeBase = _fraction(stream.raw.get('time_base'), '1/1000')
+    videoStart = _fraction(stream.startTime, '0')
+    duration = _fraction(stream.duration, str(mediaInfo.duration or 0))
+    if duration <= 0:
+        raise ValueError(f'Could not determine the video duration of {fileSpec}')
+
+    origin = mediaInfo.timelineOrigin(stream)
+    keyframes = _keyframe_times(fileSpec, timeBase, checkpoint)
+    chunks = workers * VIDEO_CHUNKS_PER_WORKER
+    if checkpoint is not None:
+        chunks = max(chunks, math.ceil(duration / VIDEO_CHUNK_CHECKPOINT_SECONDS))
+    cuts = PlanVideoChunks(keyframes, videoStart + duration, chunks)
+    bounds = [keyframes[0] if keyframes else videoStart] + cuts + [videoStart + duration]
+    pieces = SplitVideo(fileSpec, 0, bounds[0], cuts, workDir, checkpoint=checkpoint)
+
+    cues = []
+    if subsFileSpec:
+        with open(subsFileSpec, 'r', encoding='utf-8') as f:
+            cues = list(IterSrtCues(f))
+
+    threadsPerChunk = threads or max((os.cpu_count() or 1) // workers, 1)
+    jobs = []
+    for i, (pieceFileSpec, start, end) in enumerate(zip(pieces, bounds[:-1], bounds[1:])):
+        chunkSubsFileSpec = os.path.join(workDir, f'video{i:05d}.srt')
+        startMs, endMs = round((start - origin) * 1000), round((end - origin) * 1000)
+        if not (cues and ShiftedSubtitles(cues, startMs, endMs, chunkSubsFileSpec)):
+            chunkSubsFileSpec = None
+        jobs.append((pieceFileSpec, os.path.join(workDir, f'encoded{i:05d}.mkv'), chunkSubsFileSpec, end - start))
+
+    EncodeVideoPieces([x[:3] for x in jobs], vParams, workers, threadsPerChunk, checkpoint, 'video.encoded')
+
+    return WriteConcatList(os.path.join(workDir, 'video.txt'), [(x[1], x[3]) for x in jobs]), bounds[0] - origin
+
+
+def SmartBurnParams(stream: StreamInfo) -> Optional[List[str]]:
+    """encoder arguments matching the source video stream closely enough to splice with it, or None"""
+    if (encoder := SMART_BURN_ENCODERS.get(stream.codecName, None)) is None:
+        return None
+    encoderName, privateOption, _ = encoder
+    raw = stream.raw
+    params = ['-c:v', encoderName, privateOption, 'repeat-headers=1', '-crf', str(SMART_BURN_CRF), '-fps_mode', 'passthrough']
+    if pixFmt := raw.get('pix_fmt', ''):
+        params += ['-pix_fmt', pixFmt]
+    if profile := SMART_BURN_PROFILES[stream.codecName].get(raw.get('profile', ''), None):
+        params += ['-profile:v', profile]
+    if (stream.codecName == 'h264') and isinstance(level := raw.get('level', None), int) and (level > 0):
+        params += ['-level:v', f'{level / 10:.1f}']
+    for key, option in (
+        ('color_range', '-color_range'),
+        ('color_space', '-colorspace'),
+        ('color_primaries', '-color_primaries'),
+        ('color_transfer', '-color_trc'),
+    ):
+        if (value := raw.get(key, 'unknown')) and (value not in ('unknown', 'reserved')):
+            params += [option, value]
+    return params
+
+
+def PlanBurnSpans(keyframes: Sequence[Fraction], cues: Sequence[SubtitleCue]) -> List[Tuple[int, int]]:
+    """[first, last) GOP (keyframe index) ranges showing any cue, touching ranges merged
+
+keyframes are times (seconds) from the same origin as the cue times, i.e. from the start of the file."""
+    spans = []
+    for cue in sorted(cues, key=lambda x: x.start):
+        if cue.end <= cue.start:
+            continue
+        first = max(bisect_right(keyframes, Fraction(cue.start, 1000)) - 1, 0)
+        last = max(bisect_left(keyframes, Fraction(cue.end, 1000)), first + 1)
+        if spans and (first <= spans[-1][1]):
+            spans[-1][1] = max(spans[-1][1], last)
+        else:
+            spans.append([first, last])
+    return [tuple(x) for x in spans]
+
+
+def SmartBurnVideo(
+    fileSpec: str,
+    mediaInfo: MediaInfo,
+    subsFileSpec: str,
+    workDir: str,
+    workers: int = 1,
+    threads: Optional[int] = None,
+    checkpoint: Optional[JobCheckpoint] = None,
+) -> Optional[Tuple[str, Fraction]]:
+    """Burn subtitles into the first video stream, re-encoding only the GOPs they are shown in.
+
+The stream is stream-copied into pieces at the keyframes bounding every run of GOPs that shows a cue, just
+those pieces are re-encoded (with encoder settings matched to the source) with their cues burned in, and
+a concat demuxer list splicing them back between the untouched pieces is returned along with where the
+original stream starts on the file's timeline. None is returned if there are no cues to burn. With a checkpoint, a rerun
+only re-encodes the pieces that weren't finished."""
+    if not (videoStreams := mediaInfo.videoStreams):
+        raise ValueError(f'No video stream found in {fileSpec}')
+    stream = videoStreams[0]
+    if (params := SmartBurnParams(stream)) is None:
+        raise ValueError(f'Video codec {stream.codecName} can not be re-encoded in GOPs')
+    with open(subsFileSpec, 'r', encoding='utf-8') as f:
+        cues = list(IterSrtCues(f))
+    if not cues:
+        return None
+    timeBase = _fraction(stream.raw.get('time_base'), '1/1000')
+    videoStart = _fraction(stream.startTime, '0')
+    duration = _fraction(stream.duration, str(mediaInfo.duration or 0))
+    if duration <= 0:
+        raise ValueError(f'Could not determine the video duration of {fileSpec}')
+    if not (keyframes := _keyframe_times(fileSpec, timeBase, checkpoint)):
+        raise ValueError(f'No keyframes found in {fileSpec}')
+
+    origin = mediaInfo.timelineOrigin(stream)
+    spans = PlanBurnSpans([x - origin for x in keyframes], cues)
+    cuts = sorted({x for span in spans for x in span if 0 < x < len(keyframes)})
+    bounds = [0] + cuts + [len(keyframes)]
+    times = list(keyframes) + [videoStart + duration]
+    pieces = SplitVideo(
+        fileSpec,
+        0,
+        keyframes[0],
+        [keyframes[x] for x in cuts],
+        workDir,
+        prefix='gop',
+        bitstreamFilter=SMART_BURN_ENCODERS[stream.codecName][2],
+        checkpoint=checkpoint,
+    )
+
+    jobs, concatPieces = [], []
+    for i, (pieceFileSpec, first, last) in enumerate(zip(pieces, bounds[:-1], bounds[1:])):
+        start, end = times[first], times[last]
+        chunkSubsFileSpec = os.path.join(workDir, f'burn{i:05d}.srt')
+        startMs, endMs = round((start - origin) * 1000), round((end - origin) * 1000)
+        if (first, last) in spans and ShiftedSubtitles(cues, startMs, endMs, chunkSubsFileSpec):
+            outFileSpec = os.path.join(workDir, f'burned{i:05d}.mkv')
+            jobs.append((pieceFileSpec, outFileSpec, chunkSubsFileSpec))
+            concatPieces.append((outFileSpec, end - start))
+        else:
+            concatPieces.append((pieceFileSpec, end - start))
+
+    EncodeVideoPieces(jobs, shlex.join(params), workers, threads, checkpoint, 'gop.encoded')
+
+    return WriteConcatList(os.path.join(workDir, 'burn.txt'), concatPieces), keyframes[0] - origin
+
+
+def _stream_length(mediaInfo: MediaInfo, stream: StreamInfo) -> Optional[float]:
+    # matroska has no stream durations, only DURATION tags, and ffmpeg writes those as where the stream ends
+    if (stream.duration is not None) and ('duration' not in stream.raw) and ('matroska' in mediaInfo.format.get('format_name', '')):
+        return stream.duration - (stream.startTime or 0)
+    return stream.duration
+
+
+def VerifyAvSync(
+    source: MediaInfo,
+    output: MediaInfo,
+    codecTypes: Sequence[str] = ('video', 'audio'),
+    tolerance: float = AV_SYNC_TOLERANCE_SECONDS,
+    audioTracks: Tuple[int, int] = (0, 0),
+    sameTimestamps: bool = False,
+) -> None:
+    """raise ValueError unless the output's first streams of codecTypes (the audio tracks are picked by
+audioTracks, source and output) last as long as the source's and start as far apart as they do (ffmpeg
+rebases the output's timeline, so where they start on their own can differ, unless it kept the source's
+timestamps and sameTimestamps is set)"""
+    starts = {}
+    for codecType in codecTypes:
+        sourceStreams, outputStreams = source.streamsOfType(codecType), output.streamsOfType(codecType)
+        sourceIdx, outputIdx = audioTracks if (codecType == 'audio') else (0, 0)
+        if len(sourceStreams) <= sourceIdx:
+            continue
+        if len(outputStreams) <= outputIdx:
+            raise ValueError(f'A/V sync check failed: no {codecType} stream in {output.fileSpec}')
+        sourceStream, outputStream = sourceStreams[sourceIdx], outputStreams[outputIdx]
+        sourceValue, outputValue = _stream_length(source, sourceStream), _stream_length(output, outputStream)
+        if (sourceValue is not None) and (outputValue is not None) and (abs(sourceValue - outputValue) > tolerance):
+            raise ValueError(
+                f'A/V sync check failed: {codecType} duration is {outputValue:.3f} in {output.fileSpec} '
+                f'but {sourceValue:.3f} in {source.fileSpec}'
+            )
+        if (sourceStream.startTime is not None) and (outputStream.startTime is not None):
+            starts[codecType] = (sourceStream.startTime, outputStream.startTime)
+            if sameTimestamps and (abs(sourceStream.startTime - outputStream.startTime) > tolerance):
+                raise ValueError(
+                    f'A/V sync check failed: {codecType} starts at {outputStream.startTime:.3f} in {output.fileSpec} '
+                    f'but at {sourceStream.startTime:.3f} in {source.fileSpec}'
+                )
+    if ('video' in starts) and ('audio' in starts):
+        sourceOffset = starts['video'][0] - starts['audio'][0]
+        outputOffset = starts['video'][1] - starts['audio'][1]
+        if abs(sourceOffset - outputOffset) > tolerance:
+            raise ValueError(
+                f'A/V sync check failed: video starts {outputOffset:.3f} after audio in {output.fileSpec} '
+                f'but {sourceOffset:.3f} after it in {source.fileSpec}'
+            )
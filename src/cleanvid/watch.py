@@ -0,0 +1,553 @@
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    from cleanvid.batch import (
+        BATCH_OUTPUT_NAME_PATTERN,
+        LexiconSpecOf,
+        _init_batch_worker,
+        _load_batch_lexicons,
+        _run_batch_job,
+    )
+    from cleanvid.cleanvid import (
+        SUBTITLE_DEFAULT_LANG,
+        VIDEO_FILE_EXTENSIONS,
+        CheckCleanvidArgs,
+        CleanvidArgumentParser,
+        DefaultOutputFileSpec,
+        DetectGpuEncoder,
+    )
+    from cleanvid.fftools import AvailableEncoders, KillCommands
+    from cleanvid.probecache import DefaultCacheDir
+    from cleanvid.scheduler import PlanJobs
+except ImportError:
+    from batch import BATCH_OUTPUT_NAME_PATTERN, LexiconSpecOf, _init_batch_worker, _load_batch_lexicons, _run_batch_job
+    from cleanvid import (
+        SUBTITLE_DEFAULT_LANG,
+        VIDEO_FILE_EXTENSIONS,
+        CheckCleanvidArgs,
+        CleanvidArgumentParser,
+        DefaultOutputFileSpec,
+        DetectGpuEncoder,
+    )
+    from fftools import AvailableEncoders, KillCommands
+    from probecache import DefaultCacheDir
+    from scheduler import PlanJobs
+
+logger = logging.getLogger(__name__)
+
+# seconds between scans of the watched directories (a full rescan still happens this often with inotify)
+WATCH_INTERVAL_DEFAULT = 10.0
+# seconds a file's size and mtime must stay the same before it is cleaned, so copies still in progress are left alone
+WATCH_SETTLE_DEFAULT = 30.0
+# a queued file is waiting (pending) or being cleaned (running), then has its batch status
+WATCH_STATES = ['pending', 'running', 'cleaned', 'unchanged', 'failed']
+# how often a stopping watcher's pool processes kill their ffmpeg processes, in case a job was just starting
+WATCH_STOP_KILL_INTERVAL = 0.5
+
+
+def DefaultWatchQueueFileSpec() -> str:
+    return os.path.join(DefaultCacheDir(), 'watch.sqlite')
+
+
+class WatchQueue(object):
+    """Persistent SQLite queue of the files a watcher has seen, with their state and results.
+
+A file is queued again when its size or mtime differs from when it was queued, and files left running by
+a watcher that was stopped are pending again when the next one starts. Safe to share between threads."""
+
+    def __init__(self, fileSpec: Optional[str] = None) -> None:
+        self.fileSpec = fileSpec if fileSpec else DefaultWatchQueueFileSpec()
+        if os.path.dirname(self.fileSpec):
+            os.makedirs(os.path.dirname(self.fileSpec), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.fileSpec, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS queue ('
+                'path TEXT PRIMARY KEY, root TEXT, size INTEGER, mtime_ns INTEGER, state TEXT, '
+                'queued REAL, finished REAL, seconds REAL, outputs TEXT, error TEXT)'
+            )
+
+    def __del__(self):
+        self.close()
+
+    def close(self) -> None:
+        conn = getattr(self, '_conn', None)
+        if conn is not None:
+            self._conn = None
+            conn.close()
+
+    def recover(self) -> int:
+        """put files left running back in the queue, returning how many"""
+        with self._lock, self._conn:
+            return self._conn.execute("UPDATE queue SET state = 'pending' WHERE state = 'running'").rowcount
+
+    def fileKeys(self) -> Dict[str, Tuple[int, int]]:
+        """(size, mtime) of every file as it was queued"""
+        with self._lock:
+            return {x[0]: (x[1], x[2]) for x in self._conn.execute('SELECT path, size, mtime_ns FROM queue')}
+
+    def offer(self, fileSpec: str, root: str, size: int, mtimeNs: int) -> bool:
+        """queue a file unless it is queued (or running) already as it is now, returning whether it was"""
+        with self._lock, self._conn:
+            row = self._conn.execute('SELECT size, mtime_ns, state FROM queue WHERE path = ?', (fileSpec,)).fetchone()
+            if (row is not None) and ((row[2] == 'running') or ((row[0], row[1]) == (size, mtimeNs))):
+                return False
+            self._conn.execute(
+                'INSERT OR REPLACE INTO queue (path, root, size, mtime_ns, state, queued, finished, seconds, outputs, error) '
+                "VALUES (?, ?, ?, ?, 'pending', ?, NULL, NULL, NULL, NULL)",
+                (fileSpec, root, size, mtimeNs, time.time()),
+            )
+            return True
+
+    def pending(self) -> List[Tuple[str, str]]:
+        """(file, watched directory) of the queued files, oldest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT path, root FROM queue WHERE state = 'pending' ORDER BY queued, path"
+            ).fetchall()
+
+    def start(self, fileSpec: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE queue SET state = 'running' WHERE path = ?", (fileSpec,))
+
+    def finish(self, fileSpec: str, result: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE queue SET state = ?, finished = ?, seconds = ?, outputs = ?, error = ? WHERE path = ?',
+                (
+                    result['status'],
+                    time.time(),
+                    result['seconds'],
+                    json.dumps(result['outputs']),
+                    result['error'],
+                    fileSpec,
+                ),
+            )
+
+    def forget(self, fileSpec: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM queue WHERE path = ?', (fileSpec,))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._conn.execute('SELECT state, COUNT(*) FROM queue GROUP BY state').fetchall())
+        return OrderedDict((x, counts.get(x, 0)) for x in WATCH_STATES)
+
+
+class SettleTracker(object):
+    """Tells when files have stopped changing: a file is settled once its size and mtime have been the same
+for every look at it over at least settle seconds."""
+
+    def __init__(self, settle: float = WATCH_SETTLE_DEFAULT) -> None:
+        self.settle = settle
+        self._seen = {}
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def update(self, fileSpec: str, size: int, mtimeNs: int, now: float) -> bool:
+        """record how a file looks now, returning whether it has settled (it is then no longer tracked)"""
+        seen = self._seen.get(fileSpec)
+        if self.settle <= 0:
+            self._seen.pop(fileSpec, None)
+            return True
+        if (seen is None) or (seen[:2] != (size, mtimeNs)):
+            self._seen[fileSpec] = (size, mtimeNs, now)
+            return False
+        if now - seen[2] >= self.settle:
+            del self._seen[fileSpec]
+            return True
+        return False
+
+    def prune(self, present: Set[str]) -> None:
+        """stop tracking files that are gone"""
+        for fileSpec in [x for x in self._seen if x not in present]:
+            del self._seen[fileSpec]
+
+    def nextDue(self, now: float) -> Optional[float]:
+        """seconds until the earliest tracked file could settle"""
+        return max(min(x[2] for x in self._seen.values()) + self.settle - now, 0.0) if self._seen else None
+
+
+class DirectoryEvents(object):
+    """Wakes the watcher early when files are created, finish being written or are moved into the watched
+directories, using inotify (through the optional inotify_simple package) where it can, otherwise just sleeps
+until the next scan."""
+
+    def __init__(self, usePolling: bool = False) -> None:
+        self._inotify = None
+        self._flags = None
+        self._watched = {}
+        if not usePolling:
+            try:
+                import inotify_simple
+
+                self._inotify = inotify_simple.INotify()
+                self._flags = inotify_simple.flags
+            except (ImportError, OSError) as e:
+                logger.debug(f'inotify is not available, polling: {e}')
+
+    @property
+    def notifying(self) -> bool:
+        return self._inotify is not None
+
+    def watch(self, directories: Sequence[str]) -> None:
+        if self._inotify is None:
+            return
+        flags = self._flags
+        for directory in directories:
+            if directory not in self._watched.values():
+                try:
+                    self._watched[
+                        self._inotify.add_watch(
+                            directory, flags.CREATE | flags.CLOSE_WRITE | flags.MOVED_TO | flags.DELETE | flags.MOVED_FROM
+                        )
+                    ] = directory
+                except OSError as e:
+                    logger.debug(f'Could not watch {directory}: {e}')
+
+    def wait(self, timeout: float) -> None:
+        if self._inotify is None:
+            time.sleep(timeout)
+        else:
+            # removed directories drop their own watches, they are added again if they come back
+            for event in self._inotify.read(timeout=int(timeout * 1000)):
+                if event.mask & self._flags.IGNORED:
+                    self._watched.pop(event.wd, None)
+
+
+def ScanWatchedFiles(
+    roots: Sequence[str],
+    excluded: Sequence[str] = (),
+) -> Iterator[Tuple[str, str, List[str]]]:
+    """(directory, watched directory it is under, video files in it) for every directory under the watched
+    ones, leaving out excluded trees (e.g. the output tree) and cleanvid's own outputs"""
+    excluded = [os.path.join(x, '') for x in excluded]
+    for root in roots:
+        for directory, dirs, files in os.walk(root):
+            dirs[:] = sorted(x for x in dirs if not os.path.join(directory, x, '').startswith(tuple(excluded)))
+            yield (
+                directory,
+                root,
+                [
+                    os.path.join(directory, x)
+                    for x in sorted(files)
+                    if (os.path.splitext(x)[1].lower() in VIDEO_FILE_EXTENSIONS)
+                    and not re.fullmatch(BATCH_OUTPUT_NAME_PATTERN, os.path.splitext(x)[0])
+                ],
+            )
+
+
+def WatchLanguage(args: argparse.Namespace) -> str:
+    return next((x.strip() for x in args.lang.split(',') if x.strip()), SUBTITLE_DEFAULT_LANG)
+
+
+def WatchOutputFileSpec(fileSpec: str, root: str, outputDir: str, args: argparse.Namespace, nested: bool) -> str:
+    """where a watched file's clean output goes: the same relative path in the output tree (under a
+    directory named after its watched directory if there are several), with cleanvid's default name"""
+    relDir = os.path.relpath(os.path.dirname(fileSpec), root)
+    if nested:
+        relDir = os.path.join(os.path.basename(os.path.normpath(root)), relDir)
+    lang = WatchLanguage(args)
+    outName = os.path.basename(DefaultOutputFileSpec(fileSpec, lang, args.audioOnly))
+    return os.path.normpath(os.path.join(outputDir, relDir, outName))
+
+
+def SidecarSubtitles(fileSpec: str, lang: str) -> Optional[str]:
+    """a subtitle file dropped next to a watched video (movie.eng.srt or movie.srt), if there is one"""
+    base = os.path.splitext(fileSpec)[0]
+    return next((x for x in (f'{base}.{lang}.srt', f'{base}.srt') if os.path.isfile(x)), None)
+
+
+def _warm_encoders() -> None:
+    # asked once per process and kept (see AvailableEncoders and DetectGpuEncoder)
+    for codecType in ('A', 'V'):
+        AvailableEncoders(codecType)
+    try:
+        DetectGpuEncoder()
+    except Exception as e:
+        logger.debug(f'GPU detection failed: {e}')
+
+
+def _stop_jobs(stopping: Any) -> None:
+    # once the watcher is stopping, every ffmpeg process of this pool process is killed (again and again, so
+    # a job that was just starting doesn't get away either) and the job fails straight away
+    stopping.wait()
+    while True:
+        KillCommands()
+        time.sleep(WATCH_STOP_KILL_INTERVAL)
+
+
+def _init_watch_worker(
+    lexicons: Sequence[Any],
+    cacheDir: Optional[str],
+    niceness: Optional[int],
+    idleIo: bool,
+    stopping: Any,
+) -> None:
+    # the watcher decides when jobs stop: it is told about Ctrl+C, and sets stopping
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    threading.Thread(target=_stop_jobs, args=(stopping,), daemon=True).start()
+    _init_batch_worker(lexicons, cacheDir, niceness, idleIo)
+    _warm_encoders()
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+def RunWatch(argv: Sequence[str]) -> int:
+    """cleanvid watch [options] --output-dir <directory> <directory> ... [-- <cleanvid options for every file>]"""
+    argv = list(argv)
+    sharedArgv = argv[argv.index('--') + 1 :] if ('--' in argv) else []
+    argv = argv[: argv.index('--')] if ('--' in argv) else argv
+
+    parser = argparse.ArgumentParser(
+        prog='cleanvid watch',
+        description='Watch directories and clean every new or changed video once it has finished being written, '
+        'into an output tree mirroring them. Options after -- apply to every file.',
+    )
+    parser.add_argument('roots', nargs='+', metavar='<directory>')
+    parser.add_argument(
+        '--output-dir',
+        help='directory clean outputs (and their subtitles) are written under, at the same relative path',
+        metavar='<directory>',
+        dest='outputDir',
+        required=True,
+    )
+    parser.add_argument(
+        '--queue',
+        help=f'persistent job queue (default: {DefaultWatchQueueFileSpec()})',
+        metavar='<sqlite file>',
+        dest='queueFileSpec',
+        default=None,
+    )
+    parser.add_argument(
+        '--interval',
+        help=f'seconds between scans (default: {WATCH_INTERVAL_DEFAULT:g})',
+        metavar='<seconds>',
+        dest='interval',
+        type=float,
+        default=WATCH_INTERVAL_DEFAULT,
+    )
+    parser.add_argument(
+        '--settle',
+        help=f'seconds a file\'s size must stay the same before it is cleaned (default: {WATCH_SETTLE_DEFAULT:g})',
+        metavar='<seconds>',
+        dest='settle',
+        type=float,
+        default=WATCH_SETTLE_DEFAULT,
+    )
+    parser.add_argument(
+        '--poll',
+        help='only scan every --interval seconds, even if inotify (inotify_simple) is available',
+        dest='poll',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--once',
+        help='exit once everything found (and settled) has been cleaned instead of watching',
+        dest='once',
+        action='store_true',
+    )
+    parser.add_argument(
+        '--workers',
+        help='most files cleaned in parallel (default: as many as --cores allows)',
+        metavar='<int>',
+        dest='workers',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--cores',
+        help='cores shared by the ffmpeg processes of all running jobs (default: all of them)',
+        metavar='<int>',
+        dest='cores',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--timeout',
+        help='kill a job (and its ffmpeg processes) still running after this many seconds',
+        metavar='<seconds>',
+        dest='timeout',
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        '--nice',
+        help='run jobs at this lower CPU priority (nice increment)',
+        metavar='<int>',
+        dest='niceness',
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        '--idle-io',
+        help='run jobs in the idle I/O scheduling class (ionice -c 3)',
+        dest='idleIo',
+        action='store_true',
+    )
+    watchArgs = parser.parse_args(argv)
+
+    roots = [os.path.abspath(x) for x in watchArgs.roots]
+    for root in roots:
+        if not os.path.isdir(root):
+            parser.error(f'{root} is not a directory')
+    outputDir = os.path.abspath(watchArgs.outputDir)
+    if outputDir in roots:
+        parser.error('the output directory can\'t be a watched directory')
+
+    cleanvidParser = CleanvidArgumentParser()
+    shared = cleanvidParser.parse_args(sharedArgv)
+    if shared.input or shared.output or shared.subs or shared.subsOut:
+        parser.error('input, output and subtitle files are per file, they come from the watched directories')
+    CheckCleanvidArgs(cleanvidParser, shared)
+
+    queue = WatchQueue(watchArgs.queueFileSpec)
+    if recovered := queue.recover():
+        print(f'[cleanvid] watch: resuming {recovered} interrupted job(s)')
+    known = queue.fileKeys()
+    settling = SettleTracker(watchArgs.settle)
+    events = DirectoryEvents(watchArgs.poll)
+
+    # kept for the life of the watcher: the compiled profanity lists and what this ffmpeg and machine can
+    # encode with, in this process and (forked from it, or loading them once) every pool process
+    lexicons = [LexiconSpecOf(shared)]
+    _load_batch_lexicons(lexicons, shared.lexiconCacheDir)
+    _warm_encoders()
+
+    coreBudget = max(watchArgs.cores or os.cpu_count() or 1, 1)
+    maxJobs = max(watchArgs.workers or coreBudget, 1)
+    running = {}
+    used = 0
+    failed = 0
+    signal.signal(signal.SIGTERM, _terminate)
+    stopping = multiprocessing.Event()
+    newExecutor = lambda: concurrent.futures.ProcessPoolExecutor(
+        max_workers=maxJobs,
+        initializer=_init_watch_worker,
+        initargs=(lexicons, shared.lexiconCacheDir, watchArgs.niceness, watchArgs.idleIo, stopping),
+    )
+    executor = newExecutor()
+    print(
+        f"[cleanvid] watch: {', '.join(roots)} -> {outputDir}"
+        + (' (inotify)' if events.notifying else f' (polling every {watchArgs.interval:g}s)')
+    )
+    try:
+        while True:
+            # finished jobs (first, so a file that changed while it was being cleaned is queued again below)
+            broken = False
+            for future in [x for x in running if x.done()]:
+                job = running.pop(future)
+                used -= job.threads
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # the pool process itself died, and the pool can't be used any more
+                    broken = isinstance(e, concurrent.futures.process.BrokenProcessPool)
+                    result = {
+                        'input': job.args.input,
+                        'status': 'failed',
+                        'outputs': [],
+                        'seconds': 0.0,
+                        'error': f'{type(e).__name__}: {e}',
+                    }
+                failed += result['status'] == 'failed'
+                queue.finish(job.args.input, result)
+                print(
+                    f"[cleanvid] {result['status']}: {result['input']}"
+                    + (f" ({result['error']})" if result['error'] else '')
+                )
+            if broken and not running:
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = newExecutor()
+
+            # new, changed and vanished files
+            now = time.monotonic()
+            present = set()
+            for directory, root, fileSpecs in ScanWatchedFiles(roots, [outputDir]):
+                events.watch([directory])
+                for fileSpec in fileSpecs:
+                    try:
+                        st = os.stat(fileSpec)
+                    except OSError:
+                        continue
+                    present.add(fileSpec)
+                    if known.get(fileSpec) == (st.st_size, st.st_mtime_ns):
+                        continue
+                    # a file that changed while it is being cleaned isn't taken as known, so it is offered again
+                    # (and queued) once that job has finished
+                    if settling.update(fileSpec, st.st_size, st.st_mtime_ns, now) and queue.offer(
+                        fileSpec, root, st.st_size, st.st_mtime_ns
+                    ):
+                        known[fileSpec] = (st.st_size, st.st_mtime_ns)
+                        print(f'[cleanvid] queued: {fileSpec}')
+            settling.prune(present)
+
+            # start queued jobs that fit in the core budget, oldest first
+            runningInputs = {x.args.input for x in running.values()}
+            for fileSpec, root in queue.pending():
+                if (len(running) >= maxJobs) or (running and used >= coreBudget):
+                    break
+                if fileSpec in runningInputs:
+                    continue
+                if not os.path.isfile(fileSpec):
+                    queue.forget(fileSpec)
+                    known.pop(fileSpec, None)
+                    continue
+                try:
+                    args = cleanvidParser.parse_args(sharedArgv + ['-i', fileSpec])
+                    args.output = WatchOutputFileSpec(fileSpec, root, outputDir, args, len(roots) > 1)
+                    args.subs = SidecarSubtitles(fileSpec, WatchLanguage(args))
+                    args.subsOut = os.path.splitext(args.output)[0] + '.srt'
+                    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+                except (ValueError, OSError) as e:
+                    queue.finish(fileSpec, {'status': 'failed', 'seconds': 0.0, 'outputs': [], 'error': str(e)})
+                    failed += 1
+                    continue
+                job = PlanJobs([args], [None], coreBudget, timeouts=[watchArgs.timeout])[0]
+                if running and (used + job.threads > coreBudget):
+                    break
+                queue.start(fileSpec)
+                running[executor.submit(_run_batch_job, job)] = job
+                used += job.threads
+
+            if watchArgs.once and not (running or len(settling) or queue.pending()):
+                break
+
+            timeout = watchArgs.interval
+            if (due := settling.nextDue(time.monotonic())) is not None:
+                timeout = min(timeout, max(due, 0.1))
+            if running:
+                concurrent.futures.wait(running, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+            else:
+                events.wait(timeout)
+
+    except KeyboardInterrupt:
+        # running jobs are stopped (their ffmpeg processes killed) before they are put back in the queue, to be
+        # run again by the next watcher
+        print('[cleanvid] watch: stopping')
+        stopping.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        queue.recover()
+        return 0
+
+    executor.shutdown(wait=True)
+    counts = queue.counts()
+    print('[cleanvid] watch: ' + ', '.join(f'{v} {k}' for k, v in counts.items() if k in ('cleaned', 'unchanged', 'failed')))
+    return 1 if failed else 0
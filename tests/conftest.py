@@ -0,0 +1,59 @@
+import re
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from cleanvid.cleanvid import RunCleanvid
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch, tmp_path):
+    """skips tests needing ffmpeg and ffprobe when they aren't installed, and keeps cleanvid's caches in tmp_path"""
+    if not (shutil.which('ffmpeg') and shutil.which('ffprobe')):
+        pytest.skip('ffmpeg and ffprobe are not installed')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+
+
+@pytest.fixture
+def media(ffmpeg, tmp_path):
+    """make_media(name, seconds, offset=0, audioTracks=1, audioDelay=0): an H.264/AAC test clip whose
+timestamps start at offset (a tone on every audio track, starting audioDelay seconds after the video), with a
+subtitle file muting 5-7 s ("hell") and 15-16 s ("shit")"""
+
+    def make_media(name, seconds=30, offset=0, audioTracks=1, audioDelay=0):
+        fileSpec = tmp_path / name
+        cmd = ['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', f'testsrc=d={seconds}:s=160x120:r=25']
+        for i in range(audioTracks):
+            if audioDelay:
+                cmd += ['-itsoffset', str(audioDelay)]
+            cmd += ['-f', 'lavfi', '-i', f'sine=f={440 * (i + 1)}:d={seconds - audioDelay}:r=48000']
+        cmd += ['-map', '0:v'] + [x for i in range(audioTracks) for x in ('-map', f'{i + 1}:a')]
+        cmd += ['-c:v', 'libx264', '-preset', 'ultrafast', '-g', '50', '-c:a', 'aac']
+        if offset:
+            cmd += ['-output_ts_offset', str(offset)]
+        subprocess.run(cmd + [str(fileSpec)], check=True)
+        fileSpec.with_suffix('.srt').write_text(
+            '1\n00:00:05,000 --> 00:00:07,000\nwhat the hell\n\n2\n00:00:15,000 --> 00:00:16,000\nshit happens\n'
+        )
+        return str(fileSpec)
+
+    return make_media
+
+
+def run_cleanvid(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['cleanvid'] + [str(x) for x in args])
+    return RunCleanvid()
+
+
+def max_volume(fileSpec, start, duration, audioTrack=0):
+    """loudest sample (dB) of an audio track between start and start + duration seconds into the file"""
+    result = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-ss', str(start), '-t', str(duration), '-i', str(fileSpec)]
+        + ['-map', f'0:a:{audioTrack}', '-af', 'volumedetect', '-f', 'null', '-'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(re.search(r'max_volume: (\S+) dB', result.stderr).group(1))
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from cleanvid.batch import ExpandBatchInputs, OverrideArgs
+from cleanvid.cleanvid import CleanvidArgumentParser
+
+
+@pytest.fixture
+def library(tmp_path):
+    for name in ['a.mkv', 'a_clean.mkv', 'b.MP4', 'notes.txt', 'shows/s01e01.mkv', 'shows/s01e01.eng.clean.mka']:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(b'')
+    return tmp_path
+
+
+def test_directory_skips_outputs_and_other_files(library):
+    jobs = ExpandBatchInputs([str(library)])
+    assert [x for x, _ in jobs] == [str(library / x) for x in ['a.mkv', 'b.MP4', 'shows/s01e01.mkv']]
+    assert all(overrides == {} for _, overrides in jobs)
+
+
+def test_glob_and_files_are_cleaned_once(library):
+    jobs = ExpandBatchInputs([str(library / '**' / '*.mkv'), str(library / 'a.mkv')])
+    assert [x for x, _ in jobs] == [str(library / 'a.mkv'), str(library / 'shows' / 's01e01.mkv')]
+
+
+def test_csv_manifest(library):
+    manifest = library / 'jobs.csv'
+    manifest.write_text('input,priority,pad\nshows/s01e01.mkv,5,\na.mkv,,0.5\n')
+    assert ExpandBatchInputs([str(manifest), str(library)]) == [
+        (str(library / 'shows' / 's01e01.mkv'), {'priority': '5'}),
+        (str(library / 'a.mkv'), {'pad': '0.5'}),
+        (str(library / 'b.MP4'), {}),
+    ]
+
+
+def test_jsonl_manifest(library):
+    manifest = library / 'jobs.jsonl'
+    manifest.write_text(json.dumps({'input': 'b.MP4', 'edl': True}) + '\n\n')
+    assert ExpandBatchInputs([str(manifest)]) == [(str(library / 'b.MP4'), {'edl': True})]
+
+
+def test_manifest_entry_without_input(library):
+    manifest = library / 'jobs.jsonl'
+    manifest.write_text(json.dumps({'pad': 1}) + '\n')
+    with pytest.raises(ValueError):
+        ExpandBatchInputs([str(manifest)])
+
+
+def test_nothing_matches(tmp_path):
+    assert ExpandBatchInputs([str(tmp_path / '*.mkv')]) == []
+
+
+def test_override_args():
+    parser = CleanvidArgumentParser()
+    assert OverrideArgs(parser, {'pad': '0.5', 'edl': 'yes', 're-encode-audio': 'no'}) == ['--pad', '0.5', '--edl']
+    assert OverrideArgs(parser, {'reEncodeAudio': True}) == ['--re-encode-audio']
+    with pytest.raises(ValueError):
+        OverrideArgs(parser, {'no-such-option': 1})
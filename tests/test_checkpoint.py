@@ -0,0 +1,131 @@
+import json
+import os
+
+import pytest
+
+from cleanvid.checkpoint import (
+    CHECKPOINT_STATE_FILENAME,
+    AtomicWrite,
+    CommitPartFile,
+    JobCheckpoint,
+    JobWorkDir,
+    PartFileSpec,
+)
+from cleanvid.cleanvid import GetMediaInfo
+from cleanvid.videochunks import VerifyAvSync
+from conftest import max_volume, run_cleanvid
+
+
+def test_part_file_spec_keeps_extension():
+    assert PartFileSpec('/out/movie_clean.mkv') == '/out/movie_clean.part.mkv'
+    assert PartFileSpec('notes') == 'notes.part'
+
+
+def test_commit_part_file(tmp_path):
+    fileSpec = str(tmp_path / 'out.mkv')
+    with open(PartFileSpec(fileSpec), 'w') as f:
+        f.write('new')
+    CommitPartFile(fileSpec)
+    assert os.listdir(tmp_path) == ['out.mkv']
+
+
+def test_atomic_write_replaces_when_done(tmp_path):
+    fileSpec = tmp_path / 'out.json'
+    fileSpec.write_text('old')
+    with AtomicWrite(str(fileSpec)) as f:
+        f.write('new')
+        assert fileSpec.read_text() == 'old'
+    assert fileSpec.read_text() == 'new'
+    assert os.listdir(tmp_path) == ['out.json']
+
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path):
+    fileSpec = tmp_path / 'out.bin'
+    fileSpec.write_bytes(b'old')
+    with pytest.raises(KeyboardInterrupt):
+        with AtomicWrite(str(fileSpec), 'wb') as f:
+            f.write(b'partial')
+            raise KeyboardInterrupt
+    assert fileSpec.read_bytes() == b'old'
+    assert os.listdir(tmp_path) == ['out.bin']
+
+
+def test_job_work_dir(tmp_path):
+    workDir = JobWorkDir(str(tmp_path), '/media/a.mkv', '/out/a_clean.mkv')
+    assert os.path.dirname(workDir) == str(tmp_path)
+    assert workDir == JobWorkDir(str(tmp_path), '/media/a.mkv', '/out/a_clean.mkv')
+    assert workDir != JobWorkDir(str(tmp_path), '/media/a.mkv', '/out/a_other.mkv')
+    assert workDir != JobWorkDir(str(tmp_path), '/media/b.mkv', '/out/a_clean.mkv')
+
+
+IDENTITY = {'input': ['/media/a.mkv', 1234, 1700000000.5], 'pad': 0.0}
+
+
+def test_checkpoint_resumes_same_job(tmp_path):
+    workDir = str(tmp_path / 'job')
+    checkpoint = JobCheckpoint(workDir, IDENTITY)
+    assert not checkpoint.resumed
+    checkpoint.complete('probe', {'duration': 20.0})
+    checkpoint.complete('subtitles')
+    checkpoint.saveFile('chunk00000.mkv', b'encoded')
+
+    resumed = JobCheckpoint(workDir, dict(IDENTITY))
+    assert resumed.resumed
+    assert resumed.done('subtitles') and not resumed.done('mux')
+    assert resumed.get('probe') == {'duration': 20.0}
+    assert resumed.get('mux', 'missing') == 'missing'
+    assert resumed.loadFile('chunk00000.mkv') == b'encoded'
+    assert resumed.loadFile('chunk00001.mkv') is None
+
+
+def test_checkpoint_starts_over_for_another_job(tmp_path):
+    workDir = str(tmp_path / 'job')
+    checkpoint = JobCheckpoint(workDir, IDENTITY)
+    checkpoint.complete('probe')
+    checkpoint.saveFile('chunk00000.mkv', b'encoded')
+    os.makedirs(checkpoint.path('chunks'))
+
+    restarted = JobCheckpoint(workDir, dict(IDENTITY, pad=0.5))
+    assert not restarted.resumed
+    assert os.listdir(workDir) == []
+
+
+def test_checkpoint_ignores_other_versions_and_bad_state(tmp_path):
+    workDir = tmp_path / 'job'
+    workDir.mkdir()
+    state = workDir / CHECKPOINT_STATE_FILENAME
+    state.write_text(json.dumps({'version': -1, 'identity': IDENTITY, 'stages': {'probe': True}}))
+    assert not JobCheckpoint(str(workDir), IDENTITY).resumed
+    state.write_text('{not json')
+    assert not JobCheckpoint(str(workDir), IDENTITY).resumed
+
+
+def test_checkpoint_discard(tmp_path):
+    workDir = str(tmp_path / 'job')
+    checkpoint = JobCheckpoint(workDir, IDENTITY)
+    checkpoint.complete('probe')
+    checkpoint.discard()
+    assert not os.path.exists(workDir)
+
+
+def test_checkpointed_re_encode_of_short_source(media, monkeypatch, tmp_path):
+    # a checkpointed re-encode goes through the chunked encoder, with a clip shorter than a chunk
+    inFile = media('in.mkv', 30)
+    outFile = tmp_path / 'out.mkv'
+    workDir = tmp_path / 'work'
+    run_cleanvid(
+        monkeypatch,
+        '-i', inFile,
+        '-s', tmp_path / 'in.srt',
+        '-o', outFile,
+        '--re-encode-video',
+        '-v', '-c:v libx264 -preset ultrafast',
+        '--work-dir', workDir,
+    )
+    output = GetMediaInfo(str(outFile))
+    assert abs(output.duration - 30) < 0.2
+    VerifyAvSync(GetMediaInfo(inFile), output)
+    assert max_volume(outFile, 5.2, 1.6) < -80
+    assert max_volume(outFile, 10, 2) > -30
+    # the finished job's checkpoint is gone
+    assert os.listdir(workDir) == []
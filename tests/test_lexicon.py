@@ -0,0 +1,169 @@
+import os
+
+import pytest
+
+from cleanvid import lexicon
+from cleanvid.lexicon import Automaton, FoldText, Lexicon, LexiconCacheKey, LoadLexicon
+
+SWEARS = 'damn|darn\nhell|heck\nshit|shoot\n'
+WORDS = ['he', 'she', 'his', 'hers', 'ushe', 'a', 'aa', 'aaa']
+TEXTS = ['ushers', 'ahishers', 'aaaa', 'she sells his hers', '', 'xyz']
+BACKENDS = [
+    'python',
+    pytest.param(
+        'ahocorasick',
+        marks=pytest.mark.skipif(lexicon._matcher_backend() != 'ahocorasick', reason='pyahocorasick is not installed'),
+    ),
+]
+
+
+@pytest.fixture
+def swearsFile(tmp_path, monkeypatch):
+    monkeypatch.setattr(lexicon, '_loadedLexicons', {})
+    fileSpec = tmp_path / 'swears.txt'
+    fileSpec.write_text(SWEARS)
+    return str(fileSpec)
+
+
+def _cached(cacheDir):
+    return sorted(x for x in os.listdir(cacheDir) if x.endswith('.pickle'))
+
+
+def _not_compiled(self, *args, **kwargs):
+    raise AssertionError('compiled a cached lexicon')
+
+
+def test_cache_key_follows_content_and_backend():
+    assert LexiconCacheKey(b'a', 'python') == LexiconCacheKey(b'a', 'python')
+    assert LexiconCacheKey(b'a', 'python') != LexiconCacheKey(b'b', 'python')
+    assert LexiconCacheKey(b'a', 'python') != LexiconCacheKey(b'a', 'ahocorasick')
+
+
+def test_load_lexicon_caches_on_disk(swearsFile, tmp_path, monkeypatch):
+    cacheDir = str(tmp_path / 'cache')
+    first = LoadLexicon(swearsFile, cacheDir)
+    assert first.replace('well damn') == 'well darn'
+    assert LoadLexicon(swearsFile, cacheDir) is first
+    assert len(_cached(cacheDir)) == 1
+
+    # a new process loads the pickled matcher instead of compiling the list
+    monkeypatch.setattr(lexicon, '_loadedLexicons', {})
+    monkeypatch.setattr(Lexicon, '__init__', _not_compiled)
+    second = LoadLexicon(swearsFile, cacheDir)
+    assert second is not first
+    assert second.replace('what the hell') == 'what the heck'
+
+
+def test_load_lexicon_recompiles_changed_list(swearsFile, tmp_path):
+    cacheDir = str(tmp_path / 'cache')
+    LoadLexicon(swearsFile, cacheDir)
+    with open(swearsFile, 'a') as f:
+        f.write('crap|crud\n')
+    assert LoadLexicon(swearsFile, cacheDir).replace('crap') == 'crud'
+    assert len(_cached(cacheDir)) == 2
+
+
+def test_load_lexicon_evicts_oldest(swearsFile, tmp_path):
+    cacheDir = str(tmp_path / 'cache')
+    for i in range(3):
+        with open(swearsFile, 'a') as f:
+            f.write(f'word{i}\n')
+        LoadLexicon(swearsFile, cacheDir, maxEntries=2)
+    assert len(_cached(cacheDir)) == 2
+
+
+def test_load_lexicon_without_disk_cache(swearsFile, tmp_path):
+    assert LoadLexicon(swearsFile, '').replace('damn') == 'darn'
+    assert not os.path.exists(tmp_path / 'cache')
+
+
+def test_lexicon_pickles_with_matcher():
+    import pickle
+
+    restored = pickle.loads(pickle.dumps(Lexicon(SWEARS.splitlines(True))))
+    assert restored.replace('Damn it to hell') == 'darn it to heck'
+
+
+def _matches(automaton, text):
+    return sorted(automaton.iter(text))
+
+
+def test_automaton_finds_overlapping_words():
+    automaton = Automaton()
+    for word in WORDS:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    assert _matches(automaton, 'ushers') == [(3, 'he'), (3, 'she'), (3, 'ushe'), (5, 'hers')]
+    assert _matches(automaton, 'aaa') == [(0, 'a'), (1, 'a'), (1, 'aa'), (2, 'a'), (2, 'aa'), (2, 'aaa')]
+    assert _matches(automaton, 'xyz') == []
+    assert not automaton.add_word('', 'empty')
+
+
+def test_automaton_matches_pyahocorasick():
+    ahocorasick = pytest.importorskip('ahocorasick')
+    expected, automaton = ahocorasick.Automaton(), Automaton()
+    for word in WORDS:
+        expected.add_word(word, (len(word), word))
+        automaton.add_word(word, (len(word), word))
+    expected.make_automaton()
+    automaton.make_automaton()
+    for text in TEXTS:
+        assert _matches(automaton, text) == sorted(expected.iter(text))
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_lexicon_backends_agree(backend):
+    lines = ['ass|butt', 'asshole', 'hell|heck', 'son of a bitch|son of a gun']
+    texts = ['You asshole!', 'Hell, what the hell?', 'Son of a bitch, classy.', 'Bass hello']
+    assert Lexicon(lines, backend).scan(texts) == Lexicon(lines, 'python').scan(texts)
+    assert [Lexicon(lines, backend).replace(x) for x in texts] == [
+        'You *****!',
+        'heck, what the heck?',
+        'son of a gun, classy.',
+        'Bass hello',
+    ]
+
+
+@pytest.mark.parametrize(
+    'text,folded',
+    [
+        ('Sh!t happens', 'shit happens'),
+        ('$hit', 'shit'),
+        ('shit!', 'shit!'),
+        ('2010', '2010'),
+        ('son of a\nbitch', 'son of a bitch'),
+    ],
+)
+def test_fold_ascii_lines_up(text, folded):
+    assert FoldText(text) == (folded, None)
+
+
+def test_fold_offsets_map_back_to_original():
+    # diacritics dropped, whitespace runs collapsed, zero-width characters removed, ligatures expanded
+    assert FoldText('Héllo  world') == (
+        'hello world',
+        ([0, 1, 2, 3, 4, 5, 7, 8, 9, 10, 11], [1, 2, 3, 4, 5, 7, 8, 9, 10, 11, 12]),
+    )
+    assert FoldText('da\u200bmn') == ('damn', ([0, 1, 3, 4], [1, 2, 4, 5]))
+    assert FoldText('\ufb01ne') == ('fine', ([0, 0, 1, 2], [1, 1, 2, 3]))
+    assert FoldText('It\u2019s')[0] == "it's"
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_lexicon_matches_folded_text(backend):
+    matcher = Lexicon(['shit|shoot', 'damn|darn', 'son of a bitch|son of a gun', 'fuck'], backend)
+    assert matcher.replace('Sh!t, d\u00e4mn!') == 'shoot, darn!'
+    assert matcher.replace('f*ck and f**k') == '***** and *****'
+    assert matcher.scan(['Son of a\nbitch', 'x da\u200bmn x']) == [
+        [(0, 14, 'son of a bitch')],
+        [(2, 7, 'damn')],
+    ]
+    assert matcher.replace('x da\u200bmn x') == 'x darn x'
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_lexicon_folded_collision_keeps_exact_entry(backend):
+    matcher = Lexicon(['sh1t|sh-one-t', 'shit|shoot'], backend)
+    assert matcher.replace('sh1t') == 'sh-one-t'
+    assert matcher.replace('SHIT') == 'shoot'
+    assert matcher.replace('sh!t') == 'shoot'
@@ -0,0 +1,59 @@
+import pytest
+
+from cleanvid.cleanvid import GetMediaInfo
+from cleanvid.pcmmute import PcmEngineAvailable
+from cleanvid.videochunks import VerifyAvSync
+from conftest import max_volume, run_cleanvid
+
+MUTED = -80.0
+AUDIBLE = -30.0
+
+
+@pytest.mark.parametrize('offset,audioDelay', [(0, 0), (10, 0), (0, 2)])
+@pytest.mark.parametrize('engine', ['filter', 'segment', 'pcm'])
+def test_mutes_windows_only(media, monkeypatch, tmp_path, engine, offset, audioDelay):
+    if (engine == 'pcm') and not PcmEngineAvailable():
+        pytest.skip('numpy is not installed')
+    inFile = media('in.mkv', offset=offset, audioDelay=audioDelay)
+    outFile = tmp_path / 'out.mkv'
+    run_cleanvid(monkeypatch, '-i', inFile, '-s', tmp_path / 'in.srt', '-o', outFile, '--mute-engine', engine)
+    VerifyAvSync(GetMediaInfo(inFile), GetMediaInfo(str(outFile)))
+    assert max_volume(outFile, 5.2, 1.6) < MUTED
+    assert max_volume(outFile, 15.2, 0.6) < MUTED
+    assert max_volume(outFile, 10, 2) > AUDIBLE
+
+
+@pytest.mark.parametrize('engine', ['filter', 'segment', 'pcm'])
+def test_audio_only_sidecar_keeps_source_timestamps(media, monkeypatch, tmp_path, engine):
+    if (engine == 'pcm') and not PcmEngineAvailable():
+        pytest.skip('numpy is not installed')
+    inFile = media('in.mkv', offset=10)
+    outFile = tmp_path / 'out.mka'
+    run_cleanvid(
+        monkeypatch, '-i', inFile, '-s', tmp_path / 'in.srt', '-o', outFile, '--audio-only', '--mute-engine', engine
+    )
+    VerifyAvSync(GetMediaInfo(inFile), GetMediaInfo(str(outFile)), ('audio',), sameTimestamps=True)
+    assert max_volume(outFile, 5.2, 1.6) < MUTED
+    assert max_volume(outFile, 15.2, 0.6) < MUTED
+    assert max_volume(outFile, 10, 2) > AUDIBLE
+
+
+def test_mutes_tracks_and_profiles_separately(media, monkeypatch, tmp_path):
+    inFile = media('in.mkv', audioTracks=2)
+    (tmp_path / 'mild.txt').write_text('hell\n')
+    (tmp_path / 'strict.txt').write_text('hell\nshit\n')
+    outFile = tmp_path / 'out.mkv'
+    run_cleanvid(
+        monkeypatch,
+        '-i', inFile,
+        '-s', tmp_path / 'in.srt',
+        '-o', outFile,
+        '--mute-audio-streams', 'all',
+        '--profile', f'mild={tmp_path / "mild.txt"}',
+        '--profile', f'strict={tmp_path / "strict.txt"}',
+    )
+    for track in (0, 1):
+        assert max_volume(tmp_path / 'out.mild.mkv', 5.2, 1.6, track) < MUTED
+        assert max_volume(tmp_path / 'out.mild.mkv', 15.2, 0.6, track) > AUDIBLE
+        assert max_volume(tmp_path / 'out.strict.mkv', 15.2, 0.6, track) < MUTED
+        assert max_volume(tmp_path / 'out.strict.mkv', 10, 2, track) > AUDIBLE
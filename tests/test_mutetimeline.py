@@ -0,0 +1,79 @@
+import pytest
+
+from cleanvid.mutetimeline import MuteTimeline
+
+
+def test_intervals_are_sorted_merged_and_clamped():
+    timeline = MuteTimeline([(5000, 6000), (1000, 2000), (1500, 2500), (2500, 3000), (-200, 100), (4000, 4000)])
+    assert list(timeline) == [(0, 100), (1000, 3000), (5000, 6000)]
+    assert len(timeline) == 3
+    assert timeline[1] == (1000, 3000)
+    assert timeline[-1] == (5000, 6000)
+    assert (timeline.start, timeline.end, timeline.duration) == (0, 6000, 3100)
+
+
+def test_empty():
+    timeline = MuteTimeline()
+    assert not timeline
+    assert (timeline.start, timeline.end, timeline.duration) == (None, None, 0)
+    assert timeline.invert(1000) == MuteTimeline([(0, 1000)])
+    assert timeline.toEdl() == ''
+
+
+def test_point_and_range_queries():
+    timeline = MuteTimeline([(1000, 2000), (3000, 4000)])
+    assert [timeline.contains(t) for t in (999, 1000, 1999, 2000, 3500)] == [False, True, True, False, True]
+    assert timeline.overlaps(1999, 2500)
+    assert not timeline.overlaps(2000, 3000)
+    assert not timeline.overlaps(1500, 1500)
+    assert timeline.overlapping(1500, 3001) == timeline
+    assert timeline.overlapping(2000, 3000) == MuteTimeline()
+    assert timeline.overlapping(3999, 10000) == MuteTimeline([(3000, 4000)])
+
+
+def test_pad_shift_merge():
+    timeline = MuteTimeline([(1000, 2000), (2600, 3000)])
+    assert timeline.pad(300) == MuteTimeline([(700, 3300)])
+    assert timeline.pad(1500, 0) == MuteTimeline([(0, 3000)])
+    assert timeline.shift(-1500) == MuteTimeline([(0, 500), (1100, 1500)])
+    assert timeline.merge(MuteTimeline([(1900, 2700)]), MuteTimeline([(5000, 5100)])) == MuteTimeline(
+        [(1000, 3000), (5000, 5100)]
+    )
+
+
+def test_clip_and_invert():
+    timeline = MuteTimeline([(1000, 2000), (3000, 4000)])
+    assert timeline.clip(3500) == MuteTimeline([(1000, 2000), (3000, 3500)])
+    assert timeline.clip(None, 1500) == MuteTimeline([(1500, 2000), (3000, 4000)])
+    assert timeline.invert(5000) == MuteTimeline([(0, 1000), (2000, 3000), (4000, 5000)])
+    assert timeline.invert(3500) == MuteTimeline([(0, 1000), (2000, 3000)])
+
+
+@pytest.fixture
+def timeline():
+    return MuteTimeline([(1000, 2500), (61000, 61250)])
+
+
+def test_to_send_cmd(timeline):
+    assert timeline.toSendCmd('mute') == (
+        '1.000-2.500 [enter] mute volume 0, [leave] mute volume 1;\n'
+        '61.000-61.250 [enter] mute volume 0, [leave] mute volume 1;\n'
+    )
+
+
+def test_to_edl(timeline):
+    assert timeline.toEdl() == '1.0\t2.500\t1\n61.0\t61.250\t1\n'
+
+
+def test_to_plex_markers(timeline):
+    assert timeline.toPlexMarkers() == [
+        {'start': 1000, 'end': 2500, 'mode': 'volume'},
+        {'start': 61000, 'end': 61250, 'mode': 'volume'},
+    ]
+
+
+def test_to_json(timeline):
+    assert timeline.toJson() == [
+        {'start': '00:00:01,000', 'end': '00:00:02,500'},
+        {'start': '00:01:01,000', 'end': '00:01:01,250'},
+    ]
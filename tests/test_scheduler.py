@@ -0,0 +1,64 @@
+import argparse
+import math
+
+from cleanvid.scheduler import ClassifyJob, PlanJobs
+
+
+def _args(**kwargs):
+    options = dict(
+        reEncodeVideo=False,
+        hardCode=False,
+        smartBurn=False,
+        audioOnly=False,
+        threads=None,
+        threadsInput=None,
+        threadsEncoding=None,
+        encodeWorkers=None,
+    )
+    options.update(kwargs)
+    return argparse.Namespace(**options)
+
+
+def test_classify_job():
+    assert ClassifyJob(_args()) == 'copy'
+    assert ClassifyJob(_args(audioOnly=True)) == 'audio'
+    assert ClassifyJob(_args(reEncodeVideo=True, audioOnly=True)) == 'encode'
+    assert ClassifyJob(_args(smartBurn=True)) == 'encode'
+
+
+def test_threads_from_class_and_budget():
+    jobs = [_args(), _args(reEncodeVideo=True), _args(hardCode=True), _args(threadsInput=3)]
+    planned = PlanJobs(jobs, [60, 60, 60, 60], 4)
+    assert [(x.jobClass, x.threads) for x in planned] == [('copy', 1), ('encode', 4), ('encode', 4), ('copy', 3)]
+    assert [x.threads for x in jobs] == [1, 4, 4, None]
+
+
+def test_chunked_encode_splits_threads():
+    job = _args(reEncodeVideo=True, encodeWorkers=4)
+    (planned,) = PlanJobs([job], [60], 16)
+    assert (planned.threads, job.threads, job.threadsEncoding) == (8, None, 2)
+
+    job = _args(reEncodeVideo=True, encodeWorkers=6)
+    (planned,) = PlanJobs([job], [60], 4)
+    assert (planned.threads, job.threadsEncoding) == (6, 1)
+
+
+def test_cost_from_class_and_duration():
+    planned = PlanJobs([_args(), _args(reEncodeVideo=True), _args()], [100, 100, None], 8)
+    assert [x.cost for x in planned] == [2.0, 100.0, math.inf]
+
+
+def test_orders():
+    jobs = [_args(reEncodeVideo=True), _args(), _args(audioOnly=True), _args()]
+    durations = [10, 600, 600, None]
+    priorities = [0, 1, 0, 1]
+    timeouts = [None, 30.0, None, None]
+    assert [x.index for x in PlanJobs(jobs, durations, 8, 'fifo', priorities, timeouts)] == [0, 1, 2, 3]
+    assert [x.index for x in PlanJobs(jobs, durations, 8, 'sjf', priorities, timeouts)] == [2, 0, 1, 3]
+    planned = PlanJobs(jobs, durations, 8, 'priority', priorities, timeouts)
+    assert [(x.index, x.priority, x.timeout) for x in planned] == [
+        (1, 1, 30.0),
+        (3, 1, None),
+        (2, 0, None),
+        (0, 0, None),
+    ]
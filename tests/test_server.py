@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from cleanvid.cleanvid import SWEARS_DEFAULT_FILESPEC
+from cleanvid.server import CleanvidServer, JobOptions
+
+
+def test_defaults_next_to_input():
+    kwargs = JobOptions({'iVidFileSpec': '/media/movie.mkv'})
+    assert kwargs['oVidFileSpec'] == '/media/movie_clean.mkv'
+    assert kwargs['oSubsFileSpec'] == '/media/movie_clean.srt'
+    assert kwargs['iSubsFileSpec'] is None
+    assert kwargs['iSwearsFileSpec'] == SWEARS_DEFAULT_FILESPEC
+
+
+def test_audio_only_default_output():
+    kwargs = JobOptions({'iVidFileSpec': '/media/movie.mkv', 'audioOnly': True, 'subsLang': 'spa'})
+    assert kwargs['oVidFileSpec'] == '/media/movie.spa.clean.mka'
+
+
+@pytest.mark.parametrize(
+    'options,error',
+    [
+        ([], 'JSON object'),
+        ({}, 'iVidFileSpec is required'),
+        ({'iVidFileSpec': 'a.mkv', 'bogus': 1}, 'bogus'),
+        ({'iVidFileSpec': 'a.mkv', 'mediaInfo': {}}, 'mediaInfo'),
+        ({'iVidFileSpec': 'a.mkv', 'vParams': '-c:v libx264 -y /etc/out.mkv'}, 'vParams'),
+        ({'iVidFileSpec': 'a.mkv', 'aParams': 'base64:LWY='}, 'aParams'),
+        ({'iVidFileSpec': 'a.mkv', 'lexiconCacheDir': '/etc'}, 'lexiconCacheDir'),
+        ({'iVidFileSpec': 'a.mkv', 'swearsProfiles': ['mild']}, 'swearsProfiles'),
+    ],
+)
+def test_rejects_bad_options(options, error):
+    with pytest.raises(ValueError, match=error):
+        JobOptions(options)
+
+
+def test_outputs_under_root(tmp_path):
+    root = str(tmp_path)
+    kwargs = JobOptions({'iVidFileSpec': '/media/movie.mkv'}, root)
+    assert kwargs['oVidFileSpec'] == os.path.join(root, 'movie_clean.mkv')
+    assert kwargs['oSubsFileSpec'] == os.path.join(root, 'movie_clean.srt')
+
+    options = {'iVidFileSpec': '/media/movie.mkv', 'oVidFileSpec': 'sub/out.mkv', 'plexAutoSkipJson': 'p.json'}
+    kwargs = JobOptions(options, root)
+    assert kwargs['oVidFileSpec'] == os.path.join(root, 'sub', 'out.mkv')
+    assert kwargs['oSubsFileSpec'] == os.path.join(root, 'sub', 'out.srt')
+    assert kwargs['plexAutoSkipJson'] == os.path.join(root, 'p.json')
+
+
+@pytest.mark.parametrize(
+    'option,value',
+    [
+        ('oVidFileSpec', '/media/out.mkv'),
+        ('oVidFileSpec', '../out.mkv'),
+        ('oSubsFileSpec', '/etc/out.srt'),
+        ('plexAutoSkipJson', '/tmp/p.json'),
+        ('oVidFileSpec', 'escape/out.mkv'),
+    ],
+)
+def test_outputs_outside_root_refused(tmp_path, option, value):
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'escape').symlink_to(tmp_path)
+    with pytest.raises(ValueError, match='must be under'):
+        JobOptions({'iVidFileSpec': '/media/movie.mkv', option: value}, str(root))
+
+
+@pytest.fixture
+def server():
+    # the checks don't need the job pool the constructor starts
+    server = CleanvidServer.__new__(CleanvidServer)
+    server.token = 'secret'
+    return server
+
+
+@pytest.mark.parametrize(
+    'headers,status',
+    [
+        ({'host': '127.0.0.1:8765', 'authorization': 'Bearer secret'}, None),
+        ({'host': 'localhost', 'authorization': 'Bearer secret'}, None),
+        ({'host': '[::1]:8765', 'authorization': 'Bearer secret'}, None),
+        ({'host': '127.0.0.1:8765'}, 401),
+        ({'host': '127.0.0.1:8765', 'authorization': 'Bearer wrong'}, 401),
+        ({'host': 'evil.example:8765', 'authorization': 'Bearer secret'}, 403),
+        ({'authorization': 'Bearer secret'}, 403),
+        ({'host': '127.0.0.1:8765', 'authorization': 'Bearer secret', 'origin': 'http://127.0.0.1:8765'}, 403),
+    ],
+)
+def test_refused(server, headers, status):
+    refused = server._refused(headers)
+    assert (refused[0] if refused else None) == status
+
+
+def test_no_token_on_unix_socket(server):
+    server.token = None
+    assert server._refused({'host': 'localhost'}) is None
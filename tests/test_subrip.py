@@ -0,0 +1,80 @@
+import io
+
+import pysrt
+import pytest
+
+from cleanvid.subrip import FormatSrtTime, IterSrtCues, ParseSrtTime, SubtitleCue, WriteSrtCues
+
+SRT = """1
+00:00:01,000 --> 00:00:02,500
+Hello there.
+
+2
+00:00:03,000 --> 00:00:04,000 X1:10 X2:20 Y1:30 Y2:40
+Two
+lines
+
+this block has no timestamps
+
+00:00:05,000 --> 00:00:06,000
+No index.
+
+4
+00:01:07.250 --> 01:00:00,001
+Dot separated.
+"""
+
+
+def _pysrt_cues(text):
+    return [(x.index, x.start.ordinal, x.end.ordinal, x.text, x.position) for x in pysrt.from_string(text)]
+
+
+def _cues(text):
+    return [(x.index, x.start, x.end, x.text, x.position) for x in IterSrtCues(text)]
+
+
+def test_parse_matches_pysrt():
+    assert _cues(SRT) == _pysrt_cues(SRT)
+
+
+def test_parse_crlf_and_lines_match_pysrt():
+    text = SRT.replace('\n', '\r\n')
+    assert _cues(text) == _pysrt_cues(text)
+    assert _cues(io.StringIO(SRT)) == _pysrt_cues(SRT)
+
+
+def test_parse_skips_malformed_blocks():
+    assert [x.text for x in IterSrtCues(SRT)] == ['Hello there.', 'Two\nlines', 'No index.', 'Dot separated.']
+
+
+@pytest.mark.parametrize(
+    'source,ordinal',
+    [('00:00:00,000', 0), ('00:00:01,500', 1500), ('01:02:03,004', 3723004), ('00:00:01.5', 1005)],
+)
+def test_parse_time(source, ordinal):
+    assert ParseSrtTime(source) == ordinal
+
+
+def test_parse_time_rejects_garbage():
+    with pytest.raises(ValueError):
+        ParseSrtTime('00:01,000')
+
+
+def test_format_time():
+    assert FormatSrtTime(3723004) == '01:02:03,004'
+    assert FormatSrtTime(-5) == '00:00:00,000'
+
+
+@pytest.mark.parametrize('eol', ['\n', '\r\n'])
+def test_write_matches_pysrt(eol):
+    expected = io.StringIO()
+    pysrt.from_string(SRT).write_into(expected, eol=eol)
+    written = io.StringIO()
+    assert WriteSrtCues(IterSrtCues(SRT), written, eol=eol) == 4
+    assert written.getvalue() == expected.getvalue()
+
+
+def test_write_round_trips():
+    written = io.StringIO()
+    WriteSrtCues([SubtitleCue(1, 0, 1000, 'a'), SubtitleCue('2', 1000, 2000, 'b\nc')], written, eol='\n')
+    assert _cues(written.getvalue()) == [(1, 0, 1000, 'a', ''), (2, 1000, 2000, 'b\nc', '')]
@@ -0,0 +1,106 @@
+from fractions import Fraction
+
+import pytest
+
+from cleanvid import cleanvid
+from cleanvid.cleanvid import GetMediaInfo
+from cleanvid.mediainfo import MediaInfo
+from cleanvid.videochunks import PlanVideoChunks, VerifyAvSync
+from conftest import max_volume, run_cleanvid
+
+
+def _info(fileSpec, formatName, video, audio, start=None):
+    # (start_time, duration) of the video and audio streams, durations given as matroska DURATION tags
+    streams = []
+    for codecType, (startTime, duration) in (('video', video), ('audio', audio)):
+        stream = {'codec_type': codecType, 'start_time': str(startTime)}
+        if formatName == 'matroska,webm':
+            stream['tags'] = {'DURATION': f'00:00:{duration:012.9f}'}
+        else:
+            stream['duration'] = str(duration)
+        streams.append(stream)
+    probe = {'format': {'format_name': formatName}, 'streams': streams}
+    if start is not None:
+        probe['format']['start_time'] = str(start)
+    return MediaInfo(fileSpec, probe)
+
+
+def test_plan_video_chunks():
+    keyframes = [Fraction(x, 2) for x in range(0, 240, 4)]
+    assert PlanVideoChunks(keyframes, Fraction(120), 4) == [30, 60, 90]
+    assert PlanVideoChunks(keyframes, Fraction(120), 8) == [20, 40, 60, 80, 100]
+    assert PlanVideoChunks(keyframes[:15], Fraction(30), 4) == []
+    assert PlanVideoChunks([], Fraction(30), 4) == []
+
+
+def test_timeline_origin():
+    info = _info('in.mkv', 'matroska,webm', (10.0, 40.0), (9.979, 40.021), 9.979)
+    assert info.timelineOrigin() == Fraction('9.979')
+    assert info.relativeStart(info.videoStreams[0]) == Fraction('0.021')
+    # without a container start time, the stream's own start is the origin
+    info = _info('in.mp4', 'mov,mp4', (1.5, 30.0), (1.4, 30.0))
+    assert info.timelineOrigin(info.videoStreams[0]) == Fraction('1.5')
+    assert info.relativeStart(info.videoStreams[0]) == 0
+
+
+def test_verify_av_sync_compares_relative_starts():
+    source = _info('in.mkv', 'matroska,webm', (10.0, 40.0), (9.979, 40.021), 9.979)
+    VerifyAvSync(source, _info('out.mkv', 'matroska,webm', (0.021, 30.021), (0.0, 30.021)))
+    VerifyAvSync(source, _info('out.mp4', 'mov,mp4', (0.021, 30.0), (0.0, 30.021)))
+    with pytest.raises(ValueError, match='after audio'):
+        VerifyAvSync(source, _info('out.mkv', 'matroska,webm', (10.021, 40.021), (0.0, 30.021)))
+    with pytest.raises(ValueError, match='duration'):
+        VerifyAvSync(source, _info('out.mkv', 'matroska,webm', (0.021, 2.021), (0.0, 30.021)))
+    VerifyAvSync(source, MediaInfo('out.mka', {'streams': [{'codec_type': 'audio', 'start_time': '0'}]}), ('audio',))
+    with pytest.raises(ValueError, match='no video stream'):
+        VerifyAvSync(source, MediaInfo('out.mka', {'streams': [{'codec_type': 'audio', 'start_time': '0'}]}))
+    # a sidecar keeping the source's timestamps has to start where the source does
+    sidecar = MediaInfo('out.mka', {'streams': [{'codec_type': 'audio', 'start_time': '9.979'}]})
+    VerifyAvSync(source, sidecar, ('audio',), sameTimestamps=True)
+    with pytest.raises(ValueError, match='starts at 0.000'):
+        VerifyAvSync(
+            source,
+            MediaInfo('out.mka', {'streams': [{'codec_type': 'audio', 'start_time': '0'}]}),
+            ('audio',),
+            sameTimestamps=True,
+        )
+
+
+@pytest.mark.parametrize('offset', [0, 10])
+def test_chunked_encode_of_short_and_offset_sources(media, monkeypatch, tmp_path, offset):
+    # shorter than two minimum chunks, so it is encoded as one
+    inFile = media('in.mkv', 30, offset)
+    outFile = tmp_path / 'out.mkv'
+    run_cleanvid(
+        monkeypatch,
+        '-i', inFile,
+        '-s', tmp_path / 'in.srt',
+        '-o', outFile,
+        '--re-encode-video',
+        '-v', '-c:v libx264 -preset ultrafast',
+        '--encode-workers', '2',
+    )
+    # the whole clip came out, in sync, with the mutes where the subtitles put them
+    output = GetMediaInfo(str(outFile))
+    assert abs(output.duration - 30) < 0.2
+    VerifyAvSync(GetMediaInfo(inFile), output)
+    assert output.relativeStart(output.videoStreams[0]) < 0.1
+    assert max_volume(outFile, 5.2, 1.6) < -80
+    assert max_volume(outFile, 10, 2) > -30
+
+
+def test_smart_burn_of_offset_source(media, monkeypatch, tmp_path):
+    inFile = media('in.mkv', 30, 10)
+    outFile = tmp_path / 'out.mkv'
+    run_cleanvid(monkeypatch, '-i', inFile, '-s', tmp_path / 'in.srt', '-o', outFile, '--smart-burn')
+    output = GetMediaInfo(str(outFile))
+    VerifyAvSync(GetMediaInfo(inFile), output)
+    assert output.relativeStart(output.videoStreams[0]) < 0.1
+    assert max_volume(outFile, 5.2, 1.6) < -80
+
+
+def test_failed_probe_is_reported(media, monkeypatch, tmp_path):
+    inFile = media('in.mkv', 30)
+    monkeypatch.setattr(cleanvid, 'GetMediaInfo', lambda *args, **kwargs: None)
+    with pytest.raises(ValueError, match='Could not determine audio streams'):
+        run_cleanvid(monkeypatch, '-i', inFile, '-s', tmp_path / 'in.srt', '-o', tmp_path / 'out.mkv', '--smart-burn')